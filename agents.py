@@ -0,0 +1,8 @@
+# ========================================
+# נתוני סוכנים
+# ========================================
+AGENTS_DATA = {
+    "יוסף": {"password": "Agen148", "stores": [67, 834, 291, 262, 685, 702, 638, 664, 1299, 1300, 1303, 1316, 1317, 1318, 1319, 1320, 1321, 1325, 1326, 1330, 1331, 1332, 1333, 1334, 1335, 1337, 1340, 1341]},
+    "ניקול": {"password": "Agen148", "stores": [665, 441, 1094, 340, 1106, 1122, 1093, 62, 599, 263, 1084, 309, 624, 1227]},
+}
+ADMIN_PASSWORD = "admin2025"
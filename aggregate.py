@@ -0,0 +1,207 @@
+"""בניית טבלאות החנויות, המוצרים וחנויות × מוצרים ממכירות גולמיות
+
+    python aggregate.py raw_sales.csv --out . --ref-month 2025-11
+    python aggregate.py raw_sales.feather --stores-info stores.csv --products-info products.csv
+
+קלט: שורה לכל חנות × מוצר × חודש (או משלוח, עם עמודת תאריך) -
+מזהה_חנות, מזהה_מוצר, חודש / תאריך, מכירות, חזרות (לא חובה), ואופציונלית
+שם_חנות, עיר, מוצר, קטגוריה, סיווג. חודש הייחוס הוא סוף שנה2 (ברירת מחדל:
+החודש האחרון בנתונים). הפלט נכתב כקבצי הנתונים הרגילים וקובץ מטא-נתונים
+עם חודש הייחוס, שממנו נגזרות התוויות בתצוגה.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_io
+from periods import HISTORY_MONTHS, RETURN_WINDOWS, WINDOWS
+
+# סדר העמודות כמו בקבצים המקוריים
+STORE_COLUMNS = ['מזהה', 'שם חנות', 'עיר', 'שנה1', 'שנה2', 'H1_שנה1', 'H2_שנה1', 'H1_שנה2', 'H2_שנה2',
+                 '6v6_H1', '6v6_H2', '3v3_שנה1', '3v3_שנה2', '2v2_קודם', '2v2_אחרון',
+                 'H1_שנה2_אחוז_חזרות', 'H2_שנה2_אחוז_חזרות', '3v3_Q2', '3v3_Q3']
+PRODUCT_COLUMNS = ['מזהה', 'מוצר', 'קטגוריה', 'סיווג', 'שנה1', 'שנה2', 'H1_שנה1', 'H2_שנה1', 'H1_שנה2',
+                   'H2_שנה2', '6v6_H1', '6v6_H2', '3v3_שנה1', '3v3_שנה2', '2v2_קודם', '2v2_אחרון',
+                   'H1_שנה2_אחוז_חזרות', 'H2_שנה2_אחוז_חזרות', 'חנויות_שנה1', 'חנויות_שנה2', '3v3_Q2', '3v3_Q3']
+SP_COLUMNS = ['מזהה_חנות', 'שם_חנות', 'עיר', 'מזהה_מוצר', 'מוצר', 'סיווג', 'שנה1', 'שנה2',
+              '6v6_H1', '6v6_H2', '3v3_Q2', '3v3_Q3', '2v2_קודם', '2v2_אחרון']
+
+# פרטי חנות / מוצר: עמודה בקלט הגולמי -> עמודה בטבלת הפלט
+STORE_INFO = {'שם_חנות': 'שם חנות', 'עיר': 'עיר'}
+PRODUCT_INFO = {'מוצר': 'מוצר', 'קטגוריה': 'קטגוריה', 'סיווג': 'סיווג'}
+MISSING = 0  # כך נשמר ערך חסר בקבצים הקיימים
+
+
+def month_offsets(raw, ref_month=None):
+    """מספר החודשים אחורה מחודש הייחוס לכל שורה, וחודש הייחוס"""
+    col = raw['חודש'].astype(str) if 'חודש' in raw else raw['תאריך']
+    months = pd.DatetimeIndex(pd.to_datetime(col)).to_period('M')
+    ref = pd.Period(ref_month, freq='M') if ref_month else months.max()
+    return ref.ordinal - months.asi8, ref
+
+
+def _monthly(codes, offsets, values, n):
+    """מטריצה n × 24 של סכומים חודשיים ב-float32 - bincount לכל חודש, בלי מטריצת float64 בגודל מלא"""
+    m = np.empty((n, HISTORY_MONTHS), dtype='float32')
+    for j in range(HISTORY_MONTHS):
+        month = offsets == j
+        m[:, j] = np.bincount(codes[month], weights=values[month], minlength=n)
+    return m
+
+
+def _rollup(codes, n, m):
+    """סכימת שורות המטריצה לפי קבוצה (חנות / מוצר)"""
+    return np.column_stack([np.bincount(codes, weights=m[:, j], minlength=n) for j in range(m.shape[1])])
+
+
+def _window(cs, a, b):
+    """סכום החודשים [a, b) מתוך סכום מצטבר לפי עמודות"""
+    v = cs[:, b - 1].astype('float64')
+    return v - cs[:, a - 1] if a else v
+
+
+def _windows(sales, returns, as_int):
+    """עמודות התקופה מתוך מטריצות חודשיות - סכום מצטבר אחד וחיסור לכל חלון
+
+    הסכום המצטבר נכתב לתוך המטריצות עצמן, כך שאחרי הקריאה הן כבר לא
+    סכומים חודשיים.
+    """
+    np.cumsum(sales, axis=1, out=sales)
+    np.cumsum(returns, axis=1, out=returns)
+    out = {}
+    for col, (a, b) in WINDOWS.items():
+        v = _window(sales, a, b)
+        out[col] = np.round(v).astype('int64') if as_int else v
+    for col, (a, b) in RETURN_WINDOWS.items():
+        ret = _window(returns, a, b)
+        sold = np.abs(_window(sales, a, b))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[col] = np.where(sold > 0, ret / np.where(sold > 0, sold, 1), 0.0)
+    return out
+
+
+def _info(raw, info, key, raw_key, columns):
+    """פרטי חנות / מוצר: מטבלת פרטים אם ניתנה, אחרת הערך הראשון בקלט הגולמי"""
+    have = [c for c in columns if c in raw]
+    from_raw = raw.groupby(raw_key, sort=False)[have].first().rename(columns=columns) if have else None
+    frames = [f for f in (info.set_index(key) if info is not None else None, from_raw) if f is not None]
+    if not frames:
+        return pd.DataFrame(index=pd.Index([], name=key))
+    merged = frames[0]
+    for f in frames[1:]:
+        merged = merged.combine_first(f)
+    return merged
+
+
+def _info_values(info, col):
+    """עמודת פרטים כמערך, עם ערך חסר כמו בקבצים הקיימים"""
+    if col not in info:
+        return np.full(len(info), MISSING, dtype=object)
+    v = info[col].to_numpy(dtype=object)
+    v[pd.isna(v)] = MISSING
+    return v
+
+
+def aggregate(raw, stores_info=None, products_info=None, ref_month=None):
+    """מכירות גולמיות -> (stores, products, sp, חודש ייחוס)
+
+    כל העמודות מחושבות במעבר אחד: שורות הקלט נצברות למטריצה חודשית לכל
+    זוג חנות × מוצר, ומשם לחנויות ולמוצרים. החלונות עצמם הם חיסור של סכום
+    מצטבר, כך שחודש ייחוס אחר הוא רק היסט אחר.
+    """
+    offsets, ref = month_offsets(raw, ref_month)
+    keep = (offsets >= 0) & (offsets < HISTORY_MONTHS)
+    rows = raw[keep]
+    offsets = offsets[keep]
+
+    pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([rows['מזהה_חנות'], rows['מזהה_מוצר']]))
+    sales_raw = rows['מכירות']
+    as_int = pd.api.types.is_integer_dtype(sales_raw)
+    sales = _monthly(pair_codes, offsets, sales_raw.to_numpy(dtype='float64'), len(pairs))
+    ret_raw = rows['חזרות'].to_numpy(dtype='float64') if 'חזרות' in rows else np.zeros(len(rows))
+    returns = _monthly(pair_codes, offsets, ret_raw, len(pairs))
+
+    pair_store = pairs.get_level_values(0).to_numpy()
+    pair_prod = pairs.get_level_values(1).to_numpy()
+    store_ids = np.union1d(pair_store, stores_info['מזהה'] if stores_info is not None else pair_store)
+    prod_ids = np.union1d(pair_prod, products_info['מזהה'] if products_info is not None else pair_prod)
+    s_codes = np.searchsorted(store_ids, pair_store)
+    p_codes = np.searchsorted(prod_ids, pair_prod)
+
+    store_info = _info(raw, stores_info, 'מזהה', 'מזהה_חנות', STORE_INFO).reindex(store_ids)
+    prod_info = _info(raw, products_info, 'מזהה', 'מזהה_מוצר', PRODUCT_INFO).reindex(prod_ids)
+
+    # חנויות ומוצרים - לפני עמודות הזוגות, שדורסות את המטריצות החודשיות
+    stores = pd.DataFrame({'מזהה': store_ids})
+    for c in ['שם חנות', 'עיר']:
+        stores[c] = _info_values(store_info, c)
+    stores = stores.assign(**_windows(_rollup(s_codes, len(store_ids), sales),
+                                      _rollup(s_codes, len(store_ids), returns), as_int))
+
+    products = pd.DataFrame({'מזהה': prod_ids})
+    for c in ['מוצר', 'קטגוריה', 'סיווג']:
+        products[c] = _info_values(prod_info, c)
+    products = products.assign(**_windows(_rollup(p_codes, len(prod_ids), sales),
+                                          _rollup(p_codes, len(prod_ids), returns), as_int))
+
+    sold = (sales != 0).any(axis=1)
+    pair_cols = _windows(sales, returns, as_int)
+    del sales, returns
+    products['חנויות_שנה1'] = np.bincount(p_codes, weights=pair_cols['שנה1'] > 0, minlength=len(prod_ids)).astype('int64')
+    products['חנויות_שנה2'] = np.bincount(p_codes, weights=pair_cols['שנה2'] > 0, minlength=len(prod_ids)).astype('int64')
+
+    # חנויות × מוצרים - זוגות עם מכירות בחלון
+    sp = pd.DataFrame({
+        'מזהה_חנות': pair_store,
+        'שם_חנות': stores['שם חנות'].to_numpy()[s_codes],
+        'עיר': stores['עיר'].to_numpy()[s_codes],
+        'מזהה_מוצר': pair_prod,
+        'מוצר': products['מוצר'].to_numpy()[p_codes],
+        'סיווג': products['סיווג'].to_numpy()[p_codes],
+        **{c: pair_cols[c] for c in SP_COLUMNS[6:]},
+    })
+    sp = sp[sold].sort_values(['מזהה_חנות', 'מזהה_מוצר'], ignore_index=True)
+    return stores[STORE_COLUMNS], products[PRODUCT_COLUMNS], sp[SP_COLUMNS], str(ref)
+
+
+def write(out_dir, stores, products, sp, ref_month):
+    """כתיבת קבצי הנתונים וקובץ המטא-נתונים לתיקייה"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in [('stores', stores), ('products', products), ('sp', sp)]:
+        df.to_json(out_dir / data_io.DATA_FILES[name], orient='records', force_ascii=False)
+    data_io.write_meta(out_dir, {'ref_month': ref_month})
+
+
+def read_any(path):
+    path = Path(path)
+    readers = {'.csv': pd.read_csv, '.json': pd.read_json, '.feather': pd.read_feather, '.parquet': pd.read_parquet}
+    if path.suffix not in readers:
+        raise ValueError(f"סוג קובץ לא נתמך: {path.suffix}")
+    return readers[path.suffix](path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="צבירת מכירות גולמיות לקבצי הנתונים של הדשבורד")
+    ap.add_argument('raw', help="קובץ מכירות גולמי (csv / json / feather / parquet)")
+    ap.add_argument('--out', default=str(data_io.DATA_DIR), help="תיקיית פלט")
+    ap.add_argument('--ref-month', help="חודש ייחוס YYYY-MM (סוף שנה2). ברירת מחדל: החודש האחרון בנתונים")
+    ap.add_argument('--stores-info', help="טבלת פרטי חנויות: מזהה, שם חנות, עיר")
+    ap.add_argument('--products-info', help="טבלת פרטי מוצרים: מזהה, מוצר, קטגוריה, סיווג")
+    args = ap.parse_args(argv)
+
+    stores_info = read_any(args.stores_info) if args.stores_info else None
+    products_info = read_any(args.products_info) if args.products_info else None
+    stores, products, sp, ref = aggregate(read_any(args.raw), stores_info, products_info, args.ref_month)
+    write(args.out, stores, products, sp, ref)
+    print(json.dumps({'ref_month': ref, 'stores': len(stores), 'products': len(products), 'sp': len(sp)},
+                     ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""בדיקת אזעקות והתאוששות לכל החנויות, בלי ממשק - פעם אחת לכל גרסת נתונים
+
+    python alerts.py                 # על תיקיית הנתונים של האפליקציה
+    python alerts.py /data --sp      # גם חנות × מוצר
+
+החוקים (כמו בלשונית האזעקות, בספי ברירת המחדל): אזעקה - חנות פעילה
+ששינוי ה-2v2 שלה מתחת לסף; התאוששות - חנות בשחיקה או בסכנה עם 2v2 חיובי.
+עם --sp אותם חוקים נבדקים גם לכל שורת חנות × מוצר בחנויות הפעילות.
+התוצאה נשמרת בתיקיית alerts ליד הנתונים, עם השוואה לתמונת המצב הקודמת:
+כל אזעקה מסומנת חדשה או ממשיכה, ואזעקות שנעלמו נשמרות כנפתרו.
+האפליקציה מריצה את אותה בדיקה ברקע כשגרסת הנתונים מתחלפת.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_io
+import pipeline
+from metrics import DEFAULT_TH, chg_col, status_col
+
+ALERTS_DIR = 'alerts'
+KEEP = 30   # תמונות מצב שנשמרות לכל סט ספים
+# חנות × מוצר גם באפליקציה - רק כשמבקשים (ALERTS_SP=1), כי התוצאה גדולה
+WITH_SP = os.environ.get('ALERTS_SP') == '1'
+
+ALERT, RECOVERY = 'אזעקה', 'התאוששות'
+STORE, PRODUCT = 'חנות', 'מוצר'
+NEW, PERSISTING, RESOLVED = 'חדשה', 'ממשיכה', 'נפתרה'
+KEY = ['סוג', 'רמה', 'מזהה_חנות', 'מזהה_מוצר']
+COLUMNS = KEY + ['שם חנות', 'עיר', 'מוצר', 'שנה2', 'שינוי_2v2']
+RISK = ['שחיקה', 'סכנה']
+
+
+def _rules(change, status, th):
+    """מסכות אזעקה והתאוששות - וקטורית על כל השורות"""
+    return change < th['אזעקה'], np.isin(status, RISK) & (change > 0)
+
+
+def store_alerts(stores, th):
+    """אזעקות והתאוששויות לחנויות הפעילות. stores עם מדדים וסטטוס (pipeline.prepare)"""
+    active = stores[stores['2v2_אחרון'] > 0]
+    change = active['שינוי_2v2'].to_numpy(dtype='float64')
+    alert, recovery = _rules(change, active['סטטוס'].to_numpy(), th)
+    parts = []
+    for kind, mask in ((ALERT, alert), (RECOVERY, recovery)):
+        part = active[mask]
+        parts.append(pd.DataFrame({
+            'סוג': kind, 'רמה': STORE, 'מזהה_חנות': part['מזהה'].to_numpy(), 'מזהה_מוצר': -1,
+            'שם חנות': part['שם חנות'].to_numpy(), 'עיר': part['עיר'].to_numpy(dtype=object), 'מוצר': '',
+            'שנה2': part['שנה2'].to_numpy(), 'שינוי_2v2': part['שינוי_2v2'].to_numpy(),
+        }, columns=COLUMNS))
+    return pd.concat(parts, ignore_index=True)
+
+
+def sp_alerts(sp, active_ids, th):
+    """אותם חוקים לכל שורת חנות × מוצר בחנויות הפעילות"""
+    rows = sp[sp['מזהה_חנות'].isin(active_ids).to_numpy()]
+    change = chg_col(rows['2v2_אחרון'], rows['2v2_קודם'])
+    alert, recovery = _rules(change, status_col(rows, th), th)
+    parts = []
+    for kind, mask in ((ALERT, alert), (RECOVERY, recovery)):
+        part = rows[mask]
+        parts.append(pd.DataFrame({
+            'סוג': kind, 'רמה': PRODUCT, 'מזהה_חנות': part['מזהה_חנות'].to_numpy(),
+            'מזהה_מוצר': part['מזהה_מוצר'].to_numpy(), 'שם חנות': part['שם_חנות'].to_numpy(dtype=object),
+            'עיר': part['עיר'].to_numpy(dtype=object), 'מוצר': part['מוצר'].to_numpy(dtype=object),
+            'שנה2': part['שנה2'].to_numpy(), 'שינוי_2v2': change[mask],
+        }, columns=COLUMNS))
+    return pd.concat(parts, ignore_index=True)
+
+
+def evaluate(stores, th=DEFAULT_TH, sp=None):
+    """כל האזעקות וההתאוששויות: חנויות, ואם sp נתון - גם חנות × מוצר"""
+    out = store_alerts(stores, th)
+    if sp is not None:
+        active_ids = stores.loc[stores['2v2_אחרון'] > 0, 'מזהה'].to_numpy()
+        out = pd.concat([out, sp_alerts(sp, active_ids, th)], ignore_index=True)
+    return out
+
+
+def diff(current, previous):
+    """'מצב' לכל אזעקה מול תמונת המצב הקודמת, ובסוף השורות שנפתרו מאז"""
+    current = current.assign(מצב=NEW)
+    if previous is None:
+        return current
+    previous = previous[previous['מצב'] != RESOLVED]
+    cur_key = pd.MultiIndex.from_frame(current[KEY])
+    prev_key = pd.MultiIndex.from_frame(previous[KEY])
+    current.loc[cur_key.isin(prev_key), 'מצב'] = PERSISTING
+    resolved = previous[~prev_key.isin(cur_key)].assign(מצב=RESOLVED)
+    return pd.concat([current, resolved], ignore_index=True)
+
+
+# ========================================
+# תמונות מצב בדיסק - קובץ לכל גרסת נתונים וסט ספים
+# ========================================
+def alerts_dir(data_dir=data_io.DATA_DIR):
+    return Path(data_dir) / ALERTS_DIR
+
+
+def snapshot_key(th, with_sp=False):
+    """סדרת תמונות מצב: הספים והאם נבדקו גם שורות חנות × מוצר"""
+    key = hashlib.sha1(json.dumps(th, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{key}-sp" if with_sp else key
+
+
+def _snapshots(data_dir, key):
+    """קבצי תמונות המצב של הסדרה, מהישן לחדש (השם מתחיל בזמן היצירה)"""
+    return sorted(alerts_dir(data_dir).glob(f"*_{key}.json"))
+
+
+def _read(path):
+    snap = json.loads(path.read_text(encoding='utf-8'))
+    snap['alerts'] = pd.DataFrame(snap['alerts'], columns=COLUMNS + ['מצב'])
+    return snap
+
+
+def load(version, data_dir=data_io.DATA_DIR, th=DEFAULT_TH, with_sp=WITH_SP):
+    """תמונת המצב של הגרסה, או None אם עוד לא חושבה"""
+    for path in reversed(_snapshots(data_dir, snapshot_key(th, with_sp))):
+        if path.stem.split('_')[1] == version:
+            return _read(path)
+    return None
+
+
+def run(stores, version, data_dir=data_io.DATA_DIR, th=DEFAULT_TH, sp=None):
+    """בדיקה, השוואה לתמונת המצב הקודמת ושמירה. גרסה שכבר חושבה נקראת מהדיסק
+
+    stores עם מדדים וסטטוס לפי th. מחזיר {'version', 'previous', 'created',
+    'th', 'alerts'} - alerts עם עמודת 'מצב'.
+    """
+    key = snapshot_key(th, sp is not None)
+    done = load(version, data_dir, th, sp is not None)
+    if done is not None:
+        return done
+    files = [p for p in _snapshots(data_dir, key) if p.stem.split('_')[1] != version]
+    previous = _read(files[-1]) if files else None
+    snap = {
+        'version': version,
+        'previous': previous['version'] if previous else None,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'th': th,
+        'alerts': diff(evaluate(stores, th, sp), previous['alerts'] if previous else None),
+    }
+    # כתיבה לשם זמני והחלפה, כך שתהליך אחר לא קורא קובץ חלקי
+    folder = alerts_dir(data_dir)
+    folder.mkdir(exist_ok=True)
+    path = folder / f"{time.time_ns()}_{version}_{key}.json"
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps({**snap, 'alerts': snap['alerts'].to_dict('records')}, ensure_ascii=False),
+                   encoding='utf-8')
+    os.replace(tmp, path)
+    for old in _snapshots(data_dir, key)[:-KEEP]:
+        old.unlink(missing_ok=True)
+    return snap
+
+
+def run_frames(stores, products, sp, version, data_dir=data_io.DATA_DIR, th=DEFAULT_TH, with_sp=WITH_SP):
+    """run() על טבלאות גולמיות כפי שנטענו - מחשב מדדים וסטטוס בעצמו"""
+    stores, _ = pipeline.prepare(stores, products, th)
+    return run(stores, version, data_dir, th, sp if with_sp and sp is not None else None)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="בדיקת אזעקות לגרסת הנתונים והשוואה לקודמת")
+    ap.add_argument('data_dir', nargs='?', default=str(data_io.DATA_DIR))
+    ap.add_argument('--sp', action='store_true', help="גם אזעקות חנות × מוצר")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    stores, products = (data_io.read_frame(name, args.data_dir)[0] for name in ('stores', 'products'))
+    sp = data_io.read_frame('sp', args.data_dir)[0] if args.sp else None
+    snap = run_frames(stores, products, sp, data_io.data_version(args.data_dir), args.data_dir, with_sp=args.sp)
+    counts = snap['alerts'].groupby(['רמה', 'סוג', 'מצב']).size()
+    print(f"🚨 גרסה {snap['version']} (קודמת: {snap['previous']}) ב-{time.perf_counter() - t0:.2f} שניות")
+    for (level, kind, state), n in counts.items():
+        print(f"  {level:6} {kind:10} {state:8} {n}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
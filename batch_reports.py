@@ -0,0 +1,127 @@
+"""הפקת דוחות PDF לחנויות באצווה, מחוץ לאפליקציה
+
+    python batch_reports.py                      # zip לכל סוכן לפי AGENTS_DATA
+    python batch_reports.py --agent יוסף          # סוכן אחד
+    python batch_reports.py --all --workers 8     # גם zip לכל החנויות הפעילות
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+import data_io
+import pipeline
+import similar
+from agents import AGENTS_DATA
+from metrics import DEFAULT_TH
+from pdf_report import cached_store_pdf, preload_fonts, report_key
+from sp_index import build_index
+
+ALL_STORES = 'כל_החנויות'
+
+
+def _render(sid, key, info, sp2, missing_products, labels, recs):
+    """רץ בתהליך עובד. שגיאה בחנות אחת חוזרת כטקסט ולא עוצרת את האצווה"""
+    try:
+        return sid, cached_store_pdf(key, info, sp2, missing_products, labels, recs), None
+    except Exception as e:
+        return sid, None, f"{type(e).__name__}: {e}"
+
+
+def report_name(info):
+    name = str(info['שם חנות']).replace('/', '-')
+    return f"דוח_חנות_{info['מזהה']}_{name}.pdf"
+
+
+def plan(stores, agents, include_all):
+    """{שם zip: [מזהי חנויות]} - חנויות פעילות בלבד, כמו בלשונית בחירת חנות"""
+    active = set(stores.loc[stores['2v2_אחרון'] > 0, 'מזהה'].tolist())
+    groups = {a: [s for s in AGENTS_DATA[a]['stores'] if s in active] for a in agents}
+    if include_all:
+        groups[ALL_STORES] = sorted(active)
+    return groups
+
+
+def run(out_dir, agents, include_all=False, workers=None, th=DEFAULT_TH, data_dir=data_io.DATA_DIR):
+    stores, products, sp, stats = data_io.load_all(data_dir)
+    sp, sp_idx = build_index(sp)
+    stores, products = pipeline.prepare(stores, products, th)
+    by_id = stores.set_index('מזהה', drop=False)
+
+    groups = plan(stores, agents, include_all)
+    targets = {}  # חנות -> רשימת zip שהדוח שלה נכנס אליהם
+    for group, sids in groups.items():
+        for sid in sids:
+            targets.setdefault(sid, []).append(group)
+
+    # שכנים לכל החנויות בדוחות - בבלוקים, ובמקביל כשיש כמה עובדים
+    mix = similar.mix_matrix(stores.loc[stores['2v2_אחרון'] > 0, 'מזהה'].to_numpy(), sp)
+    pos = pd.Index(mix['store_ids']).get_indexer(list(targets))
+    nbr_idx, nbr_sim = similar.neighbors(mix, pos, workers=workers)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    zips = {g: zipfile.ZipFile(out_dir / f"{g}.zip", 'w', zipfile.ZIP_DEFLATED) for g in groups}
+    failures = {}
+    done = 0
+    t0 = time.perf_counter()
+    # הגופנים מוקטנים פעם אחת כאן, והעובדים רק קוראים את הקובץ המוקטן
+    preload_fonts()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=preload_fonts) as pool:
+            futures = []
+            for i, sid in enumerate(targets):
+                info = by_id.loc[sid]
+                sp2, missing_products = pipeline.store_products(sp, sp_idx, products, sid)
+                recs = similar.with_products(similar.recommend(mix, pos[i], nbr_idx[i], nbr_sim[i],
+                                                               top_n=len(mix['product_ids'])), products)
+                key = report_key(sid, stats['version'], th)
+                futures.append(pool.submit(_render, sid, key, info, sp2, missing_products, stats['labels'], recs))
+            for fut in as_completed(futures):
+                sid, pdf_bytes, err = fut.result()
+                if err:
+                    failures[sid] = err
+                    print(f"❌ חנות {sid}: {err}", file=sys.stderr)
+                    continue
+                name = report_name(by_id.loc[sid])
+                for group in targets[sid]:
+                    zips[group].writestr(name, pdf_bytes)
+                done += 1
+    finally:
+        for z in zips.values():
+            z.close()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        'pdfs': done,
+        'failed': failures,
+        'seconds': elapsed,
+        'pdfs_per_sec': done / elapsed if elapsed > 0 else 0.0,
+        'zips': {g: str(out_dir / f"{g}.zip") for g in groups},
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="הפקת דוחות PDF לחנויות באצווה")
+    ap.add_argument('--out', default='reports', help="תיקיית פלט לקבצי ה-zip")
+    ap.add_argument('--agent', action='append', choices=list(AGENTS_DATA), help="סוכן (אפשר כמה פעמים). ברירת מחדל: כולם")
+    ap.add_argument('--all', action='store_true', help="גם zip של כל החנויות הפעילות (מנהל)")
+    ap.add_argument('--workers', type=int, default=os.cpu_count(), help="מספר תהליכים")
+    ap.add_argument('--data-dir', default=str(data_io.DATA_DIR))
+    args = ap.parse_args(argv)
+
+    agents = args.agent or list(AGENTS_DATA)
+    res = run(args.out, agents, include_all=args.all, workers=args.workers, data_dir=args.data_dir)
+    for group, path in res['zips'].items():
+        print(f"📦 {group}: {path}")
+    print(f"✅ {res['pdfs']} דוחות ב-{res['seconds']:.1f} שניות ({res['pdfs_per_sec']:.1f} PDF/שנייה), {len(res['failed'])} נכשלו")
+    return 1 if res['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
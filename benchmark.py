@@ -0,0 +1,292 @@
+"""מדידת ביצועים של שלבי הדשבורד על נתונים סינתטיים בכמה גדלים
+
+    python benchmark.py                                   # small, תוצאות ל-bench_results.json
+    python benchmark.py --size small --size medium --out results.json
+    python benchmark.py --data-dir .                      # על עותק של הנתונים האמיתיים
+    python benchmark.py --compare base.json               # השוואה לריצה קודמת (יציאה 1 בהאטה)
+
+עם --data-dir הקבצים מועתקים קודם לתיקיית העבודה, כך שקבצי Feather,
+SQLite והאזעקות של המדידה לא נכתבים ליד הנתונים שהאפליקציה קוראת.
+התוצאות נשמרות כ-JSON: לכל גודל ולכל שלב זמני הריצות בשניות, כך שאפשר
+להשוות בין גרסאות.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import charts
+import data_io
+import exports
+import pipeline
+import rollup
+import similar
+import sql_store
+import synth_data
+from filter_index import FilterIndex, value_masks
+from metrics import DEFAULT_TH
+from pdf_report import create_store_pdf, preload_fonts
+from potential import presence_stats, potential_table
+from sp_index import build_index, product_rows
+
+BENCH_DIR = Path(tempfile.gettempdir()) / 'sales_dashboard_bench'
+SAMPLE = 20        # חנויות / מוצרים לבדיקת שליפת פרטים
+AGENT_SHARE = 10   # סוכן סינתטי: כל חנות עשירית
+TOLERANCE = 1.2
+MIN_DELTA = 0.005   # הפרשים קטנים מזה הם רעש מדידה
+
+
+def _timed(fn, repeat):
+    """הרצה repeat פעמים. מחזיר את התוצאה האחרונה ואת רשימת הזמנים"""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        runs.append(time.perf_counter() - t0)
+    return out, runs
+
+
+def _step(runs, per=1):
+    runs = [r / per for r in runs]
+    return {'seconds': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def _revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _cold_start(data_dir):
+    """שניות עד שמסך הכניסה מוכן, בתהליך חדש: ייבוא streamlit והאפליקציה והרצה ראשונה.
+    האפליקציה קוראת מ-data_dir (דרך DATA_DIR) ומתחילה בו את הטעינה ברקע"""
+    app = Path(__file__).parent / 'streamlit_app.py'
+    code = ('import time; t0 = time.perf_counter(); from streamlit.testing.v1 import AppTest; '
+            f'AppTest.from_file({str(app)!r}, default_timeout=120).run(); print(time.perf_counter() - t0)')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).parent, env={**os.environ, 'DATA_DIR': str(data_dir)})
+    return float(out.stdout.split()[-1])
+
+
+def _copy_inputs(src, dst):
+    """העתקת קבצי הנתונים לתיקיית עבודה - ההמרה, SQLite והאזעקות נכתבים שם ולא ליד הנתונים החיים"""
+    src, dst = Path(src).resolve(), Path(dst).resolve()
+    if dst == src or dst in src.parents:
+        raise ValueError(f"תיקיית העבודה {dst} מכילה את תיקיית הנתונים - בחרו --work-dir אחר")
+    if dst.exists():
+        shutil.rmtree(dst)
+    dst.mkdir(parents=True)
+    for name, file in data_io.DATA_FILES.items():
+        path = src / file
+        if not path.exists():  # רק קובץ עמודתי - מעתיקים אותו
+            path = data_io.columnar_path(name, src)
+        if path.exists():
+            shutil.copy2(path, dst)
+    if (src / data_io.META_FILE).exists():
+        shutil.copy2(src / data_io.META_FILE, dst)
+    return dst
+
+
+def _load(data_dir):
+    stores, products, sp, stats = data_io.load_all(data_dir)
+    sp, sp_idx = build_index(sp)
+    return stores, products, sp, sp_idx, stats
+
+
+def bench(data_dir, repeat=3, columnar=True, sqlite=False):
+    """מדידת כל השלבים על תיקיית נתונים אחת. מחזיר {'rows', 'formats', 'steps'}"""
+    steps = {}
+    steps['cold_login'] = _step([_cold_start(data_dir) for _ in range(repeat)])
+    # טעינה מ-JSON רק בפעם הראשונה - אחרי המרה הטעינה היא מהקבצים העמודתיים
+    (stores, products, sp, sp_idx, stats), runs = _timed(lambda: _load(data_dir), 1)
+    steps['load_data'] = _step(runs)
+    formats = {'load_data': sorted(set(stats['formats'].values()))}
+    if columnar and data_io.feather is not None:
+        _, runs = _timed(lambda: data_io.convert(data_dir), 1)
+        steps['convert'] = _step(runs)
+        (stores, products, sp, sp_idx, stats), runs = _timed(lambda: _load(data_dir), repeat)
+        steps['load_columnar'] = _step(runs)
+        formats['load_columnar'] = sorted(set(stats['formats'].values()))
+
+    (stores, products), runs = _timed(lambda: pipeline.static_metrics(stores, products), repeat)
+    steps['static_metrics'] = _step(runs)
+    (store_status, product_status), runs = _timed(lambda: pipeline.classify(stores, products, DEFAULT_TH), repeat)
+    steps['classify'] = _step(runs)
+    stores = pipeline.with_status(stores, store_status, 'דירוג_מכירות')
+    products = pipeline.with_status(products, product_status, 'דירוג')
+
+    rows, runs = _timed(lambda: pipeline.filter_rows(stores, products, None, [], [], 'הכל', 'הכל'), repeat)
+    steps['filter_admin'] = _step(runs)
+    active = stores.iloc[rows['active']]
+    agent = active['מזהה'].iloc[::AGENT_SHARE].tolist()
+
+    # שינוי סינון על אינדקס קיים - מה שקורה באפליקציה בכל בחירה
+    index, runs = _timed(lambda: FilterIndex(stores, products), repeat)
+    steps['filter_index'] = _step(runs)
+    status_masks = value_masks(stores['סטטוס'])
+    city = next(iter(index.city))
+    ex_stores, ex_products = agent[:20], products['מזהה'].iloc[:5].tolist()
+    _, runs = _timed(lambda: index.rows(status_masks, ex_stores, ex_products, city, 'צמיחה'), repeat)
+    steps['filter_change'] = _step(runs)
+
+    def agent_filter():
+        a_stores, a_sp, a_idx = pipeline.partition(stores, sp, sp_idx, agent)
+        return pipeline.filter_rows(a_stores, products, agent, [], [], 'הכל', 'הכל')
+    _, runs = _timed(agent_filter, repeat)
+    steps['filter_agent'] = _step(runs)
+
+    sids = active['מזהה'].iloc[np.linspace(0, len(active) - 1, min(SAMPLE, len(active))).astype(int)].tolist()
+    _, runs = _timed(lambda: [pipeline.store_products(sp, sp_idx, products, s) for s in sids], repeat)
+    steps['store_detail'] = _step(runs, len(sids))
+    pids = products['מזהה'].iloc[np.linspace(0, len(products) - 1, min(SAMPLE, len(products))).astype(int)].tolist()
+    active_ids = active['מזהה']
+    _, runs = _timed(lambda: [(lambda ps: ps[ps['מזהה_חנות'].isin(active_ids)])(product_rows(sp, sp_idx, p))
+                              for p in pids], repeat)
+    steps['product_detail'] = _step(runs, len(pids))
+
+    def potential():
+        sp_act = sp[sp['מזהה_חנות'].isin(active_ids)]
+        return potential_table(active, presence_stats(active_ids.to_numpy(), sp_act), 0.7)
+    _, runs = _timed(potential, repeat)
+    steps['potential'] = _step(runs)
+
+    mix, runs = _timed(lambda: similar.mix_matrix(active_ids.to_numpy(), sp), repeat)
+    steps['similar_matrix'] = _step(runs)
+    _, runs = _timed(lambda: [similar.store_recommendations(mix, s, products) for s in sids], repeat)
+    steps['similar_store'] = _step(runs, len(sids))
+    # שכנים לכל החנויות בבלוקים, כמו בהפקת דוחות באצווה
+    _, runs = _timed(lambda: similar.neighbors(mix, workers=os.cpu_count()), 1)
+    steps['similar_all'] = _step(runs)
+
+    if sqlite:
+        source = sql_store.source_signature(data_dir)
+        _, runs = _timed(lambda: sql_store.build(data_dir, source=source), 1)
+        steps['sql_build'] = _step(runs)
+        db = sql_store.SqlStore(sql_store.db_path(data_dir))
+        _, runs = _timed(lambda: [pipeline.products_of_store(db.store_rows(s), products) for s in sids], repeat)
+        steps['sql_store_detail'] = _step(runs, len(sids))
+        _, runs = _timed(lambda: [db.product_rows(p, active_ids) for p in pids], repeat)
+        steps['sql_product_detail'] = _step(runs, len(pids))
+        _, runs = _timed(lambda: potential_table(active, db.presence(active_ids.to_numpy()), 0.7), repeat)
+        steps['sql_potential'] = _step(runs)
+
+    cube, runs = _timed(lambda: rollup.store_cube(stores, {'agent': agent}), repeat)
+    steps['rollup_build'] = _step(runs)
+    excluded = active[active['מזהה'].isin(agent[:5])]
+    _, runs = _timed(lambda: rollup.select(rollup.agent_view(cube, 'agent', excluded), status='צמיחה'), repeat)
+    steps['rollup_view'] = _step(runs)
+
+    # סיכומי הגרפים בכל ריצה, ובניית הגרפים עצמם (באפליקציה רק כשהסיכום משתנה)
+    aggs, runs = _timed(lambda: (charts.status_counts(active), charts.city_totals(active), charts.class_totals(products)), repeat)
+    steps['chart_aggregates'] = _step(runs)
+    _, runs = _timed(lambda: (charts.status_pie(aggs[0]), charts.city_bar(aggs[1]), charts.class_pie(aggs[2])), repeat)
+    steps['chart_figures'] = _step(runs)
+
+    # בלי המטמון של exports, כדי למדוד את הכתיבה עצמה
+    _, runs = _timed(lambda: exports._build({'חנויות': stores}), repeat)
+    steps['to_excel'] = _step(runs)
+
+    _, runs = _timed(preload_fonts, 1)
+    steps['pdf_fonts'] = _step(runs)
+    info = active.iloc[0]
+    sp2, missing = pipeline.store_products(sp, sp_idx, products, info['מזהה'])
+    _, runs = _timed(lambda: create_store_pdf(info, sp2, missing), repeat)
+    steps['create_store_pdf'] = _step(runs)
+
+    return {
+        'rows': {'stores': len(stores), 'products': len(products), 'sp': len(sp), 'agent_stores': len(agent)},
+        'formats': formats,
+        'steps': steps,
+    }
+
+
+def run(sizes, repeat=3, data_dir=None, work_dir=BENCH_DIR, columnar=True, seed=0, sqlite=False):
+    results = {
+        'meta': {
+            'revision': _revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': repeat,
+        },
+        'runs': [],
+    }
+    if data_dir is not None:
+        targets = [('data', None, _copy_inputs(data_dir, Path(work_dir) / 'data'))]
+    else:
+        targets = [(size, synth_data.SIZES[size], Path(work_dir) / size) for size in sizes]
+    for size, params, path in targets:
+        if params is not None:
+            for f in path.glob('data_*.feather'):  # כל ריצה מתחילה מ-JSON
+                f.unlink()
+            t0 = time.perf_counter()
+            synth_data.generate(path, seed=seed, **params)
+            print(f"🧪 {size}: נתונים נוצרו ב-{time.perf_counter() - t0:.1f} שניות", file=sys.stderr)
+        res = bench(path, repeat=repeat, columnar=columnar, sqlite=sqlite)
+        results['runs'].append({'size': size, 'params': params, **res})
+        for name, s in res['steps'].items():
+            print(f"  {size:8} {name:18} {s['seconds'] * 1000:10.1f} ms", file=sys.stderr)
+    return results
+
+
+def compare(base, new):
+    """[(גודל, שלב, זמן בסיס, זמן חדש, יחס)] לשלבים שמופיעים בשתי הריצות"""
+    base_steps = {r['size']: r['steps'] for r in base['runs']}
+    out = []
+    for r in new['runs']:
+        for name, s in r['steps'].items():
+            b = base_steps.get(r['size'], {}).get(name)
+            if b and b['seconds'] > 0:
+                out.append((r['size'], name, b['seconds'], s['seconds'], s['seconds'] / b['seconds']))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="מדידת ביצועים של שלבי הדשבורד")
+    ap.add_argument('--size', action='append', choices=list(synth_data.SIZES), help="גודל (אפשר כמה פעמים). ברירת מחדל: small")
+    ap.add_argument('--data-dir', help="מדידה על תיקיית נתונים קיימת במקום נתונים סינתטיים")
+    ap.add_argument('--work-dir', default=str(BENCH_DIR), help="היכן ליצור את הנתונים הסינתטיים (ואת העותק של --data-dir)")
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--no-columnar', action='store_true', help="בלי המרה ל-Feather ומדידת טעינה עמודתית")
+    ap.add_argument('--sqlite', action='store_true', help="גם בניית מאגר SQLite ושליפות ממנו")
+    ap.add_argument('--out', default='bench_results.json')
+    ap.add_argument('--compare', help="קובץ תוצאות קודם להשוואה")
+    ap.add_argument('--tolerance', type=float, default=TOLERANCE, help="יחס האטה מקסימלי לפני כישלון")
+    args = ap.parse_args(argv)
+
+    results = run(args.size or ['small'], repeat=args.repeat, data_dir=args.data_dir,
+                  work_dir=args.work_dir, columnar=not args.no_columnar, sqlite=args.sqlite)
+    Path(args.out).write_text(json.dumps(results, ensure_ascii=False, indent=1), encoding='utf-8')
+    print(f"📄 {args.out}", file=sys.stderr)
+
+    if not args.compare:
+        return 0
+    base = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+    slower = 0
+    for size, name, b, n, ratio in compare(base, results):
+        worse = ratio > args.tolerance and n - b > MIN_DELTA
+        slower += worse
+        flag = '⚠️' if worse else ''
+        print(f"{size:8} {name:18} {b * 1000:10.1f} → {n * 1000:10.1f} ms  x{ratio:.2f} {flag}")
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
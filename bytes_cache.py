@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# ========================================
+# מטמון LRU לקבצים שנוצרו (אקסל, PDF) - בזיכרון ואופציונלית בדיסק
+# ========================================
+
+
+class BytesLRU:
+    """מטמון LRU של bytes מוגבל בגודל כולל. עם disk_dir נשמר גם בדיסק המקומי"""
+
+    def __init__(self, max_mb, disk_dir=None, disk_max_mb=None, suffix='.bin'):
+        self.max_bytes = max_mb * 1024 ** 2
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = (disk_max_mb if disk_max_mb is not None else max_mb * 4) * 1024 ** 2
+        self.suffix = suffix
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.disk_dir / (hashlib.sha1(repr(key).encode()).hexdigest() + self.suffix)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        if self.disk_dir is not None:
+            path = self._path(key)
+            if path.exists():
+                data = path.read_bytes()
+                os.utime(path)
+                self._remember(key, data)
+                return data
+        return None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._trim_disk()
+        return data
+
+    def get_or_create(self, key, build):
+        data = self.get(key)
+        return data if data is not None else self.put(key, build())
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= len(old)
+
+    def _trim_disk(self):
+        files = []
+        for p in self.disk_dir.glob('*' + self.suffix):
+            try:
+                files.append((p.stat(), p))
+            except FileNotFoundError:  # נמחק בינתיים ע"י תהליך אחר
+                continue
+        files.sort(key=lambda f: f[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, p in files[:-1]:
+            if total <= self.disk_max_bytes:
+                break
+            total -= stat.st_size
+            p.unlink(missing_ok=True)
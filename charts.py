@@ -0,0 +1,91 @@
+import pandas as pd
+
+from formatting import fmt_num_col
+
+# ========================================
+# גרפים - נבנים מסיכומים קטנים (זוגות ערכים) ולא מהטבלאות עצמן,
+# כך שאפשר לשמור אותם במטמון לפי הסיכום, וגודלם לא תלוי במספר השורות.
+# plotly נטען רק כשבונים גרף ראשון, כדי שמסך הכניסה לא יחכה לו
+# ========================================
+STATUS_COLORS = {'צמיחה': '#28a745', 'יציב': '#17a2b8', 'שחיקה': '#ffc107', 'התאוששות': '#9c27b0', 'סכנה': '#dc3545', 'חדש/ה': '#ff9800'}
+OTHER = 'אחר'
+OTHER_COLOR = '#adb5bd'
+TOP_CITIES = 10
+TOP_CLASSES = 12
+TOP_PRODUCTS = 15
+
+
+def top_n(totals, n, other=OTHER):
+    """n הגדולים (ממוינים), והשאר מסוכמים לזוג אחד 'אחר'"""
+    totals = totals.sort_values(ascending=False, kind='stable')
+    pairs = list(zip(totals.index.tolist(), totals.tolist()))
+    if len(pairs) > n:
+        pairs = pairs[:n] + [(other, sum(v for _, v in pairs[n:]))]
+    return tuple(pairs)
+
+
+def status_counts(df):
+    """(סטטוס, כמות) לפי סדר השכיחות"""
+    sc = df['סטטוס'].value_counts()
+    return tuple(zip(sc.index.tolist(), sc.tolist()))
+
+
+def city_totals(df, n=TOP_CITIES):
+    with_city = df[df['עיר'].notna() & (df['עיר'] != '')]
+    return top_n(with_city.groupby('עיר', observed=True)['שנה2'].sum(), n)
+
+
+def class_totals(df, n=TOP_CLASSES):
+    return top_n(df.groupby('סיווג', observed=True)['שנה2'].sum(), n)
+
+
+def top_products(sp2, n=TOP_PRODUCTS):
+    """(מוצר, מכירות, סיווג) ל-n המוצרים הנמכרים בחנות"""
+    top = sp2.nlargest(n, 'שנה2')
+    return tuple(zip(top['מוצר'].tolist(), top['שנה2'].tolist(), top['סיווג'].tolist()))
+
+
+def status_pie(counts):
+    import plotly.express as px
+    names = [s for s, _ in counts]
+    fig = px.pie(values=[n for _, n in counts], names=names, color=names, color_discrete_map=STATUS_COLORS, hole=0.4)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+def city_bar(totals):
+    import plotly.express as px
+    cs = pd.DataFrame(list(totals), columns=['עיר', 'שנה2'])
+    fig = px.bar(cs, x='שנה2', y='עיר', orientation='h', text=fmt_num_col(cs['שנה2']))
+    # הגדולה למעלה, ו'אחר' תמיד בתחתית
+    order = [c for c in cs['עיר'] if c != OTHER][::-1]
+    fig.update_layout(yaxis={'categoryorder': 'array', 'categoryarray': ([OTHER] if OTHER in set(cs['עיר']) else []) + order})
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def class_pie(totals):
+    import plotly.express as px
+    cs = pd.DataFrame(list(totals), columns=['סיווג', 'שנה2'])
+    return px.pie(cs, values='שנה2', names='סיווג', color='סיווג', color_discrete_map={OTHER: OTHER_COLOR}, hole=0.3)
+
+
+def products_bar(rows):
+    import plotly.express as px
+    top = pd.DataFrame(list(rows), columns=['מוצר', 'שנה2', 'סיווג'])
+    fig = px.bar(top, x='מוצר', y='שנה2', color='סיווג', text=fmt_num_col(top['שנה2']))
+    fig.update_layout(xaxis_tickangle=-45)
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def trend_line(points):
+    import plotly.graph_objects as go
+    x, y = [p for p, _ in points], [v for _, v in points]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x, y=y, mode='lines+markers+text', text=fmt_num_col(y), textposition='top center', line=dict(width=4, color='#ff4b4b'), marker=dict(size=12)))
+    fig.update_layout(height=400)
+    return fig
+
+
+FIGURES = {f.__name__: f for f in (status_pie, city_bar, class_pie, products_bar, trend_line)}
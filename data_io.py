@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from periods import DEFAULT_REF_MONTH, period_labels
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # בלי pyarrow נשארים עם JSON בלבד
+    feather = None
+
+# ========================================
+# קבצי נתונים - JSON מקורי ו-Feather (Arrow IPC) עמודתי
+# ========================================
+# תיקיית הנתונים - ליד הקוד, או מהמשתנה DATA_DIR (למשל נתונים סינתטיים במדידות)
+DATA_DIR = Path(os.environ.get('DATA_DIR') or Path(__file__).parent)
+DATA_FILES = {
+    'stores': 'data_stores.json',
+    'products': 'data_products.json',
+    'sp': 'data_sp.json',
+}
+# חודש הייחוס של הנתונים (נכתב בצבירה מנתונים גולמיים)
+META_FILE = 'data_meta.json'
+ID_COLUMNS = ['מזהה', 'מזהה_חנות', 'מזהה_מוצר']
+# ערך חסר בעמודת טקסט (למשל עיר): 0 בקבצי ה-JSON, ו-'0' אחרי ההמרה לטקסט
+MISSING_TEXT = (0, '0')
+INT32_MIN, INT32_MAX = np.iinfo('int32').min, np.iinfo('int32').max
+# טבלאות שנקראות בהזרמה ולא ב-json.load (גדלות עם חנויות × מוצרים)
+STREAMED = {'sp'}
+CHUNK_ROWS = 20_000
+READ_CHARS = 1 << 20
+
+
+def columnar_path(name, data_dir=DATA_DIR):
+    return Path(data_dir) / DATA_FILES[name].replace('.json', '.feather')
+
+
+def read_json(name, data_dir=DATA_DIR):
+    path = Path(data_dir) / DATA_FILES[name]
+    if name in STREAMED:
+        return read_json_chunked(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return pd.DataFrame(json.load(f))
+
+
+# ========================================
+# קריאה מוזרמת של מערך JSON גדול
+# ========================================
+_SEP = re.compile(r'[\s,]*')
+
+
+def iter_json_array(path, read_chars=READ_CHARS):
+    """מעבר על רשומות מערך JSON אחת אחת בלי לטעון את כל הקובץ"""
+    dec = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(read_chars).lstrip()
+        if not buf.startswith('['):
+            raise ValueError(f"{path}: מצופה מערך JSON")
+        pos = 1
+        eof = False
+        while True:
+            pos = _SEP.match(buf, pos).end()
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos < len(buf):
+                try:
+                    obj, pos = dec.raw_decode(buf, pos)
+                    yield obj
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            elif eof:
+                raise ValueError(f"{path}: מערך JSON לא נסגר")
+            more = f.read(read_chars)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+
+
+def _chunk_array(name, values, codes):
+    """המרת ערכי עמודה של מקטע אחד למערך מוקלד"""
+    if name in codes:
+        lookup = codes[name]
+        return np.fromiter((-1 if v is None else lookup.setdefault(str(v), len(lookup)) for v in values),
+                           dtype='int32', count=len(values))
+    arr = np.array([np.nan if v is None else v for v in values], dtype='float64')
+    if name in ID_COLUMNS or (not np.isnan(arr).any() and np.array_equal(arr, np.round(arr))
+                              and (len(arr) == 0 or (arr.min() >= INT32_MIN and arr.max() <= INT32_MAX))):
+        return arr.astype('int32')
+    return arr.astype('float32')
+
+
+def _num_text(v):
+    """ערך מספרי כטקסט, כמו str() על הערך המקורי מה-JSON (0 ולא 0.0)"""
+    return str(int(v)) if float(v).is_integer() else str(v)  # str של float32 - הייצוג הקצר
+
+
+def _as_text(parts, lookup):
+    """מקטעים מספריים של עמודה שהתגלה בה טקסט - קידוד מחדש כקודי טקסט"""
+    out = []
+    for p in parts:
+        out.append(np.fromiter((-1 if np.isnan(v) else lookup.setdefault(_num_text(v), len(lookup))
+                                for v in p), dtype='int32', count=len(p)))
+    return out
+
+
+def read_json_chunked(path, chunk_rows=CHUNK_ROWS):
+    """בניית טבלה ממערך JSON במקטעים בגודל קבוע לתוך עמודות מוקלדות
+
+    טקסט נשמר כקודי category כבר בזמן הקריאה, ומספרים כ-int32/float32,
+    כך ששיא הזיכרון הוא הטבלה הסופית ועוד מקטע אחד של רשומות.
+    עמודה עם טקסט באחת הרשומות (למשל 0 בתוך עיר) היא עמודת טקסט כולה,
+    והמספרים בה נשמרים כמחרוזות - כמו compact_frame.
+    """
+    chunks = {}   # עמודה -> רשימת מערכים, אחד לכל מקטע
+    codes = {}    # עמודת טקסט -> {ערך: קוד}
+    order = {}    # סדר הופעת העמודות, כמו ב-DataFrame מרשימת רשומות
+    rows = 0
+    batch = []
+
+    def flush():
+        nonlocal rows
+        # טקסט נקבע לפי כל המקטע ולא לפי הערך הראשון בעמודה
+        text = {k for rec in batch for k, v in rec.items() if isinstance(v, str)}
+        for k in text:
+            if k not in codes:
+                codes[k] = {}
+                if k in chunks:
+                    # עמודה שנבנתה כמספרית במקטעים הקודמים
+                    chunks[k] = _as_text(chunks[k], codes[k])
+        for rec in batch:
+            if rec.keys() <= chunks.keys():
+                continue
+            for k, v in rec.items():
+                order.setdefault(k, None)
+                if k in chunks or v is None:
+                    continue
+                # עמודה שמופיעה לראשונה באמצע הקובץ - ריפוד המקטעים הקודמים
+                pad = np.full(rows, -1, 'int32') if k in codes else np.full(rows, np.nan, 'float32')
+                chunks[k] = [pad] if rows else []
+        for k, parts in chunks.items():
+            parts.append(_chunk_array(k, [rec.get(k) for rec in batch], codes))
+        rows += len(batch)
+        batch.clear()
+
+    for rec in iter_json_array(path):
+        batch.append(rec)
+        if len(batch) >= chunk_rows:
+            flush()
+    if batch:
+        flush()
+
+    data = {}
+    for k in order:
+        parts = chunks.pop(k, [np.full(rows, np.nan, 'float32')])
+        if k in codes:
+            data[k] = pd.Categorical.from_codes(np.concatenate(parts), list(codes[k]))
+        else:
+            dtype = 'float32' if any(p.dtype == 'float32' for p in parts) else 'int32'
+            data[k] = np.concatenate([p.astype(dtype, copy=False) for p in parts])
+        del parts
+    return pd.DataFrame(data, copy=False)
+
+
+def compact_frame(df):
+    """המרת טיפוסים: מזהים ל-int32, מכירות ל-int32/float32, טקסט ל-category"""
+    df = df.copy()
+    for c in df.columns:
+        s = df[c]
+        if c in ID_COLUMNS:
+            df[c] = s.astype('int32')
+        elif pd.api.types.is_integer_dtype(s):
+            if len(s) == 0 or (s.min() >= INT32_MIN and s.max() <= INT32_MAX):
+                df[c] = s.astype('int32')
+        elif pd.api.types.is_float_dtype(s):
+            df[c] = s.astype('float32')
+        elif pd.api.types.is_bool_dtype(s):
+            continue
+        else:
+            # עמודות טקסט מעורבות (למשל 0 בתוך קטגוריה) נשמרות כמחרוזות
+            df[c] = s.where(s.isna(), s.astype(str)).astype('category')
+    return df
+
+
+def convert(data_dir=DATA_DIR, names=None):
+    """כתיבה חד פעמית של קבצי ה-JSON לפורמט Feather מוקלד"""
+    if feather is None:
+        raise RuntimeError("חסרה ספריית pyarrow - לא ניתן לכתוב Feather")
+    written = {}
+    for name in names or DATA_FILES:
+        if not (Path(data_dir) / DATA_FILES[name]).exists():
+            continue
+        df = read_json(name, data_dir)
+        if name not in STREAMED:
+            df = compact_frame(df)
+        out = columnar_path(name, data_dir)
+        # ללא דחיסה כדי שהקריאה תוכל להיות memory-mapped
+        feather.write_feather(df, out, compression='uncompressed')
+        written[name] = out
+    return written
+
+
+def read_columnar(name, data_dir=DATA_DIR):
+    table = feather.read_table(columnar_path(name, data_dir), memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def has_columnar(name, data_dir=DATA_DIR):
+    """קובץ עמודתי קיים ואינו ישן מקובץ ה-JSON שלו"""
+    if feather is None:
+        return False
+    col = columnar_path(name, data_dir)
+    src = Path(data_dir) / DATA_FILES[name]
+    if not col.exists():
+        return False
+    return not src.exists() or col.stat().st_mtime >= src.stat().st_mtime
+
+
+def read_frame(name, data_dir=DATA_DIR):
+    """קריאת טבלה - Feather כשזמין, אחרת JSON. מחזיר (טבלה, פורמט)"""
+    if has_columnar(name, data_dir):
+        return read_columnar(name, data_dir), 'feather'
+    return read_json(name, data_dir), 'json'
+
+
+def file_signature(name, data_dir=DATA_DIR):
+    """(גודל, זמן שינוי) של קובץ ה-JSON ושל קובץ ה-Feather - בדיקה זולה בכל ריצה"""
+    sig = []
+    for path in (Path(data_dir) / DATA_FILES[name], columnar_path(name, data_dir)):
+        try:
+            stat = path.stat()
+            sig.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def read_meta(data_dir=DATA_DIR):
+    """חודש הייחוס ותוויות התקופות. בלי קובץ מטא-נתונים - ברירות המחדל"""
+    path = Path(data_dir) / META_FILE
+    meta = json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+    ref_month = meta.get('ref_month', DEFAULT_REF_MONTH)
+    return {'ref_month': ref_month, 'labels': period_labels(ref_month)}
+
+
+def write_meta(data_dir, meta):
+    (Path(data_dir) / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+
+
+def frame_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+
+
+def data_version(data_dir=DATA_DIR):
+    """חתימת גרסה לקבצי הנתונים לפי שם, גודל וזמן שינוי"""
+    h = hashlib.sha1()
+    paths = [p for name in DATA_FILES for p in (Path(data_dir) / DATA_FILES[name], columnar_path(name, data_dir))]
+    for path in paths + [Path(data_dir) / META_FILE]:
+        if path.exists():
+            stat = path.stat()
+            h.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return h.hexdigest()[:12]
+
+
+def load_all(data_dir=DATA_DIR):
+    """טעינת שלוש הטבלאות עם מדידת זמן, זיכרון וגרסת הנתונים"""
+    version = data_version(data_dir)
+    t0 = time.perf_counter()
+    frames, formats = {}, {}
+    for name in DATA_FILES:
+        frames[name], formats[name] = read_frame(name, data_dir)
+    stats = {
+        'seconds': time.perf_counter() - t0,
+        'mb': sum(frame_mb(df) for df in frames.values()),
+        'formats': formats,
+        'version': version,
+        **read_meta(data_dir),
+    }
+    return frames['stores'], frames['products'], frames['sp'], stats
+
+
+if __name__ == '__main__':
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_DIR
+    for name, path in convert(target).items():
+        print(f"{name}: {path}")
@@ -0,0 +1,75 @@
+import hashlib
+import io
+
+import pandas as pd
+
+from bytes_cache import BytesLRU
+
+# ========================================
+# ייצוא לאקסל - לפי דרישה, עם מטמון לפי טביעת אצבע של הנתונים
+# ========================================
+EXCEL_MAX_ROWS = 1_048_576
+STREAM_ROWS = 20_000       # מעל זה כותבים במצב constant_memory
+CACHE_MAX_MB = 256
+
+_cache = BytesLRU(CACHE_MAX_MB)
+
+
+def fingerprint(df):
+    """טביעת אצבע לתוכן הטבלה: עמודות, טיפוסים וערכים"""
+    h = hashlib.sha1()
+    h.update(repr((list(df.columns), [str(t) for t in df.dtypes])).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _sheet_parts(name, df):
+    """פיצול טבלה שחורגת ממגבלת השורות של אקסל לכמה גיליונות"""
+    per_sheet = EXCEL_MAX_ROWS - 1
+    if len(df) <= per_sheet:
+        yield name, df
+        return
+    for i, start in enumerate(range(0, len(df), per_sheet)):
+        yield (name if i == 0 else f"{name}_{i + 1}")[:31], df.iloc[start:start + per_sheet]
+
+
+def _write_streaming(wb, name, df, header_fmt):
+    """כתיבה שורה אחר שורה - ב-constant_memory כל שורה נשמרת לקובץ זמני ומשתחררת"""
+    ws = wb.add_worksheet(name)
+    ws.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+    for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        ws.write_row(r, 0, [None if pd.isna(v) else v for v in row])
+
+
+def _build(sheets):
+    out = io.BytesIO()
+    if all(len(df) <= STREAM_ROWS for df in sheets.values()):
+        with pd.ExcelWriter(out, engine='xlsxwriter') as w:
+            for name, df in sheets.items():
+                df.to_excel(w, sheet_name=name, index=False)
+        return out.getvalue()
+
+    # pandas כותב עמודה אחר עמודה, ולכן לא מתאים ל-constant_memory
+    import xlsxwriter  # נטען רק בייצוא גדול, ולא בהפעלת האפליקציה
+    wb = xlsxwriter.Workbook(out, {'constant_memory': True, 'strings_to_urls': False})
+    header_fmt = wb.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    for name, df in sheets.items():
+        for part_name, part in _sheet_parts(name, df):
+            _write_streaming(wb, part_name, part, header_fmt)
+    wb.close()
+    return out.getvalue()
+
+
+def excel_bytes(sheets):
+    """חוברת אקסל מ-{שם גיליון: טבלה}. חוברת זהה לנתונים זהים מוחזרת מהמטמון"""
+    key = tuple((name, fingerprint(df)) for name, df in sheets.items())
+    return _cache.get_or_create(key, lambda: _build(sheets))
+
+
+def to_excel(df, sheet):
+    return excel_bytes({sheet: df})
+
+
+def to_csv(df):
+    """CSV ב-UTF-8 עם BOM (כך שאקסל פותח עברית נכון), מהמטמון לנתונים זהים"""
+    return _cache.get_or_create(('csv', fingerprint(df)), lambda: df.to_csv(index=False).encode('utf-8-sig'))
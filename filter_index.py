@@ -0,0 +1,125 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from data_io import MISSING_TEXT
+
+# ========================================
+# מנוע סינון - מסכות בוליאניות מוכנות לכל סוכן, עיר וסטטוס
+# ========================================
+ALL = 'הכל'
+
+
+def value_masks(values):
+    """{ערך: מסכה} לכל ערך בעמודה, לפי סדר ההופעה הראשונה. ערך חסר לא מקבל מסכה"""
+    codes, uniques = pd.factorize(values)
+    return {u: codes == k for k, u in enumerate(uniques)}
+
+
+def city_masks(values):
+    """מסכות הערים. עיר ריקה או חסרה (0 ב-JSON או '0' בקובץ העמודתי) לא מקבלת מסכה"""
+    return {c: m for c, m in value_masks(values).items() if c and c not in MISSING_TEXT}
+
+
+class Labels:
+    """תוויות 'מזהה - שם' לרשימות בחירה: נבנות וממוינות פעם אחת
+
+    options(mask) מחזיר את התוויות של השורות במסכה, כבר ממוינות - בלי
+    לבנות מחרוזות ובלי מיון בכל ריצה. ids ממפה תווית למזהה.
+    """
+
+    def __init__(self, df, name_col):
+        ids = df['מזהה'].to_numpy()
+        labels = [f"{i} - {n}" for i, n in zip(ids.tolist(), df[name_col].astype(str).tolist())]
+        self.order = np.array(sorted(range(len(labels)), key=labels.__getitem__), dtype=int)
+        self.sorted = np.array(labels, dtype=object)[self.order]
+        self.ids = dict(zip(labels, ids.tolist()))
+
+    def options(self, mask=None):
+        if mask is None:
+            return self.sorted.tolist()
+        return self.sorted[mask[self.order]].tolist()
+
+    def to_ids(self, labels):
+        return [self.ids[x] for x in labels if x in self.ids]
+
+
+class FilterIndex:
+    """מסכות ומיפויים של החנויות והמוצרים, שנבנים פעם אחת לכל גרסת נתונים וסוכן
+
+    שינוי סינון (החרגות, עיר, סטטוס) הוא כמה פעולות AND / NOT על מערכים
+    בוליאניים. מסכות הסטטוס תלויות בספים ולכן מגיעות מבחוץ (value_masks
+    על עמודת הסטטוס). האובייקט לקריאה בלבד ומשותף בין חיבורים.
+    """
+
+    def __init__(self, stores, products, user_stores=None):
+        ids = stores['מזהה'].to_numpy()
+        own = np.ones(len(stores), dtype=bool) if user_stores is None else np.isin(ids, list(user_stores))
+        last = stores['2v2_אחרון'].to_numpy()
+        self.active = own & (last > 0)
+        self.closed = own & (last == 0)
+        self.store_pos = pd.Index(ids)
+        self.product_pos = pd.Index(products['מזהה'].to_numpy())
+        self.city = city_masks(stores['עיר'])
+        self._frames = stores[['מזהה', 'שם חנות']], products[['מזהה', 'מוצר']]
+
+    # התוויות נבנות בפעם הראשונה שמבקשים אותן, ומשם נשמרות עם האינדקס
+    @cached_property
+    def stores(self):
+        return Labels(self._frames[0], 'שם חנות')
+
+    @cached_property
+    def products(self):
+        return Labels(self._frames[1], 'מוצר')
+
+    @cached_property
+    def exclude_options(self):
+        """רשימות ההחרגה: החנויות הפעילות של הסוכן וכל המוצרים"""
+        return self.stores.options(self.active), self.products.options()
+
+    @staticmethod
+    def _mask(pos, ids):
+        mask = np.zeros(len(pos), dtype=bool)
+        if len(ids):
+            at = pos.get_indexer(ids)
+            mask[at[at >= 0]] = True
+        return mask
+
+    def scope(self, excluded_ids=()):
+        """החנויות הפעילות של הסוכן בלי המוחרגות"""
+        if not len(excluded_ids):
+            return self.active
+        return self.active & ~self._mask(self.store_pos, excluded_ids)
+
+    def product_scope(self, excluded_prod_ids=()):
+        return ~self._mask(self.product_pos, excluded_prod_ids)
+
+    def options(self, status_masks, excluded_ids=()):
+        """ערים (ממוינות) וסטטוסים (לפי סדר ההופעה) שקיימים בחנויות שבטווח"""
+        base = self.scope(excluded_ids)
+        cities = sorted(c for c, m in self.city.items() if (m & base).any())
+        present = sorted((np.argmax(m & base), s) for s, m in status_masks.items() if (m & base).any())
+        return [ALL] + cities, [ALL] + [s for _, s in present]
+
+    def masks(self, status_masks, excluded_ids=(), excluded_prod_ids=(), city=ALL, status=ALL):
+        """(פעילות, מסוננות, מוצרים) כמסכות"""
+        base = self.scope(excluded_ids)
+        keep = base
+        if city != ALL:
+            keep = keep & self.city.get(city, np.zeros_like(base))
+        if status != ALL:
+            keep = keep & status_masks.get(status, np.zeros_like(base))
+        return base, keep, self.product_scope(excluded_prod_ids)
+
+    def rows(self, status_masks, excluded_ids=(), excluded_prod_ids=(), city=ALL, status=ALL):
+        """מיקומי השורות - הפלט של pipeline.filter_rows"""
+        return self.positions(*self.masks(status_masks, excluded_ids, excluded_prod_ids, city, status))
+
+    def positions(self, base, keep, prod):
+        return {
+            'active': np.flatnonzero(base),
+            'closed': np.flatnonzero(self.closed),
+            'filtered': np.flatnonzero(keep),
+            'products': np.flatnonzero(prod),
+        }
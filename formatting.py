@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ========================================
+# עיצוב מספרים ואחוזים לתצוגה
+# ========================================
+# בטבלאות הערכים נשארים מספריים ו-Streamlit מעצב אותם בדפדפן (column_config),
+# כך שלא נבנות עמודות טקסט בכל ריצה והמיון בטבלה נשאר מספרי.
+NUM_FORMAT = "%,.0f"
+PCT_FORMAT = "%+.1f%%"     # על ערך מוכפל ב-100
+ALERT_FORMAT = "%.1f%% ⚠️"
+RECOVERY_FORMAT = "%+.1f%% ↑"
+
+
+def fmt_pct(v):
+    if pd.isna(v) or v == 0:
+        return "0.0%"
+    return f"{v:+.1%}"
+
+
+def fmt_num(v):
+    if pd.isna(v):
+        return "0"
+    return f"{v:,.0f}"
+
+
+def fmt_num_col(s):
+    """fmt_num() לעמודה שלמה - לתוויות בגרפים ולייצוא כשצריך טקסט"""
+    v = np.nan_to_num(np.asarray(s, dtype='float64'), nan=0.0)
+    return list(map('{:,.0f}'.format, v.tolist()))
+
+
+def fmt_pct_col(s):
+    """fmt_pct() לעמודה שלמה"""
+    v = np.asarray(s, dtype='float64')
+    zero = np.isnan(v) | (v == 0)
+    out = list(map('{:+.1%}'.format, np.where(zero, 0.0, v).tolist()))
+    for i in np.flatnonzero(zero):
+        out[i] = "0.0%"
+    return out
+
+
+def display_table(df, columns, num=(), pct=(), formats=None):
+    """טבלת תצוגה בלי עיצוב תא-תא: בחירת עמודות, שמות תצוגה ו-column_config
+
+    columns: {עמודה: שם תצוגה} או רשימת עמודות. num / pct לפי שמות התצוגה;
+    חסרים מוצגים כ-0 כמו ב-fmt_num / fmt_pct. formats: פורמט מיוחד לעמודת אחוז.
+    מחזיר (טבלה, column_config) ל-st.dataframe.
+    """
+    if not isinstance(columns, dict):
+        columns = {c: c for c in columns}
+    formats = formats or {}
+    d = df[list(columns)].set_axis(list(columns.values()), axis=1)
+    # fmt_pct מציג אפס (וחסר) כ-0.0% בלי סימן, ופורמט printf לא יודע לעשות את זה.
+    # עמודות אחוז עם אפסים מעוצבות ב-Styler, והערכים נשארים מספריים למיון
+    styled = [c for c in pct if c not in formats and (d[c].isna() | (d[c] == 0)).any()]
+    d = d.assign(**{c: d[c].fillna(0) for c in num},
+                 **{c: d[c].fillna(0) * (1 if c in styled else 100) for c in pct})
+    config = {c: st.column_config.NumberColumn(c, format=NUM_FORMAT) for c in num}
+    config.update({c: st.column_config.NumberColumn(c) if c in styled
+                   else st.column_config.NumberColumn(c, format=formats.get(c, PCT_FORMAT)) for c in pct})
+    if styled:
+        d = d.reset_index(drop=True).style.format(na_rep='').format(fmt_pct, subset=styled)
+    return d, config
@@ -0,0 +1,278 @@
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import alerts
+import data_io
+import sql_store
+from sp_index import build_index
+
+# ========================================
+# נתונים חיים - טעינה מחדש רק של קובץ שהוחלף, בלי הפעלה מחדש של השרת
+# ========================================
+# מפתח השורה בכל טבלה. ב-sp השינוי נמדד לפי חנות
+ROW_KEYS = {'stores': 'מזהה', 'products': 'מזהה', 'sp': 'מזהה_חנות'}
+
+
+def meta_signature(data_dir=data_io.DATA_DIR):
+    try:
+        stat = (Path(data_dir) / data_io.META_FILE).stat()
+        return stat.st_size, stat.st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _hashable(df):
+    """טיפוסים אחידים ל-hash: עשרוניים ב-float32 (הדיוק של קבצי Feather)
+    וטקסט כמחרוזות (0 בתוך עמודת עיר ב-JSON הוא '0' בקובץ העמודתי)"""
+    cols = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_float_dtype(s) and s.dtype != 'float32':
+            cols[c] = s.astype('float32')
+        elif s.dtype == object:
+            cols[c] = s.where(s.isna(), s.astype(str))
+    return df.assign(**cols) if cols else df
+
+
+def row_hashes(df, key):
+    """טביעת אצבע לכל מפתח: hash של השורה, או סכום ה-hash של שורותיו (ב-sp)
+
+    ה-hash תלוי בערכים ולא בטיפוס האחסון (int32/int64, float32/float64,
+    category/טקסט), כך שמעבר בין JSON ל-Feather עם אותם נתונים לא נחשב שינוי.
+    """
+    h = pd.Series(pd.util.hash_pandas_object(_hashable(df), index=False).to_numpy(), index=df[key].to_numpy())
+    if h.index.is_unique:
+        return h
+    return h.groupby(level=0).sum()
+
+
+def changed_ids(old, new, key):
+    """מזהים שנוספו, השתנו או נמחקו בין שתי גרסאות של טבלה"""
+    if list(old.columns) != list(new.columns):
+        return np.union1d(old[key].unique(), new[key].unique())
+    h_old, h_new = row_hashes(old, key), row_hashes(new, key)
+    both = h_old.index.intersection(h_new.index)
+    diff = both[h_old.loc[both].to_numpy() != h_new.loc[both].to_numpy()]
+    return np.union1d(np.union1d(diff, h_old.index.difference(both)), h_new.index.difference(both))
+
+
+class DataSource:
+    """שלוש הטבלאות ואינדקס sp, עם בדיקת שינויים בקבצים
+
+    refresh() בודק גודל וזמן שינוי של הקבצים. קובץ שהשתנה נקרא מחדש
+    ומושווה לטבלה הקיימת לפי מפתח - אם אף שורה לא השתנתה, הטבלה הקיימת
+    נשארת כמו שהיא והגרסה לא מתקדמת. רק טבלאות ששורותיהן השתנו מוחלפות,
+    והמזהים שהשתנו נשמרים ב-stats['changed'].
+
+    עם backend='sqlite' טבלת sp לא נטענת לזיכרון: היא נכתבת לקובץ SQLite
+    (sql_store) והשליפות ממנה הן שאילתות דרך self.sql.
+
+    refresh() מחזירה את הטבלאות והסטטיסטיקה מתוך אותה נעילה שבה נבדקו
+    הקבצים, כך שהגרסה ב-stats היא תמיד הגרסה של הטבלאות שהוחזרו.
+
+    preload() מתחיל את הטעינה הראשונה ברקע (בזמן מסך הכניסה), ו-refresh()
+    הראשונה ממתינה לה. stats['waited'] הוא כמה זמן המשתמש חיכה בפועל.
+
+    בכל גרסת נתונים חדשה בדיקת האזעקות (alerts) רצה ברקע ונשמרת לדיסק;
+    alert_snapshot() מחזירה את התוצאה כשהיא מוכנה, בלי להמתין לה.
+    """
+
+    def __init__(self, data_dir=data_io.DATA_DIR, backend=sql_store.BACKEND):
+        self.data_dir = data_dir
+        self.use_sql = sql_store.use_sql(data_dir, backend)
+        self.sql = None
+        self.frames = {}
+        self.formats = {}
+        self.sigs = {}
+        self.sp_idx = None
+        self.version = None
+        self.changed = {}
+        self.meta = None
+        self.meta_sig = None
+        self.seconds = 0.0
+        self.waited = None
+        self._lock = threading.Lock()
+        self._preload = None
+        self._alerts = None
+        self._alert_snap = None
+        self._snapshot = None
+
+    def _names(self):
+        return [n for n in data_io.DATA_FILES if not (self.use_sql and n == 'sp')]
+
+    def _refresh_sql(self, sig):
+        """בנייה מחדש של מאגר ה-SQLite כשקבצי sp השתנו. מחזיר את החנויות שהשתנו"""
+        try:
+            new = sql_store.open_store(self.data_dir)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"⚠️ {sql_store.DB_FILE}: {e}", file=sys.stderr)
+            return None
+        self.sigs['sp'] = sig
+        ids = changed_ids(self.sql.fingerprint(), new.fingerprint(), 'מזהה_חנות')
+        self.sql = new
+        return ids
+
+    def _set(self, name, df, fmt):
+        if name == 'sp':
+            df, self.sp_idx = build_index(df)
+        self.frames[name] = df
+        self.formats[name] = fmt
+
+    def _load(self):
+        """טעינה ראשונה: הקבצים נקראים במקביל, וטבלה נשמרת רק כשכולם נקראו"""
+        t0 = time.perf_counter()
+        names = self._names()
+        sigs = {name: data_io.file_signature(name, self.data_dir) for name in names}
+        if self.use_sql:
+            sigs['sp'] = data_io.file_signature('sp', self.data_dir)
+        with ThreadPoolExecutor(max_workers=len(names) + 1) as pool:
+            reads = {name: pool.submit(data_io.read_frame, name, self.data_dir) for name in names}
+            sql = pool.submit(sql_store.open_store, self.data_dir) if self.use_sql else None
+            frames = {name: f.result() for name, f in reads.items()}
+            sql = sql.result() if sql is not None else None
+        for name in names:
+            self._set(name, *frames[name])
+        if sql is not None:
+            self.sql = sql
+            self.formats['sp'] = 'sqlite'
+        self.sigs.update(sigs)
+        self.meta_sig = meta_signature(self.data_dir)
+        self.meta = data_io.read_meta(self.data_dir)
+        self.version = data_io.data_version(self.data_dir)
+        self.seconds = time.perf_counter() - t0
+        self._snapshot = None
+        self._start_alerts()
+
+    def _start_alerts(self):
+        """בדיקת האזעקות לגרסה הנוכחית ב-thread ברקע, בלי לעכב את הרענון"""
+        f = self.frames
+        self._alerts = threading.Thread(target=self._run_alerts, name='alerts', daemon=True,
+                                        args=(f['stores'], f['products'], f.get('sp'), self.version))
+        self._alerts.start()
+
+    def _run_alerts(self, stores, products, sp, version):
+        try:
+            alerts.run_frames(stores, products, sp, version, self.data_dir)
+        except (OSError, ValueError) as e:
+            # בלי תמונת מצב הלשונית מחשבת את האזעקות בעצמה
+            print(f"⚠️ אזעקות: {e}", file=sys.stderr)
+
+    def alerts_running(self):
+        """האם בדיקת האזעקות של הגרסה האחרונה עוד רצה ברקע"""
+        return self._alerts is not None and self._alerts.is_alive()
+
+    def alert_snapshot(self, version):
+        """האזעקות של הגרסה (alerts.load), בלי להמתין לבדיקה שרצה ברקע.
+        None אם אין, או שהבדיקה עוד רצה - והלשונית מחשבת בעצמה בינתיים"""
+        done = self._alert_snap
+        if done is not None and done[0] == version:
+            return done[1]
+        if self.alerts_running():
+            return None
+        try:
+            snap = alerts.load(version, self.data_dir)
+        except (OSError, ValueError):
+            return None
+        if snap is not None:
+            self._alert_snap = (version, snap)
+        return snap
+
+    def _background(self):
+        with self._lock:
+            if self.frames:
+                return
+            try:
+                self._load()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                # refresh() תנסה שוב ותציג את השגיאה
+                print(f"⚠️ טעינה ברקע: {e}", file=sys.stderr)
+
+    def preload(self):
+        """התחלת הטעינה הראשונה ב-thread ברקע. קריאות נוספות לא עושות כלום"""
+        with self._lock:
+            if self.frames or self._preload is not None:
+                return
+            self._preload = threading.Thread(target=self._background, name='data-preload', daemon=True)
+            self._preload.start()
+
+    def refresh(self):
+        """טעינה ראשונה או טעינה מחדש של קבצים שהשתנו. מחזיר snapshot() של הגרסה"""
+        t0 = time.perf_counter()
+        with self._lock:
+            if self.waited is None and self.frames:  # הטעינה רצה ברקע - זה מה שנשאר לחכות לה
+                self.waited = time.perf_counter() - t0
+                self._snapshot = None
+            if not self.frames:
+                self._load()
+                self.waited = time.perf_counter() - t0
+                return self._current()
+
+            changes = {}
+            for name in data_io.DATA_FILES:
+                sig = data_io.file_signature(name, self.data_dir)
+                if sig == self.sigs[name]:
+                    continue
+                t0 = time.perf_counter()
+                if self.use_sql and name == 'sp':
+                    ids = self._refresh_sql(sig)
+                    if ids is not None and len(ids):
+                        changes[name] = ids.tolist()
+                    self.seconds = time.perf_counter() - t0
+                    continue
+                try:
+                    new, fmt = data_io.read_frame(name, self.data_dir)
+                except (OSError, ValueError) as e:
+                    # קובץ באמצע כתיבה - נשארים עם הנתונים הקיימים ומנסים בריצה הבאה
+                    print(f"⚠️ {data_io.DATA_FILES[name]}: {e}", file=sys.stderr)
+                    continue
+                self.sigs[name] = sig
+                ids = changed_ids(self.frames[name], new, ROW_KEYS[name])
+                if len(ids):
+                    self._set(name, new, fmt)
+                    changes[name] = ids.tolist()
+                self.seconds = time.perf_counter() - t0
+            # חודש ייחוס חדש משנה את התוויות גם בלי שינוי בטבלאות
+            sig = meta_signature(self.data_dir)
+            if sig != self.meta_sig:
+                try:
+                    meta = data_io.read_meta(self.data_dir)
+                    self.meta_sig = sig
+                except (OSError, ValueError):
+                    meta = self.meta
+                if meta != self.meta:
+                    self.meta = meta
+                    changes['meta'] = []
+            if changes:
+                self.changed = changes
+                self.version = data_io.data_version(self.data_dir)
+                self._snapshot = None
+                self._start_alerts()
+            return self._current()
+
+    def snapshot(self):
+        """(stores, products, sp, sp_idx, stats) של הגרסה הנוכחית. עם SQLite sp ו-sp_idx הם None"""
+        with self._lock:
+            return self._current()
+
+    def _current(self):
+        """ה-snapshot הנוכחי, נבנה פעם אחת לכל גרסה. נקרא רק מתוך הנעילה"""
+        if self._snapshot is None:
+            stats = {
+                'seconds': self.seconds,
+                'waited': self.waited,
+                'mb': sum(data_io.frame_mb(df) for df in self.frames.values()),
+                'formats': dict(self.formats),
+                'version': self.version,
+                'changed': {k: len(v) for k, v in self.changed.items() if k != 'meta'},
+                **self.meta,
+            }
+            f = self.frames
+            self._snapshot = f['stores'], f['products'], f.get('sp'), self.sp_idx, stats
+        return self._snapshot
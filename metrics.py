@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# ========================================
+# מדדי שינוי וסטטוס - חישוב וקטורי
+# ========================================
+
+# עמודת שינוי -> (עמודה חדשה, עמודה ישנה)
+STORE_CHANGES = {
+    'שינוי_שנתי': ('שנה2', 'שנה1'),
+    'שינוי_6v6': ('6v6_H2', '6v6_H1'),
+    'שינוי_3v3': ('3v3_שנה2', '3v3_שנה1'),
+    'שינוי_רבעוני': ('3v3_Q3', '3v3_Q2'),
+    'שינוי_2v2': ('2v2_אחרון', '2v2_קודם'),
+}
+PRODUCT_CHANGES = {k: STORE_CHANGES[k] for k in ['שינוי_שנתי', 'שינוי_6v6', 'שינוי_רבעוני']}
+
+# ספים ברירת מחדל (ערכי ההתחלה של המחוונים בסרגל הצד)
+DEFAULT_TH = {
+    'צמיחה': 0.05,
+    'צמיחה_6v6': -0.05,
+    'יציב_עליון': 0.05,
+    'יציב_תחתון': -0.05,
+    'סכנה': -0.15,
+    'סכנה_6v6': -0.10,
+    'אזעקה': -0.15,
+}
+
+
+def chg(new, old):
+    if pd.isna(old) or old == 0:
+        return 0
+    return (new - old) / old
+
+
+def calc_status(r, th):
+    if r['שנה1'] == 0:
+        return 'חדש/ה'
+    c = chg(r['שנה2'], r['שנה1'])
+    c6 = chg(r['6v6_H2'], r['6v6_H1'])
+    if c < th['סכנה'] and c6 < th['סכנה_6v6']:
+        return 'סכנה'
+    elif c > th['צמיחה'] and c6 > th['צמיחה_6v6']:
+        return 'צמיחה'
+    elif c >= th['יציב_תחתון'] and c <= th['יציב_עליון']:
+        return 'יציב'
+    elif c < th['יציב_תחתון'] and c6 > 0.05:
+        return 'התאוששות'
+    else:
+        return 'שחיקה'
+
+
+def chg_col(new, old):
+    """שינוי יחסי לעמודה שלמה - כמו chg(): 0 כשהערך הישן 0 או חסר"""
+    new = np.asarray(new, dtype='float64')
+    old = np.asarray(old, dtype='float64')
+    zero = np.isnan(old) | (old == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (new - old) / np.where(zero, 1.0, old)
+    out[zero] = 0.0
+    return out
+
+
+def add_changes(df, changes):
+    """הוספת עמודות שינוי לטבלה לפי מיפוי {עמודה: (חדש, ישן)}"""
+    for col, (new, old) in changes.items():
+        df[col] = chg_col(df[new], df[old])
+    return df
+
+
+def status_col(df, th):
+    """סיווג סטטוס לכל השורות - אותה לוגיקה כמו calc_status()"""
+    y1 = df['שנה1'].to_numpy(dtype='float64')
+    c = chg_col(df['שנה2'], y1)
+    c6 = chg_col(df['6v6_H2'], df['6v6_H1'])
+    conds = [
+        y1 == 0,
+        (c < th['סכנה']) & (c6 < th['סכנה_6v6']),
+        (c > th['צמיחה']) & (c6 > th['צמיחה_6v6']),
+        (c >= th['יציב_תחתון']) & (c <= th['יציב_עליון']),
+        (c < th['יציב_תחתון']) & (c6 > 0.05),
+    ]
+    choices = ['חדש/ה', 'סכנה', 'צמיחה', 'יציב', 'התאוששות']
+    return np.select(conds, choices, default='שחיקה').astype(object)
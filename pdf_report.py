@@ -0,0 +1,323 @@
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from bytes_cache import BytesLRU
+from periods import DEFAULT_LABELS
+
+# ========================================
+# גופנים - פענוח והקטנה פעם אחת לתהליך
+# ========================================
+FONT_FILES = {'': 'FreeSerif.ttf', 'B': 'FreeSerifBold.ttf'}
+SYSTEM_FONT_DIR = Path('/usr/share/fonts/truetype/freefont')
+CACHE_DIR = Path(os.environ.get('REPORT_CACHE_DIR', Path(tempfile.gettempdir()) / 'sales_dashboard_cache'))
+# תווים שנשמרים בגופן המוקטן: לטינית, עברית, קירילית, פיסוק ומטבעות
+REPORT_CHARS = frozenset(chr(c) for a, b in [(0x20, 0x7E), (0xA0, 0xFF), (0x0400, 0x04FF), (0x0590, 0x05FF),
+                                              (0x2000, 0x206F), (0x20A0, 0x20CF)] for c in range(a, b + 1))
+
+_fonts = {}  # סגנון -> נתיב הגופן המוקטן
+_fonts_lock = threading.Lock()
+
+
+def _full_font(style):
+    path = Path(__file__).parent / FONT_FILES[style]
+    return path if path.exists() else SYSTEM_FONT_DIR / FONT_FILES[style]
+
+
+def _report_font(style):
+    """גופן מוקטן לתווי הדוח
+
+    פענוח FreeSerif המלא (3.6MB) והקטנתו לוקחים את רוב הזמן של כל דוח.
+    כאן זה קורה פעם אחת לתהליך, והתוצאה נשמרת בדיסק לפי חתימת הקובץ המקורי
+    כך שגם תהליכים חדשים (למשל עובדי האצווה) רק קוראים גופן קטן.
+    """
+    with _fonts_lock:
+        if style in _fonts:
+            return _fonts[style]
+        src = _full_font(style)
+        stat = src.stat()
+        out = CACHE_DIR / f"{src.stem}-{stat.st_size}-{stat.st_mtime_ns}.ttf"
+        if not out.exists():
+            from fontTools import subset as ftsubset, ttLib
+            font = ttLib.TTFont(src, recalcTimestamp=False)
+            options = ftsubset.Options()
+            options.notdef_outline = True
+            options.name_IDs = ['*']
+            options.glyph_names = True
+            options.drop_tables += ['FFTM']
+            subsetter = ftsubset.Subsetter(options)
+            subsetter.populate(unicodes=[ord(c) for c in REPORT_CHARS])
+            subsetter.subset(font)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_suffix(f'.{os.getpid()}.tmp')
+            font.save(tmp)
+            os.replace(tmp, out)
+        _fonts[style] = out
+        return out
+
+
+def preload_fonts():
+    for style in FONT_FILES:
+        _report_font(style)
+
+
+def _add_fonts(pdf, texts):
+    """גופן מוקטן כשכל התווים בדוח מכוסים, אחרת הגופן המלא"""
+    chars = set(''.join(texts))
+    for style in FONT_FILES:
+        path = _report_font(style) if chars <= REPORT_CHARS else _full_font(style)
+        pdf.add_font('Hebrew', style, str(path))
+
+
+def _report_texts(store_info, store_products, missing_products, recommendations=None):
+    texts = [str(store_info[c]) for c in ['שם חנות', 'עיר', 'סטטוס'] if pd.notna(store_info[c])]
+    for df in (store_products, missing_products, recommendations):
+        if df is None:
+            continue
+        for c in ['מוצר', 'סיווג']:
+            if c in df:
+                texts.extend(str(v) for v in pd.unique(df[c].dropna()))
+    return texts
+
+
+# ========================================
+# מטמון דוחות - לפי חנות, גרסת נתונים, ספים ויום היצירה
+# ========================================
+PDF_CACHE_MB = 64
+DATE_FORMAT = '%d/%m/%Y'
+TIME_FORMAT = '%d/%m/%Y %H:%M'
+_pdfs = BytesLRU(PDF_CACHE_MB, disk_dir=os.environ.get('PDF_CACHE_DIR'), suffix='.pdf')
+
+
+def report_key(store_id, version, th, excluded_prod_ids=()):
+    return ('store_pdf', int(store_id), version, tuple(sorted(th.items())), tuple(sorted(excluded_prod_ids)))
+
+
+def cached_store_pdf(key, store_info, store_products, missing_products, labels=DEFAULT_LABELS, recommendations=None):
+    """create_store_pdf() דרך מטמון LRU - בקשה חוזרת לאותו דוח חוזרת מיד
+
+    דוח מהמטמון מציין רק את תאריך היצירה, והיום הוא חלק מהמפתח - כך שלא
+    מוגשת שעת יצירה ישנה.
+    """
+    day = datetime.now().strftime(DATE_FORMAT)
+    return _pdfs.get_or_create(key + (day,), lambda: create_store_pdf(store_info, store_products, missing_products,
+                                                                      labels, recommendations, generated=day))
+
+
+# ========================================
+# דוח PDF לחנות
+# ========================================
+
+
+def reverse_hebrew(text):
+    """הפיכת טקסט עברי לתצוגה ב-PDF"""
+    if pd.isna(text):
+        return '-'
+    return str(text)[::-1]
+
+
+def create_store_pdf(store_info, store_products, missing_products, labels=DEFAULT_LABELS, recommendations=None,
+                     generated=None):
+    """יצירת PDF מעוצב לחנות בודדת. labels - תוויות התקופות לפי חודש הייחוס,
+    recommendations - מוצרים מומלצים לפי חנויות דומות (similar.store_recommendations),
+    generated - טקסט זמן היצירה בתחתית (ברירת מחדל: עכשיו, עם השעה)"""
+    from fpdf import FPDF  # נטען רק בדוח הראשון, ולא בהפעלת האפליקציה
+    pdf = FPDF()
+    pdf.add_page()
+    
+    # הוספת פונט עברי
+    _add_fonts(pdf, _report_texts(store_info, store_products, missing_products, recommendations))
+    
+    # === כותרת ראשית ===
+    pdf.set_fill_color(102, 126, 234)  # סגול-כחול
+    pdf.rect(0, 0, 210, 35, 'F')
+    pdf.set_font('Hebrew', 'B', 28)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_y(8)
+    pdf.cell(0, 12, reverse_hebrew("דוח חנות"), align='C')
+    pdf.ln(12)
+    pdf.set_font('Hebrew', 'B', 18)
+    pdf.cell(0, 10, reverse_hebrew(str(store_info['שם חנות'])), align='C')
+    
+    # איפוס צבע טקסט
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_y(45)
+    
+    # === תיבת פרטי חנות ===
+    pdf.set_fill_color(248, 249, 250)
+    pdf.rect(10, 45, 190, 25, 'F')
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(10, 45, 190, 25, 'D')
+    
+    pdf.set_font('Hebrew', '', 12)
+    pdf.set_y(50)
+    details = f"עיר: {store_info['עיר'] if pd.notna(store_info['עיר']) else '-'}  |  מזהה: {store_info['מזהה']}  |  דירוג: #{int(store_info['דירוג'])}  |  סטטוס: {store_info['סטטוס']}"
+    pdf.cell(0, 8, reverse_hebrew(details), align='C')
+    
+    pdf.set_y(75)
+    
+    # === מדדי מכירות ===
+    pdf.set_font('Hebrew', 'B', 14)
+    pdf.set_fill_color(102, 126, 234)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(0, 10, reverse_hebrew("  מדדי מכירות  "), align='R', fill=True)
+    pdf.ln(12)
+    pdf.set_text_color(0, 0, 0)
+    
+    # טבלת מדדים
+    pdf.set_font('Hebrew', 'B', 10)
+    pdf.set_fill_color(230, 230, 230)
+    col_w = 47.5
+    pdf.cell(col_w, 8, reverse_hebrew("שינוי"), border=1, align='C', fill=True)
+    pdf.cell(col_w, 8, reverse_hebrew("נוכחי"), border=1, align='C', fill=True)
+    pdf.cell(col_w, 8, reverse_hebrew("קודם"), border=1, align='C', fill=True)
+    pdf.cell(col_w, 8, reverse_hebrew("תקופה"), border=1, align='C', fill=True)
+    pdf.ln()
+    
+    pdf.set_font('Hebrew', '', 10)
+    metrics_data = [
+        ("שנתי", store_info['שנה1'], store_info['שנה2'], store_info['שינוי_שנתי']),
+        ("H1 vs H2", store_info['6v6_H1'], store_info['6v6_H2'], store_info['שינוי_6v6']),
+        ("Q2 vs Q3", store_info['3v3_Q2'], store_info['3v3_Q3'], store_info['שינוי_רבעוני']),
+        (labels['2v2'], store_info['2v2_קודם'], store_info['2v2_אחרון'], store_info['שינוי_2v2']),
+    ]
+    
+    for period, prev_val, curr_val, change in metrics_data:
+        # צבע לפי שינוי
+        if change > 0:
+            pdf.set_fill_color(212, 237, 218)  # ירוק בהיר
+        elif change < -0.1:
+            pdf.set_fill_color(248, 215, 218)  # אדום בהיר
+        else:
+            pdf.set_fill_color(255, 255, 255)
+        
+        pdf.cell(col_w, 7, f"{change:+.1%}", border=1, align='C', fill=True)
+        pdf.set_fill_color(255, 255, 255)
+        pdf.cell(col_w, 7, f"{curr_val:,.0f}", border=1, align='C')
+        pdf.cell(col_w, 7, f"{prev_val:,.0f}", border=1, align='C')
+        pdf.cell(col_w, 7, reverse_hebrew(period), border=1, align='C')
+        pdf.ln()
+    
+    pdf.ln(8)
+    
+    # === טבלת מוצרים בחנות ===
+    if len(store_products) > 0:
+        pdf.set_font('Hebrew', 'B', 14)
+        pdf.set_fill_color(40, 167, 69)  # ירוק
+        pdf.set_text_color(255, 255, 255)
+        pdf.cell(0, 10, reverse_hebrew(f"  מוצרים בחנות ({len(store_products)})  "), align='R', fill=True)
+        pdf.ln(12)
+        pdf.set_text_color(0, 0, 0)
+        
+        # כותרות טבלה
+        pdf.set_font('Hebrew', 'B', 8)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(18, 7, reverse_hebrew("שינוי"), border=1, align='C', fill=True)
+        pdf.cell(22, 7, reverse_hebrew("נוכחי"), border=1, align='C', fill=True)
+        pdf.cell(22, 7, reverse_hebrew("קודם"), border=1, align='C', fill=True)
+        pdf.cell(18, 7, reverse_hebrew("שינוי 3v3"), border=1, align='C', fill=True)
+        pdf.cell(22, 7, reverse_hebrew("Q3"), border=1, align='C', fill=True)
+        pdf.cell(22, 7, reverse_hebrew("Q2"), border=1, align='C', fill=True)
+        pdf.cell(28, 7, reverse_hebrew("סיווג"), border=1, align='C', fill=True)
+        pdf.cell(38, 7, reverse_hebrew("מוצר"), border=1, align='C', fill=True)
+        pdf.ln()
+        
+        pdf.set_font('Hebrew', '', 7)
+        top_products = store_products.nlargest(15, 'שנה2')
+        for _, row in top_products.iterrows():
+            change = (row['שנה2'] - row['שנה1']) / row['שנה1'] if row['שנה1'] > 0 else 0
+            change_3v3 = (row['3v3_Q3'] - row['3v3_Q2']) / row['3v3_Q2'] if row['3v3_Q2'] > 0 else 0
+            
+            if change > 0:
+                pdf.set_fill_color(212, 237, 218)
+            elif change < -0.1:
+                pdf.set_fill_color(248, 215, 218)
+            else:
+                pdf.set_fill_color(255, 255, 255)
+            
+            pdf.cell(18, 6, f"{change:+.1%}", border=1, align='C', fill=True)
+            pdf.set_fill_color(255, 255, 255)
+            pdf.cell(22, 6, f"{row['שנה2']:,.0f}", border=1, align='C')
+            pdf.cell(22, 6, f"{row['שנה1']:,.0f}", border=1, align='C')
+            
+            # צבע לשינוי 3v3
+            if change_3v3 > 0:
+                pdf.set_fill_color(212, 237, 218)
+            elif change_3v3 < -0.1:
+                pdf.set_fill_color(248, 215, 218)
+            else:
+                pdf.set_fill_color(255, 255, 255)
+            pdf.cell(18, 6, f"{change_3v3:+.1%}", border=1, align='C', fill=True)
+            
+            pdf.set_fill_color(255, 255, 255)
+            pdf.cell(22, 6, f"{row['3v3_Q3']:,.0f}", border=1, align='C')
+            pdf.cell(22, 6, f"{row['3v3_Q2']:,.0f}", border=1, align='C')
+            pdf.cell(28, 6, reverse_hebrew(str(row['סיווג'])[:12] if pd.notna(row['סיווג']) else '-'), border=1, align='C')
+            pdf.cell(38, 6, reverse_hebrew(str(row['מוצר'])[:18]), border=1, align='R')
+            pdf.ln()
+    
+    # === עמוד חדש למוצרים חסרים ===
+    if len(missing_products) > 0:
+        pdf.add_page()
+        
+        # כותרת
+        pdf.set_fill_color(220, 53, 69)  # אדום
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Hebrew', 'B', 14)
+        pdf.cell(0, 10, reverse_hebrew(f"  מוצרים שהחנות לא מקבלת ({len(missing_products)})  "), align='R', fill=True)
+        pdf.ln(12)
+        pdf.set_text_color(0, 0, 0)
+        
+        # כותרות טבלה
+        pdf.set_font('Hebrew', 'B', 9)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(40, 7, reverse_hebrew("מכירות כלליות"), border=1, align='C', fill=True)
+        pdf.cell(50, 7, reverse_hebrew("סיווג"), border=1, align='C', fill=True)
+        pdf.cell(100, 7, reverse_hebrew("מוצר"), border=1, align='C', fill=True)
+        pdf.ln()
+        
+        pdf.set_font('Hebrew', '', 8)
+        for _, row in missing_products.head(25).iterrows():
+            pdf.cell(40, 6, f"{row['שנה2']:,.0f}", border=1, align='C')
+            pdf.cell(50, 6, reverse_hebrew(str(row['סיווג'])[:20] if pd.notna(row['סיווג']) else '-'), border=1, align='C')
+            pdf.cell(100, 6, reverse_hebrew(str(row['מוצר'])[:45]), border=1, align='R')
+            pdf.ln()
+    
+    # === מוצרים מומלצים לפי חנויות דומות ===
+    if recommendations is not None and len(recommendations) > 0:
+        pdf.add_page()
+        
+        pdf.set_fill_color(255, 152, 0)  # כתום
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Hebrew', 'B', 14)
+        pdf.cell(0, 10, reverse_hebrew(f"  מומלצים לפי חנויות דומות ({len(recommendations)})  "), align='R', fill=True)
+        pdf.ln(12)
+        pdf.set_text_color(0, 0, 0)
+        
+        pdf.set_font('Hebrew', 'B', 9)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(35, 7, reverse_hebrew("מכירות צפויות"), border=1, align='C', fill=True)
+        pdf.cell(30, 7, reverse_hebrew("חנויות דומות"), border=1, align='C', fill=True)
+        pdf.cell(40, 7, reverse_hebrew("סיווג"), border=1, align='C', fill=True)
+        pdf.cell(85, 7, reverse_hebrew("מוצר"), border=1, align='C', fill=True)
+        pdf.ln()
+        
+        pdf.set_font('Hebrew', '', 8)
+        for _, row in recommendations.iterrows():
+            pdf.cell(35, 6, f"{row['מכירות_צפויות']:,.0f}", border=1, align='C')
+            pdf.cell(30, 6, f"{row['שכנים_מוכרים']}", border=1, align='C')
+            pdf.cell(40, 6, reverse_hebrew(str(row['סיווג'])[:16] if pd.notna(row['סיווג']) else '-'), border=1, align='C')
+            pdf.cell(85, 6, reverse_hebrew(str(row['מוצר'])[:38]), border=1, align='R')
+            pdf.ln()
+    
+    # === Footer ===
+    pdf.set_y(-20)
+    pdf.set_font('Hebrew', '', 8)
+    pdf.set_text_color(128, 128, 128)
+    pdf.cell(0, 10, reverse_hebrew(f"נוצר בתאריך: {generated or datetime.now().strftime(TIME_FORMAT)}"), align='C')
+    
+    return bytes(pdf.output())
@@ -0,0 +1,73 @@
+import pandas as pd
+
+# ========================================
+# חלונות הזמן של עמודות התקופה ותוויות התצוגה שלהן
+# ========================================
+# חודש הייחוס של הקבצים הקיימים (סוף שנה2) - כשאין קובץ מטא-נתונים
+DEFAULT_REF_MONTH = '2025-11'
+HISTORY_MONTHS = 24
+
+# עמודה -> (התחלה, סוף) בחודשים אחורה מחודש הייחוס, הסוף לא כלול.
+# 0 הוא חודש הייחוס עצמו
+WINDOWS = {
+    'שנה1': (12, 24),
+    'שנה2': (0, 12),
+    'H1_שנה1': (18, 24),
+    'H2_שנה1': (12, 18),
+    'H1_שנה2': (6, 12),
+    'H2_שנה2': (0, 6),
+    '6v6_H1': (6, 12),
+    '6v6_H2': (0, 6),
+    '3v3_שנה1': (12, 15),
+    '3v3_שנה2': (0, 3),
+    '2v2_קודם': (2, 4),
+    '2v2_אחרון': (0, 2),
+    '3v3_Q2': (3, 6),
+    '3v3_Q3': (0, 3),
+}
+# אחוז חזרות: חזרות מתוך המכירות בחלון (לפי ערך מוחלט), ו-0 כשאין מכירות - כמו בקבצים הקיימים
+RETURN_WINDOWS = {
+    'H1_שנה2_אחוז_חזרות': (6, 12),
+    'H2_שנה2_אחוז_חזרות': (0, 6),
+}
+
+MONTH_NAMES = ['ינואר', 'פברואר', 'מרץ', 'אפריל', 'מאי', 'יוני',
+               'יולי', 'אוגוסט', 'ספטמבר', 'אוקטובר', 'נובמבר', 'דצמבר']
+
+
+def period_labels(ref_month=DEFAULT_REF_MONTH):
+    """תוויות התקופות לחודש ייחוס, למשל '8-9/2025' ו-'H1 (דצמבר-מאי)'"""
+    ref = pd.Period(ref_month, freq='M')
+
+    def bounds(window):
+        a, b = window
+        return ref - (b - 1), ref - a
+
+    def span(window):
+        first, last = bounds(window)
+        if first.year == last.year:
+            return f"{first.month}-{last.month}/{last.year}"
+        return f"{first.month}/{first.year}-{last.month}/{last.year}"
+
+    def months(window):
+        first, last = bounds(window)
+        return f"{first.month}-{last.month}"
+
+    def names(window):
+        first, last = bounds(window)
+        return f"{MONTH_NAMES[first.month - 1]}-{MONTH_NAMES[last.month - 1]}"
+
+    return {
+        'שנה1': span(WINDOWS['שנה1']),
+        'שנה2': span(WINDOWS['שנה2']),
+        'H1': f"H1 ({names(WINDOWS['H1_שנה2'])})",
+        'H2': f"H2 ({names(WINDOWS['H2_שנה2'])})",
+        'Q2': span(WINDOWS['3v3_Q2']),
+        'Q3': span(WINDOWS['3v3_Q3']),
+        '2v2_קודם': span(WINDOWS['2v2_קודם']),
+        '2v2_אחרון': span(WINDOWS['2v2_אחרון']),
+        '2v2': f"{months(WINDOWS['2v2_קודם'])} vs {months(WINDOWS['2v2_אחרון'])}",
+    }
+
+
+DEFAULT_LABELS = period_labels()
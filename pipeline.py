@@ -0,0 +1,112 @@
+import numpy as np
+
+from metrics import add_changes, status_col, STORE_CHANGES, PRODUCT_CHANGES
+from filter_index import FilterIndex, value_masks
+from sp_index import build_index, store_rows
+
+# ========================================
+# שלבי חישוב: מדדים קבועים -> סיווג לפי ספים -> סינון
+# ========================================
+
+
+def static_metrics(stores, products):
+    """מדדים שלא תלויים בספים: עמודות שינוי ודירוגים
+
+    העמודות החדשות נוספות להעתק רדוד - עמודות הבסיס משותפות עם הטבלה
+    שנטענה ולא מועתקות.
+    """
+    stores = add_changes(stores.copy(deep=False), STORE_CHANGES)
+    # 3 דירוגים לחנויות
+    stores['דירוג_מכירות'] = stores['שנה2'].rank(ascending=False, method='min').astype(int)
+    stores['דירוג_צמיחה'] = stores['שינוי_שנתי'].rank(ascending=False, method='min').astype(int)
+    stores['דירוג_טווח_קצר'] = stores['שינוי_רבעוני'].rank(ascending=False, method='min').astype(int)
+    stores['דירוג'] = stores['דירוג_מכירות']  # ברירת מחדל
+
+    products = add_changes(products.copy(deep=False), PRODUCT_CHANGES)
+    products['דירוג'] = products['שנה2'].rank(ascending=False, method='min').astype(int)
+    return stores, products
+
+
+def classify(stores, products, th):
+    """סטטוס לחנויות ולמוצרים - השלב היחיד שתלוי בספים"""
+    return status_col(stores, th), status_col(products, th)
+
+
+def prepare(stores, products, th):
+    """מדדים קבועים וסיווג יחד - לשימוש מחוץ לאפליקציה (דוחות, מדידות)"""
+    stores, products = static_metrics(stores, products)
+    store_status, product_status = classify(stores, products, th)
+    return with_status(stores, store_status, 'דירוג_מכירות'), with_status(products, product_status, 'דירוג')
+
+
+def with_status(df, status, before):
+    """הוספת עמודת סטטוס לפני עמודת הדירוג, כמו בסדר העמודות המקורי (בלי העתקת שאר העמודות)"""
+    df = df.copy(deep=False)
+    df.insert(df.columns.get_loc(before), 'סטטוס', status)
+    return df
+
+
+def store_sp_rows(sp_idx, store_ids):
+    """מיקומי שורות sp של רשימת חנויות - sp ממוין לפי חנות, כך שהסדר נשמר"""
+    ranges = [sp_idx['store'][s] for s in sorted(set(store_ids)) if s in sp_idx['store']]
+    return np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.empty(0, dtype=int)
+
+
+def partition(stores, sp, sp_idx, user_stores):
+    """החנויות ושורות sp של סוכן, עם אינדקס משלהן
+
+    נבנה פעם אחת לכל גרסת נתונים ורשימת חנויות ומשותף לכל החיבורים של
+    הסוכן - לקריאה בלבד. הדירוגים נשארים אלה שחושבו על כל החנויות.
+    """
+    part_stores = stores[stores['מזהה'].isin(user_stores).to_numpy()]
+    if sp is None:  # sp ב-SQLite - השאילתות מסננות לפי חנויות בעצמן
+        return part_stores, None, None
+    part_sp, part_idx = build_index(sp.iloc[store_sp_rows(sp_idx, user_stores)])
+    return part_stores, part_sp, part_idx
+
+
+def filter_rows(stores, products, user_stores, excluded_ids, excluded_prod_ids, city, status):
+    """מיקומי השורות אחרי סינון סוכן, החרגות, עיר וסטטוס
+
+    מחזיר מילון של מערכי מיקומים. שורות sp לא מסוננות כאן - מי שצריך
+    אותן שולף לפי החנויות (scope_sp), בלי מערך בגודל הטבלה כולה.
+    לסינון חוזר על אותן טבלאות עדיף לשמור את ה-FilterIndex עצמו.
+    """
+    index = FilterIndex(stores, products, user_stores)
+    return index.rows(value_masks(stores['סטטוס']), excluded_ids, excluded_prod_ids, city, status)
+
+
+def take_rows(df, pos):
+    """השורות במיקומים pos. כשאלה כל השורות (ממוינות) מוחזרת הטבלה עצמה, בלי העתק"""
+    return df if len(pos) == len(df) else df.iloc[pos]
+
+
+def scope_frames(stores, products, rows):
+    """הטבלאות של תוצאת filter_rows - לקריאה בלבד, ומשותפות בין חיבורים"""
+    active = take_rows(stores, rows['active'])
+    return {
+        'active': active,
+        'closed': take_rows(stores, rows['closed']),
+        'filtered': active if len(rows['filtered']) == len(rows['active']) else stores.iloc[rows['filtered']],
+        'products': take_rows(products, rows['products']),
+    }
+
+
+def scope_sp(sp, sp_idx, store_ids, excluded_prod_ids=()):
+    """שורות sp של רשימת חנויות בלי מוצרים מוחרגים, ממוינות לפי חנות"""
+    part = sp.iloc[store_sp_rows(sp_idx, store_ids)]
+    return part[~part['מזהה_מוצר'].isin(excluded_prod_ids).to_numpy()] if len(excluded_prod_ids) else part
+
+
+def store_products(sp, sp_idx, products, sid, excluded_prod_ids=()):
+    """מוצרי החנות (עם שינוי שנתי, ממוינים לפי מכירות) והמוצרים שהחנות לא מקבלת"""
+    return products_of_store(store_rows(sp, sp_idx, sid), products, excluded_prod_ids)
+
+
+def products_of_store(sp2, products, excluded_prod_ids=()):
+    """כמו store_products, על שורות sp של החנות שכבר נשלפו"""
+    sp2 = sp2[~sp2['מזהה_מוצר'].isin(excluded_prod_ids)].copy()
+    missing = ~products['מזהה'].isin(sp2['מזהה_מוצר'])
+    missing_products = products[missing].sort_values('שנה2', ascending=False).copy()
+    add_changes(sp2, {'שינוי': ('שנה2', 'שנה1')})
+    return sp2.sort_values('שנה2', ascending=False), missing_products
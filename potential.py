@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# ========================================
+# מנוע פוטנציאל - מטריצת נוכחות חנויות × מוצרים
+# ========================================
+POTENTIAL_COLUMNS = ['חנות', 'עיר', 'מכירות', 'חסרים', 'פוטנציאל']
+
+
+def presence_matrix(store_ids, sold_stores, cols, n_products):
+    """מטריצת 0/1 דלילה: שורה לכל חנות ב-store_ids, עמודה לכל מוצר"""
+    rows = pd.Index(store_ids).get_indexer(sold_stores)
+    from scipy import sparse  # נטען רק בחישוב הראשון, ולא בהפעלת האפליקציה
+    m = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(store_ids), n_products))
+    m.sum_duplicates()
+    m.data[:] = 1.0
+    return m
+
+
+def presence_stats(store_ids, sp_act):
+    """מטריצת נוכחות דלילה (חנויות × מוצרים) וסטטיסטיקות מוצר
+
+    נוכחות = שורה עם שנה2 > 0. סדר השורות במטריצה הוא סדר store_ids.
+    לא תלוי בסף החדירה, כך שאפשר לחשב פעם אחת ולהזיז את הסף בזול.
+    """
+    sold = sp_act[sp_act['שנה2'] > 0]
+    sold = sold[pd.Index(store_ids).get_indexer(sold['מזהה_חנות']) >= 0]
+    prod_ids, cols = np.unique(sold['מזהה_מוצר'].to_numpy(), return_inverse=True)
+    sales = sold['שנה2'].to_numpy(dtype='float64')
+
+    m = presence_matrix(store_ids, sold['מזהה_חנות'].to_numpy(), cols, len(prod_ids))
+    counts = np.bincount(cols, minlength=len(prod_ids))
+    return {
+        'matrix': m,
+        'product_ids': prod_ids,
+        'stores': m.getnnz(axis=0),
+        'mean': np.bincount(cols, weights=sales, minlength=len(prod_ids)) / np.maximum(counts, 1),
+    }
+
+
+def potential_table(active, stats, min_pen):
+    """פוטנציאל לכל החנויות: מוצרים בחדירה גבוהה שהחנות לא מקבלת
+
+    מחזיר (טבלת פוטנציאל ממוינת, מספר המוצרים בחדירה גבוהה).
+    """
+    pen = stats['stores'] / len(active) if len(active) > 0 else np.zeros(len(stats['stores']))
+    hp = pen >= min_pen
+    w = np.where(hp, stats['mean'], 0.0)
+
+    m = stats['matrix']
+    missing = hp.sum() - m @ hp.astype('float64')
+    pot = w.sum() - m @ w
+
+    has = missing > 0
+    df = pd.DataFrame({
+        'חנות': active['שם חנות'].to_numpy()[has],
+        'עיר': active['עיר'].to_numpy()[has],
+        'מכירות': active['שנה2'].to_numpy()[has],
+        'חסרים': np.round(missing[has]).astype(int),
+        'פוטנציאל': np.round(pot[has]).astype(int),
+    }, columns=POTENTIAL_COLUMNS)
+    return df.sort_values('פוטנציאל', ascending=False), int(hp.sum())
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# ========================================
+# מדידת ביצועים לפי קטע - זמן, שורות ושיא זיכרון בכל ריצה
+# ========================================
+LOG_PATH = Path(os.environ.get('PROFILE_LOG', Path(tempfile.gettempdir()) / 'sales_dashboard_profile.jsonl'))
+HISTORY = 20
+
+_log_lock = threading.Lock()
+# tracemalloc משותף לכל התהליך: מופעל פעם אחת ולא נעצר, וכל איפוס שיא
+# מעביר קודם את השיא לכל הקטעים הפתוחים - גם של ריצות אחרות במקביל
+_trace_lock = threading.Lock()
+_open_frames = {}
+
+
+def write_log(record, path=LOG_PATH):
+    """שורת JSON אחת לכל ריצה, לניתוח מחוץ לאפליקציה"""
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+
+
+def _start_tracing():
+    with _trace_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def _sample(push=None, pop=None):
+    """הזיכרון הנוכחי. השיא מאז הדגימה הקודמת נרשם בכל קטע פתוח בתהליך לפני האיפוס"""
+    with _trace_lock:
+        cur, peak = tracemalloc.get_traced_memory()
+        for frame in _open_frames.values():
+            frame['max'] = max(frame['max'], peak)
+        tracemalloc.reset_peak()
+        if pop is not None:
+            del _open_frames[id(pop)]
+        if push is not None:
+            push.update(start=cur, max=cur)
+            _open_frames[id(push)] = push
+        return cur
+
+
+class Profiler:
+    """אוסף מדידות של ריצה אחת. כשהוא כבוי section() לא מודד כלום
+
+    שיא הזיכרון נמדד עם tracemalloc (זיכרון של Python ו-numpy), יחסית
+    לתחילת הקטע. tracemalloc סופר את כל התהליך, ולכן כשכמה ריצות פעילות
+    במקביל השיא כולל גם אותן - הערכה ולא מדידה מדויקת. קטעים מקוננים
+    נשמרים עם עומק.
+    """
+
+    def __init__(self, enabled, history=None, **meta):
+        self.enabled = enabled
+        self.history = history
+        self.meta = meta
+        self.sections = []
+        self._stack = []
+        self._t0 = time.perf_counter()
+        if enabled:
+            _start_tracing()
+
+    @contextmanager
+    def section(self, name, rows=None):
+        """מדידת קטע. אפשר לעדכן rec['rows'] בתוך הבלוק"""
+        rec = {'name': name, 'rows': rows}
+        if not self.enabled:
+            yield rec
+            return
+        frame = {}
+        _sample(push=frame)
+        self._stack.append(frame)
+        rec['depth'] = len(self._stack) - 1
+        self.sections.append(rec)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec['seconds'] = time.perf_counter() - t0
+            _sample(pop=frame)
+            rec['peak_mb'] = (frame['max'] - frame['start']) / 1024 ** 2
+            self._stack.pop()
+
+    def wrap(self, name, fn):
+        """עטיפה לפונקציה שרצה מאוחר יותר (למשל יצירת קובץ בלחיצה על הורדה)"""
+        if not self.enabled:
+            return fn
+        history, meta = self.history, self.meta
+
+        def run():
+            prof = Profiler(True, history, **meta)
+            with prof.section(name):
+                out = fn()
+            prof.finish()
+            return out
+        return run
+
+    def finish(self):
+        """סיום הריצה: רשומה להיסטוריה ולקובץ הלוג"""
+        if not self.enabled:
+            return None
+        record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            **self.meta,
+            'seconds': time.perf_counter() - self._t0,
+            'sections': self.sections,
+        }
+        try:
+            write_log(record)
+        except OSError:  # לוג לא זמין לא אמור להפיל את הדשבורד
+            pass
+        if self.history is not None:
+            self.history.append(record)
+            del self.history[:-HISTORY]
+        return record
@@ -0,0 +1,94 @@
+import pandas as pd
+
+from filter_index import ALL
+
+# ========================================
+# קוביית סיכומים - כמות וסכומי תקופות לכל צירוף של סוכן × עיר × סטטוס
+# (ולמוצרים סיווג × סטטוס). נבנית פעם אחת לגרסת נתונים וספים, והמדדים,
+# העוגות, גרף הערים וקו המגמות נקראים ממנה במקום לסכום את הטבלאות בכל ריצה
+# ========================================
+COUNT = 'כמות'
+PERIODS = ['שנה1', 'שנה2', '6v6_H1', '6v6_H2', '3v3_Q2', '3v3_Q3']
+STORE_DIMS = ['עיר', 'סטטוס']
+PRODUCT_DIMS = ['סיווג', 'סטטוס']
+REL_EPS = 1e-9   # שארית חיסור של סכומים עשרוניים, יחסית לגודל הסכומים - נחשבת 0
+
+
+def _group(df, dims):
+    """סכימה לפי dims. ערך חסר (עיר ריקה) נשמר כקבוצה משלו"""
+    return df.groupby(dims, observed=True, dropna=False, sort=False)[[COUNT] + PERIODS].sum().reset_index()
+
+
+def rollup(rows, dims):
+    """שורה לכל צירוף של dims בטבלה: כמות השורות וסכומי התקופות.
+    תקופות עשרוניות (float32 מ-Feather) נסכמות ב-float64"""
+    floats = {p: 'float64' for p in PERIODS if rows[p].dtype.kind == 'f'}
+    return _group(rows[dims + PERIODS].astype(floats).assign(**{COUNT: 1}), dims)
+
+
+def store_cube(stores, agents):
+    """קוביית החנויות הפעילות. 'סוכן' הוא ALL לכל החנויות, או שם סוכן לחנויות שלו
+
+    agents - {שם: מזהי חנויות}. חנות של כמה סוכנים נספרת אצל כל אחד מהם,
+    ופעם אחת ב-ALL.
+    """
+    active = stores[stores['2v2_אחרון'] > 0]
+    parts = [rollup(active, STORE_DIMS).assign(סוכן=ALL)]
+    for name, ids in agents.items():
+        parts.append(rollup(active[active['מזהה'].isin(ids)], STORE_DIMS).assign(סוכן=name))
+    return pd.concat(parts, ignore_index=True)
+
+
+def product_cube(products):
+    return rollup(products, PRODUCT_DIMS)
+
+
+def subtract(cube, rows, dims):
+    """הקובייה בלי התרומה של rows (למשל חנויות מוחרגות), בלי לסכום מחדש את כל הטבלה"""
+    if not len(rows):
+        return cube
+    minus = rollup(rows, dims)
+    minus[[COUNT] + PERIODS] *= -1
+    both = pd.concat([cube[dims + [COUNT] + PERIODS], minus], ignore_index=True)
+    out = _group(both, dims)
+    # בסכומים עשרוניים החיסור משאיר 1e-12 במקום 0, ותקופה "ריקה" נראית כשינוי חיובי.
+    # שארית קטנה ביחס לסכומים שנחסרו מתאפסת (sort=False - אותו סדר קבוצות)
+    floats = [p for p in PERIODS if out[p].dtype.kind == 'f']
+    if floats:
+        scale = _group(both.assign(**{p: both[p].abs() for p in floats}), dims)
+        out = out.assign(**{p: out[p].mask(out[p].abs() <= REL_EPS * scale[p], 0.0) for p in floats})
+    return out[out[COUNT] > 0].reset_index(drop=True)
+
+
+def agent_view(cube, agent=ALL, excluded_rows=()):
+    """החלק של סוכן (ALL - כל החנויות) בלי החנויות המוחרגות"""
+    part = cube[cube['סוכן'] == agent].drop(columns='סוכן')
+    return subtract(part, excluded_rows, STORE_DIMS)
+
+
+def select(cube, city=ALL, status=ALL):
+    """השורות של עיר וסטטוס - כמו הסינון של FilterIndex, על הקובייה"""
+    if city != ALL:
+        cube = cube[cube['עיר'] == city]
+    if status != ALL:
+        cube = cube[cube['סטטוס'] == status]
+    return cube
+
+
+def count(cube, statuses=None):
+    """מספר השורות בקובייה, או רק בסטטוסים שברשימה"""
+    if statuses is not None:
+        cube = cube[cube['סטטוס'].isin(statuses)]
+    return int(cube[COUNT].sum())
+
+
+def totals(cube, periods=PERIODS):
+    """סכום כל תקופה"""
+    return {p: cube[p].sum() for p in periods}
+
+
+def status_counts(cube):
+    """(סטטוס, כמות) לפי סדר השכיחות - כמו charts.status_counts על הטבלה"""
+    sc = cube.groupby('סטטוס', sort=False)[COUNT].sum().sort_values(ascending=False, kind='stable')
+    sc = sc[sc > 0]
+    return tuple(zip(sc.index.tolist(), sc.tolist()))
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ========================================
+# חנויות דומות - שכנים לפי תמהיל מוצרים והמלצות למוצרים חסרים
+# ========================================
+K = 10           # שכנים לכל חנות
+TOP_N = 20       # המלצות לחנות
+BLOCK_MB = 64    # זיכרון מקסימלי לבלוק של שורות דמיון (חנויות × כל החנויות)
+RECOMMEND_COLUMNS = ['מזהה_מוצר', 'מכירות_צפויות', 'שכנים_מוכרים']
+
+
+def mix_matrix(store_ids, sp_rows):
+    """מטריצת התמהיל: שורה לכל חנות ב-store_ids, עמודה לכל מוצר שנמכר
+
+    'sales' הן מכירות שנה2 (רק חיוביות), ו-'matrix' אותן שורות מנורמלות
+    לאורך 1 - כך שמכפלה בין שורות היא דמיון קוסינוס.
+    """
+    from scipy import sparse  # נטען רק בחישוב הראשון, ולא בהפעלת האפליקציה
+    sold = sp_rows[sp_rows['שנה2'] > 0]
+    rows = pd.Index(store_ids).get_indexer(sold['מזהה_חנות'])
+    keep = rows >= 0
+    prod_ids, cols = np.unique(sold['מזהה_מוצר'].to_numpy()[keep], return_inverse=True)
+    sales = sparse.csr_matrix((sold['שנה2'].to_numpy(dtype='float32')[keep], (rows[keep], cols)),
+                              shape=(len(store_ids), len(prod_ids)), dtype='float32')
+    sales.sum_duplicates()
+    norms = np.sqrt(np.asarray(sales.multiply(sales).sum(axis=1)).ravel())
+    scale = sparse.diags(np.where(norms > 0, 1 / np.where(norms > 0, norms, 1), 0).astype('float32'))
+    return {
+        'store_ids': np.asarray(store_ids),
+        'product_ids': prod_ids,
+        'sales': sales,
+        'matrix': (scale @ sales).tocsr(),
+    }
+
+
+def block_rows(n_stores, block_mb=BLOCK_MB):
+    """כמה שורות נכנסות לבלוק: דמיון float32 ומיקומי argpartition לכל זוג"""
+    return max(1, int(block_mb * 1024 ** 2 // (12 * max(n_stores, 1))))
+
+
+def _top_k(m, rows, k):
+    """K השכנים הקרובים לכל שורה ב-rows (בלי החנות עצמה), ממוינים לפי דמיון"""
+    sim = (m[rows] @ m.T).toarray()
+    sim[np.arange(len(rows)), rows] = -1.0
+    k = min(k, m.shape[0] - 1)
+    if k <= 0:
+        return np.empty((len(rows), 0), dtype='int32'), np.empty((len(rows), 0), dtype='float32')
+    idx = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(sim, idx, axis=1)
+    order = np.argsort(-top, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1).astype('int32'), np.take_along_axis(top, order, axis=1)
+
+
+_worker = {}
+
+
+def _init_worker(m):
+    _worker['m'] = m
+
+
+def _run_block(rows, k):
+    return _top_k(_worker['m'], rows, k)
+
+
+def neighbors(mix, rows=None, k=K, block_mb=BLOCK_MB, workers=1):
+    """שכנים לשורות (ברירת מחדל: כל החנויות), בבלוקים בגודל זיכרון חסום
+
+    כל בלוק מחשב דמיון של כמה חנויות מול כל החנויות ושומר רק את K
+    הקרובות. עם workers > 1 הבלוקים רצים בתהליכים נפרדים, שכל אחד מקבל
+    את המטריצה פעם אחת. מחזיר (מיקומי שכנים, דמיון) בגודל len(rows) × K.
+    """
+    m = mix['matrix']
+    rows = np.arange(m.shape[0]) if rows is None else np.asarray(rows, dtype=int)
+    step = block_rows(m.shape[0], block_mb)
+    blocks = [rows[a:a + step] for a in range(0, len(rows), step)]
+    if workers and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(m,)) as pool:
+            parts = list(pool.map(_run_block, blocks, [k] * len(blocks)))
+    else:
+        parts = [_top_k(m, b, k) for b in blocks]
+    if not parts:
+        return np.empty((0, 0), dtype='int32'), np.empty((0, 0), dtype='float32')
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def recommend(mix, pos, nbr_idx, nbr_sim, top_n=TOP_N):
+    """מוצרים שהחנות במיקום pos לא מוכרת, לפי המכירות הצפויות אצל השכנים
+
+    מכירות צפויות = ממוצע מכירות המוצר אצל השכנים, משוקלל בדמיון (שכן שלא
+    מוכר את המוצר נספר כ-0).
+    """
+    w = np.clip(nbr_sim, 0, None).astype('float64')
+    if not len(w) or w.sum() == 0:
+        return pd.DataFrame(columns=RECOMMEND_COLUMNS)
+    nbr_sales = mix['sales'][nbr_idx]
+    expected = np.asarray(nbr_sales.T @ w).ravel() / w.sum()
+    selling = np.bincount(nbr_sales.indices, minlength=nbr_sales.shape[1])
+    expected[mix['sales'][pos].indices] = 0
+    top = np.flatnonzero(expected > 0)
+    top = top[np.argsort(-expected[top], kind='stable')][:top_n]
+    return pd.DataFrame({
+        'מזהה_מוצר': mix['product_ids'][top],
+        'מכירות_צפויות': np.round(expected[top]).astype(int),
+        'שכנים_מוכרים': selling[top],
+    }, columns=RECOMMEND_COLUMNS)
+
+
+def store_recommendations(mix, store_id, products, k=K, top_n=TOP_N):
+    """המלצות לחנות אחת עם שם וסיווג המוצר. products - המוצרים שבטווח (בלי מוחרגים)"""
+    pos = pd.Index(mix['store_ids']).get_indexer([store_id])[0]
+    if pos < 0:
+        return pd.DataFrame(columns=['מוצר', 'סיווג'] + RECOMMEND_COLUMNS[1:])
+    nbr_idx, nbr_sim = neighbors(mix, [pos], k)
+    rec = recommend(mix, pos, nbr_idx[0], nbr_sim[0], top_n=len(mix['product_ids']))
+    return with_products(rec, products, top_n)
+
+
+def with_products(rec, products, top_n=TOP_N):
+    """שם וסיווג למוצרים המומלצים, רק למוצרים שבטווח"""
+    info = products[['מזהה', 'מוצר', 'סיווג']].rename(columns={'מזהה': 'מזהה_מוצר'})
+    out = rec.merge(info, on='מזהה_מוצר', how='inner').head(top_n)
+    return out[['מוצר', 'סיווג', 'מכירות_צפויות', 'שכנים_מוכרים']]
@@ -0,0 +1,43 @@
+import numpy as np
+
+# ========================================
+# אינדקס חנות/מוצר על טבלת חנויות × מוצרים
+# ========================================
+
+
+def _ranges(sorted_keys):
+    """{מפתח: (התחלה, סוף)} לכל רצף של מפתח זהה במערך ממוין"""
+    keys, starts = np.unique(sorted_keys, return_index=True)
+    ends = np.append(starts[1:], len(sorted_keys))
+    return dict(zip(keys.tolist(), zip(starts.tolist(), ends.tolist())))
+
+
+def build_index(sp):
+    """מיון sp לפי חנות ובניית טווחי שורות לכל חנות ולכל מוצר
+
+    מחזיר את sp הממוין ואת האינדקס. שורות של חנות הן פרוסה רציפה,
+    ושורות של מוצר נשלפות דרך סדר המיון לפי מוצר - בלי סריקה של הטבלה.
+    """
+    sp = sp.sort_values('מזהה_חנות', kind='stable', ignore_index=True)
+    prod_ids = sp['מזהה_מוצר'].to_numpy()
+    prod_order = np.argsort(prod_ids, kind='stable')
+    index = {
+        'store': _ranges(sp['מזהה_חנות'].to_numpy()),
+        'product': _ranges(prod_ids[prod_order]),
+        'product_order': prod_order,
+    }
+    return sp, index
+
+
+def store_rows(sp, index, sid):
+    r = index['store'].get(int(sid))
+    if r is None:
+        return sp.iloc[0:0]
+    return sp.iloc[r[0]:r[1]]
+
+
+def product_rows(sp, index, pid):
+    r = index['product'].get(int(pid))
+    if r is None:
+        return sp.iloc[0:0]
+    return sp.take(index['product_order'][r[0]:r[1]])
@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_io
+from aggregate import SP_COLUMNS
+from potential import presence_matrix
+
+# ========================================
+# מאגר SQLite אופציונלי - sp נשאר על הדיסק ונשלף בשאילתות
+# ========================================
+DB_FILE = 'data.sqlite'
+# pandas (ברירת מחדל) / sqlite / auto - SQLite רק כשקובץ sp גדול
+BACKEND = os.environ.get('SP_BACKEND', 'pandas')
+AUTO_MB = 500
+CHUNK_ROWS = 50_000
+SP_TEXT = ['שם_חנות', 'עיר', 'מוצר', 'סיווג']
+
+
+def db_path(data_dir=data_io.DATA_DIR):
+    return Path(data_dir) / DB_FILE
+
+
+def use_sql(data_dir=data_io.DATA_DIR, backend=BACKEND):
+    """האם לעבוד מול SQLite במקום sp בזיכרון"""
+    if backend == 'sqlite':
+        return True
+    if backend == 'auto':
+        path = Path(data_dir) / data_io.DATA_FILES['sp']
+        return path.exists() and path.stat().st_size >= AUTO_MB * 1024 ** 2
+    return False
+
+
+def _q(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _ids(values):
+    """רשימת מזהים כפרמטר יחיד - נפתחת בשאילתה עם json_each, בלי מגבלת מספר פרמטרים"""
+    return json.dumps([int(v) for v in values])
+
+
+def _sp_chunks(data_dir):
+    """שורות sp במקטעים - מ-Feather כשזמין, אחרת קריאה מוזרמת של ה-JSON"""
+    if data_io.has_columnar('sp', data_dir):
+        table = data_io.feather.read_table(data_io.columnar_path('sp', data_dir), memory_map=True)
+        for batch in table.to_batches(CHUNK_ROWS):
+            yield batch.to_pandas()
+        return
+    batch = []
+    for rec in data_io.iter_json_array(Path(data_dir) / data_io.DATA_FILES['sp']):
+        batch.append(rec)
+        if len(batch) >= CHUNK_ROWS:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def _text(df):
+    # טקסט נשמר כטקסט גם כשהוא category או מעורב עם 0 (עיר חסרה)
+    for c in df.columns:
+        if c in SP_TEXT or isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(object)
+    return df
+
+
+def build(data_dir=data_io.DATA_DIR, path=None, source=None):
+    """כתיבת sp לקובץ SQLite עם אינדקסים על חנות ומוצר. החנויות והמוצרים
+    נשארים בזיכרון (הם קטנים), ולכן לא נכתבים למאגר
+
+    sp נכתב במקטעים, כך שהבנייה לא מחזיקה את כל הטבלה בזיכרון. הקובץ
+    נכתב לשם זמני ומוחלף בסוף, כך שתהליכים אחרים לא רואים קובץ חלקי.
+    source היא חתימת קבצי המקור (נשמרת כדי לדעת מתי לבנות מחדש).
+    """
+    path = Path(path or db_path(data_dir))
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute('PRAGMA journal_mode=OFF')
+        con.execute('PRAGMA synchronous=OFF')
+        rows = 0
+        columns = None
+        for chunk in _sp_chunks(data_dir):
+            columns = columns or list(chunk.columns)
+            _text(chunk.reindex(columns=columns)).to_sql('sp', con, index=False, if_exists='append')
+            rows += len(chunk)
+        if columns is None:
+            pd.DataFrame(columns=SP_COLUMNS).to_sql('sp', con, index=False)
+        con.execute('CREATE INDEX sp_store ON sp ("מזהה_חנות")')
+        con.execute('CREATE INDEX sp_product ON sp ("מזהה_מוצר")')
+        con.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        con.executemany('INSERT INTO meta VALUES (?, ?)', [('source', json.dumps(source)), ('sp_rows', str(rows))])
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, path)
+    return path
+
+
+class SqlStore:
+    """שליפות מ-sp בקובץ SQLite. חיבור לקריאה בלבד לכל thread"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        meta = dict(self._con().execute('SELECT key, value FROM meta').fetchall())
+        self.source = json.loads(meta['source'])
+        self.n_rows = int(meta['sp_rows'])
+        self.columns = [r[1] for r in self._con().execute('PRAGMA table_info(sp)')]
+
+    def __len__(self):
+        return self.n_rows
+
+    def _con(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.con = con
+        return con
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._con(), params=params)
+
+    def store_rows(self, sid):
+        """שורות sp של חנות, בסדר הקובץ"""
+        return self.query('SELECT * FROM sp WHERE "מזהה_חנות" = ? ORDER BY rowid', (int(sid),))
+
+    def product_rows(self, pid, store_ids=None):
+        """שורות sp של מוצר, ממוינות לפי חנות. store_ids מגביל לחנויות נתונות"""
+        where = '' if store_ids is None else ' AND "מזהה_חנות" IN (SELECT value FROM json_each(?))'
+        params = (int(pid),) if store_ids is None else (int(pid), _ids(store_ids))
+        return self.query(f'SELECT * FROM sp WHERE "מזהה_מוצר" = ?{where} ORDER BY "מזהה_חנות", rowid', params)
+
+    def rows(self, store_ids, excluded_prod_ids=()):
+        """שורות sp של רשימת חנויות בלי מוצרים מוחרגים, ממוינות לפי חנות"""
+        return self.query('SELECT * FROM sp WHERE "מזהה_חנות" IN (SELECT value FROM json_each(?)) '
+                          'AND "מזהה_מוצר" NOT IN (SELECT value FROM json_each(?)) ORDER BY "מזהה_חנות", rowid',
+                          (_ids(store_ids), _ids(excluded_prod_ids)))
+
+    def sold(self, store_ids):
+        """(חנות, מוצר, שנה2) לשורות עם מכירות בשנה2 - לבניית מטריצת התמהיל"""
+        return self.query('SELECT "מזהה_חנות", "מזהה_מוצר", "שנה2" FROM sp WHERE "שנה2" > 0 '
+                          'AND "מזהה_חנות" IN (SELECT value FROM json_each(?))', (_ids(store_ids),))
+
+    def presence(self, store_ids, excluded_prod_ids=()):
+        """אותו פלט כמו presence_stats - הסכימה לפי מוצר נעשית בשאילתה"""
+        scope = ('FROM sp WHERE "שנה2" > 0 AND "מזהה_חנות" IN (SELECT value FROM json_each(?)) '
+                 'AND "מזהה_מוצר" NOT IN (SELECT value FROM json_each(?))')
+        params = (_ids(store_ids), _ids(excluded_prod_ids))
+        per_product = self.query('SELECT "מזהה_מוצר" AS pid, COUNT(DISTINCT "מזהה_חנות") AS stores, '
+                                 f'SUM("שנה2") * 1.0 / COUNT(*) AS mean {scope} GROUP BY "מזהה_מוצר" ORDER BY pid',
+                                 params)
+        pairs = self._con().execute(f'SELECT "מזהה_חנות", "מזהה_מוצר" {scope}', params).fetchall()
+        pairs = np.array(pairs, dtype='int64').reshape(-1, 2)
+        prod_ids = per_product['pid'].to_numpy()
+        return {
+            'matrix': presence_matrix(store_ids, pairs[:, 0], np.searchsorted(prod_ids, pairs[:, 1]), len(prod_ids)),
+            'product_ids': prod_ids,
+            'stores': per_product['stores'].to_numpy(),
+            'mean': per_product['mean'].to_numpy(dtype='float64'),
+        }
+
+    def fingerprint(self):
+        """טביעת אצבע לכל חנות (מספר שורות וסכומים) - לזיהוי חנויות שהשתנו"""
+        nums = [c for c in self.columns if c not in SP_TEXT and c != 'מזהה_חנות']
+        sums = ', '.join(f'TOTAL({_q(c)}) AS {_q(c)}' for c in nums)
+        return self.query(f'SELECT "מזהה_חנות", COUNT(*) AS n, TOTAL("מזהה_מוצר" * "שנה2") AS mix, {sums} '
+                          'FROM sp GROUP BY "מזהה_חנות"')
+
+
+def source_signature(data_dir=data_io.DATA_DIR):
+    """חתימת קבצי המקור של sp, בצורה שנשמרת ב-JSON"""
+    return json.loads(json.dumps(data_io.file_signature('sp', data_dir)))
+
+
+def open_store(data_dir=data_io.DATA_DIR):
+    """פתיחת המאגר, ובנייה מחדש כשהוא חסר או נבנה מקבצי מקור אחרים"""
+    path = db_path(data_dir)
+    source = source_signature(data_dir)
+    if path.exists():
+        try:
+            store = SqlStore(path)
+            if store.source == source:
+                return store
+        except (sqlite3.DatabaseError, KeyError):
+            pass
+    build(data_dir, path, source)
+    return SqlStore(path)
+
+
+if __name__ == '__main__':
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else data_io.DATA_DIR
+    print(build(target, source=source_signature(target)))
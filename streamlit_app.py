@@ -1,24 +1,26 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import json
-import io
-from pathlib import Path
-from fpdf import FPDF
+import numpy as np
 import base64
+from agents import AGENTS_DATA, ADMIN_PASSWORD
+from pdf_report import cached_store_pdf, report_key
+from live_data import DataSource
+from sp_index import product_rows
+from potential import presence_stats, potential_table
+import pipeline
+import similar
+import charts
+import rollup
+import alerts
+from filter_index import FilterIndex, value_masks, ALL
+from exports import to_excel, excel_bytes
+from metrics import chg, add_changes, STORE_CHANGES, DEFAULT_TH
+from profiling import Profiler, LOG_PATH
+from formatting import fmt_num, fmt_pct, display_table, ALERT_FORMAT, RECOVERY_FORMAT
+from tables import paged_table, WIDGETS as TABLE_WIDGETS
 
 st.set_page_config(page_title="דשבורד מכירות", page_icon="📊", layout="wide")
 
-# ========================================
-# נתוני סוכנים
-# ========================================
-AGENTS_DATA = {
-    "יוסף": {"password": "Agen148", "stores": [67, 834, 291, 262, 685, 702, 638, 664, 1299, 1300, 1303, 1316, 1317, 1318, 1319, 1320, 1321, 1325, 1326, 1330, 1331, 1332, 1333, 1334, 1335, 1337, 1340, 1341]},
-    "ניקול": {"password": "Agen148", "stores": [665, 441, 1094, 340, 1106, 1122, 1093, 62, 599, 263, 1084, 309, 624, 1227]},
-}
-ADMIN_PASSWORD = "admin2025"
-
 st.markdown("""
 <style>
 .main > div {direction: rtl; text-align: right;}
@@ -76,237 +78,102 @@ def check_login():
         return False
     return True
 
-@st.cache_data
-def load_data():
-    p = Path(__file__).parent
-    with open(p/'data_stores.json', 'r', encoding='utf-8') as f:
-        stores = pd.DataFrame(json.load(f))
-    with open(p/'data_products.json', 'r', encoding='utf-8') as f:
-        products = pd.DataFrame(json.load(f))
-    with open(p/'data_sp.json', 'r', encoding='utf-8') as f:
-        sp = pd.DataFrame(json.load(f))
-    return stores, products, sp
-
-def chg(new, old):
-    if pd.isna(old) or old == 0:
-        return 0
-    return (new - old) / old
-
-def fmt_pct(v):
-    if pd.isna(v) or v == 0:
-        return "0.0%"
-    return f"{v:+.1%}"
-
-def fmt_num(v):
-    if pd.isna(v):
-        return "0"
-    return f"{v:,.0f}"
-
-def calc_status(r, th):
-    if r['שנה1'] == 0:
-        return 'חדש/ה'
-    c = chg(r['שנה2'], r['שנה1'])
-    c6 = chg(r['6v6_H2'], r['6v6_H1'])
-    if c < th['סכנה'] and c6 < th['סכנה_6v6']:
-        return 'סכנה'
-    elif c > th['צמיחה'] and c6 > th['צמיחה_6v6']:
-        return 'צמיחה'
-    elif c >= th['יציב_תחתון'] and c <= th['יציב_עליון']:
-        return 'יציב'
-    elif c < th['יציב_תחתון'] and c6 > 0.05:
-        return 'התאוששות'
-    else:
-        return 'שחיקה'
-
-def to_excel(df, sheet):
-    out = io.BytesIO()
-    with pd.ExcelWriter(out, engine='xlsxwriter') as w:
-        df.to_excel(w, sheet_name=sheet, index=False)
-    return out.getvalue()
-
-def reverse_hebrew(text):
-    """הפיכת טקסט עברי לתצוגה ב-PDF"""
-    if pd.isna(text):
-        return '-'
-    return str(text)[::-1]
-
-def create_store_pdf(store_info, store_products, missing_products):
-    """יצירת PDF מעוצב לחנות בודדת"""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # הוספת פונט עברי
-    font_path = Path(__file__).parent / 'FreeSerif.ttf'
-    if font_path.exists():
-        pdf.add_font('Hebrew', '', str(font_path))
-        pdf.add_font('Hebrew', 'B', str(font_path.parent / 'FreeSerifBold.ttf'))
+# מקור הנתונים משותף לכל החיבורים. בכל ריצה נבדק אם קבצי הנתונים הוחלפו,
+# ורק קובץ שהשתנה נטען מחדש. הגרסה היא המפתח של כל המטמונים שאחריו.
+# הטבלאות עצמן הן אובייקט אחד לכל התהליך, בלי העתק לכל ריצה. הן לקריאה
+# בלבד - כל שלב שמוסיף עמודות עובד על העתק רדוד
+@st.cache_resource
+def data_source():
+    return DataSource()
+
+# ========================================
+# שלבי חישוב - כל שלב נשמר במטמון לפי הקלטים שלו בלבד
+# (טבלאות עם קו תחתון לא נכנסות למפתח - הן נקבעות לפי גרסת הנתונים).
+# שלבים שמחזירים טבלאות משותפים (cache_resource), ושלבים שמחזירים ערכים קטנים
+# נשמרים עם cache_data
+# ========================================
+@st.cache_resource(max_entries=2)
+def static_stage(_stores, _products, version):
+    return pipeline.static_metrics(_stores, _products)
+
+# חלוקה לפי סוכן: אובייקט אחד משותף לכל החיבורים של אותו סוכן (cache_resource
+# לא מעתיק), ונבנה מחדש רק כשגרסת הנתונים או רשימת החנויות משתנות
+@st.cache_resource(max_entries=64)
+def agent_partition(_stores, _sp, _sp_idx, version, user_stores):
+    return pipeline.partition(_stores, _sp, _sp_idx, user_stores)
+
+# הסטטוס תלוי בספים - יחד איתו נשמרות מסכה לכל סטטוס
+@st.cache_resource(max_entries=32)
+def status_stage(_stores, _products, version, th, user_stores):
+    store_status, product_status = pipeline.classify(_stores, _products, th)
+    return (pipeline.with_status(_stores, store_status, 'דירוג_מכירות'),
+            pipeline.with_status(_products, product_status, 'דירוג'),
+            value_masks(store_status))
+
+# אינדקס הסינון: מסכות לכל סוכן ועיר ותוויות הבחירה, פעם אחת לגרסה ולסוכן
+@st.cache_resource(max_entries=64)
+def filter_index(_stores, _products, version, user_stores):
+    return FilterIndex(_stores, _products, user_stores)
+
+# קוביית הסיכומים: על כל החנויות (לפני החלוקה לסוכן) עם ממד סוכן, פעם אחת
+# לגרסת נתונים וספים ומשותפת לכל החיבורים
+@st.cache_resource(max_entries=32)
+def rollup_stage(_stores, _products, version, th):
+    agents = {name: a['stores'] for name, a in AGENTS_DATA.items()}
+    return rollup.store_cube(_stores, agents), rollup.product_cube(_products)
+
+# החלק של הסינון הנוכחי בקובייה: החנויות והמוצרים המוחרגים מופחתים, בלי
+# לסכום מחדש את הטבלאות. רשימת חנויות שאינה של סוכן מהקובייה נסכמת ישירות
+@st.cache_resource(max_entries=64)
+def cube_stage(_cubes, _stores, _products, _index, version, th, agent, user_stores, excluded_ids, excluded_prod_ids, city, status):
+    if user_stores is None or AGENTS_DATA.get(agent, {}).get('stores') == list(user_stores):
+        excluded = _stores.iloc[np.flatnonzero(_index.active & ~_index.scope(excluded_ids))]
+        active = rollup.agent_view(_cubes[0], agent if user_stores is not None else ALL, excluded)
     else:
-        pdf.add_font('Hebrew', '', '/usr/share/fonts/truetype/freefont/FreeSerif.ttf')
-        pdf.add_font('Hebrew', 'B', '/usr/share/fonts/truetype/freefont/FreeSerifBold.ttf')
-    
-    # === כותרת ראשית ===
-    pdf.set_fill_color(102, 126, 234)  # סגול-כחול
-    pdf.rect(0, 0, 210, 35, 'F')
-    pdf.set_font('Hebrew', 'B', 28)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_y(8)
-    pdf.cell(0, 12, reverse_hebrew("דוח חנות"), align='C')
-    pdf.ln(12)
-    pdf.set_font('Hebrew', 'B', 18)
-    pdf.cell(0, 10, reverse_hebrew(str(store_info['שם חנות'])), align='C')
-    
-    # איפוס צבע טקסט
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_y(45)
-    
-    # === תיבת פרטי חנות ===
-    pdf.set_fill_color(248, 249, 250)
-    pdf.rect(10, 45, 190, 25, 'F')
-    pdf.set_draw_color(200, 200, 200)
-    pdf.rect(10, 45, 190, 25, 'D')
-    
-    pdf.set_font('Hebrew', '', 12)
-    pdf.set_y(50)
-    details = f"עיר: {store_info['עיר'] if pd.notna(store_info['עיר']) else '-'}  |  מזהה: {store_info['מזהה']}  |  דירוג: #{int(store_info['דירוג'])}  |  סטטוס: {store_info['סטטוס']}"
-    pdf.cell(0, 8, reverse_hebrew(details), align='C')
-    
-    pdf.set_y(75)
-    
-    # === מדדי מכירות ===
-    pdf.set_font('Hebrew', 'B', 14)
-    pdf.set_fill_color(102, 126, 234)
-    pdf.set_text_color(255, 255, 255)
-    pdf.cell(0, 10, reverse_hebrew("  מדדי מכירות  "), align='R', fill=True)
-    pdf.ln(12)
-    pdf.set_text_color(0, 0, 0)
-    
-    # טבלת מדדים
-    pdf.set_font('Hebrew', 'B', 10)
-    pdf.set_fill_color(230, 230, 230)
-    col_w = 47.5
-    pdf.cell(col_w, 8, reverse_hebrew("שינוי"), border=1, align='C', fill=True)
-    pdf.cell(col_w, 8, reverse_hebrew("נוכחי"), border=1, align='C', fill=True)
-    pdf.cell(col_w, 8, reverse_hebrew("קודם"), border=1, align='C', fill=True)
-    pdf.cell(col_w, 8, reverse_hebrew("תקופה"), border=1, align='C', fill=True)
-    pdf.ln()
-    
-    pdf.set_font('Hebrew', '', 10)
-    metrics_data = [
-        ("שנתי", store_info['שנה1'], store_info['שנה2'], store_info['שינוי_שנתי']),
-        ("H1 vs H2", store_info['6v6_H1'], store_info['6v6_H2'], store_info['שינוי_6v6']),
-        ("Q2 vs Q3", store_info['3v3_Q2'], store_info['3v3_Q3'], store_info['שינוי_רבעוני']),
-        ("8-9 vs 10-11", store_info['2v2_קודם'], store_info['2v2_אחרון'], store_info['שינוי_2v2']),
-    ]
-    
-    for period, prev_val, curr_val, change in metrics_data:
-        # צבע לפי שינוי
-        if change > 0:
-            pdf.set_fill_color(212, 237, 218)  # ירוק בהיר
-        elif change < -0.1:
-            pdf.set_fill_color(248, 215, 218)  # אדום בהיר
-        else:
-            pdf.set_fill_color(255, 255, 255)
-        
-        pdf.cell(col_w, 7, f"{change:+.1%}", border=1, align='C', fill=True)
-        pdf.set_fill_color(255, 255, 255)
-        pdf.cell(col_w, 7, f"{curr_val:,.0f}", border=1, align='C')
-        pdf.cell(col_w, 7, f"{prev_val:,.0f}", border=1, align='C')
-        pdf.cell(col_w, 7, reverse_hebrew(period), border=1, align='C')
-        pdf.ln()
-    
-    pdf.ln(8)
-    
-    # === טבלת מוצרים בחנות ===
-    if len(store_products) > 0:
-        pdf.set_font('Hebrew', 'B', 14)
-        pdf.set_fill_color(40, 167, 69)  # ירוק
-        pdf.set_text_color(255, 255, 255)
-        pdf.cell(0, 10, reverse_hebrew(f"  מוצרים בחנות ({len(store_products)})  "), align='R', fill=True)
-        pdf.ln(12)
-        pdf.set_text_color(0, 0, 0)
-        
-        # כותרות טבלה
-        pdf.set_font('Hebrew', 'B', 8)
-        pdf.set_fill_color(230, 230, 230)
-        pdf.cell(18, 7, reverse_hebrew("שינוי"), border=1, align='C', fill=True)
-        pdf.cell(22, 7, reverse_hebrew("נוכחי"), border=1, align='C', fill=True)
-        pdf.cell(22, 7, reverse_hebrew("קודם"), border=1, align='C', fill=True)
-        pdf.cell(18, 7, reverse_hebrew("שינוי 3v3"), border=1, align='C', fill=True)
-        pdf.cell(22, 7, reverse_hebrew("Q3"), border=1, align='C', fill=True)
-        pdf.cell(22, 7, reverse_hebrew("Q2"), border=1, align='C', fill=True)
-        pdf.cell(28, 7, reverse_hebrew("סיווג"), border=1, align='C', fill=True)
-        pdf.cell(38, 7, reverse_hebrew("מוצר"), border=1, align='C', fill=True)
-        pdf.ln()
-        
-        pdf.set_font('Hebrew', '', 7)
-        top_products = store_products.nlargest(15, 'שנה2')
-        for _, row in top_products.iterrows():
-            change = (row['שנה2'] - row['שנה1']) / row['שנה1'] if row['שנה1'] > 0 else 0
-            change_3v3 = (row['3v3_Q3'] - row['3v3_Q2']) / row['3v3_Q2'] if row['3v3_Q2'] > 0 else 0
-            
-            if change > 0:
-                pdf.set_fill_color(212, 237, 218)
-            elif change < -0.1:
-                pdf.set_fill_color(248, 215, 218)
-            else:
-                pdf.set_fill_color(255, 255, 255)
-            
-            pdf.cell(18, 6, f"{change:+.1%}", border=1, align='C', fill=True)
-            pdf.set_fill_color(255, 255, 255)
-            pdf.cell(22, 6, f"{row['שנה2']:,.0f}", border=1, align='C')
-            pdf.cell(22, 6, f"{row['שנה1']:,.0f}", border=1, align='C')
-            
-            # צבע לשינוי 3v3
-            if change_3v3 > 0:
-                pdf.set_fill_color(212, 237, 218)
-            elif change_3v3 < -0.1:
-                pdf.set_fill_color(248, 215, 218)
-            else:
-                pdf.set_fill_color(255, 255, 255)
-            pdf.cell(18, 6, f"{change_3v3:+.1%}", border=1, align='C', fill=True)
-            
-            pdf.set_fill_color(255, 255, 255)
-            pdf.cell(22, 6, f"{row['3v3_Q3']:,.0f}", border=1, align='C')
-            pdf.cell(22, 6, f"{row['3v3_Q2']:,.0f}", border=1, align='C')
-            pdf.cell(28, 6, reverse_hebrew(str(row['סיווג'])[:12] if pd.notna(row['סיווג']) else '-'), border=1, align='C')
-            pdf.cell(38, 6, reverse_hebrew(str(row['מוצר'])[:18]), border=1, align='R')
-            pdf.ln()
-    
-    # === עמוד חדש למוצרים חסרים ===
-    if len(missing_products) > 0:
-        pdf.add_page()
-        
-        # כותרת
-        pdf.set_fill_color(220, 53, 69)  # אדום
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font('Hebrew', 'B', 14)
-        pdf.cell(0, 10, reverse_hebrew(f"  מוצרים שהחנות לא מקבלת ({len(missing_products)})  "), align='R', fill=True)
-        pdf.ln(12)
-        pdf.set_text_color(0, 0, 0)
-        
-        # כותרות טבלה
-        pdf.set_font('Hebrew', 'B', 9)
-        pdf.set_fill_color(230, 230, 230)
-        pdf.cell(40, 7, reverse_hebrew("מכירות כלליות"), border=1, align='C', fill=True)
-        pdf.cell(50, 7, reverse_hebrew("סיווג"), border=1, align='C', fill=True)
-        pdf.cell(100, 7, reverse_hebrew("מוצר"), border=1, align='C', fill=True)
-        pdf.ln()
-        
-        pdf.set_font('Hebrew', '', 8)
-        for _, row in missing_products.head(25).iterrows():
-            pdf.cell(40, 6, f"{row['שנה2']:,.0f}", border=1, align='C')
-            pdf.cell(50, 6, reverse_hebrew(str(row['סיווג'])[:20] if pd.notna(row['סיווג']) else '-'), border=1, align='C')
-            pdf.cell(100, 6, reverse_hebrew(str(row['מוצר'])[:45]), border=1, align='R')
-            pdf.ln()
-    
-    # === Footer ===
-    pdf.set_y(-20)
-    pdf.set_font('Hebrew', '', 8)
-    pdf.set_text_color(128, 128, 128)
-    from datetime import datetime
-    pdf.cell(0, 10, reverse_hebrew(f"נוצר בתאריך: {datetime.now().strftime('%d/%m/%Y %H:%M')}"), align='C')
-    
-    return bytes(pdf.output())
+        active = rollup.rollup(_stores.iloc[np.flatnonzero(_index.scope(excluded_ids))], rollup.STORE_DIMS)
+    excluded_prods = _products.iloc[np.flatnonzero(~_index.product_scope(excluded_prod_ids))]
+    return {
+        'active': active,
+        'filtered': rollup.select(active, city, status),
+        'products': rollup.subtract(_cubes[1], excluded_prods, rollup.PRODUCT_DIMS),
+    }
+
+@st.cache_resource(max_entries=32)
+def potential_stage(_store_ids, _sp, _sp_idx, version, user_stores, excluded_ids, excluded_prod_ids):
+    return presence_stats(_store_ids, pipeline.scope_sp(_sp, _sp_idx, _store_ids, excluded_prod_ids))
+
+# עם SQLite: הנוכחות והסכימה לפי מוצר מחושבות בשאילתה, בלי sp בזיכרון
+@st.cache_resource(max_entries=32)
+def potential_query(_sql, _store_ids, version, user_stores, excluded_ids, excluded_prod_ids):
+    return _sql.presence(_store_ids, excluded_prod_ids)
+
+# חנויות דומות: מטריצת התמהיל של כל החנויות הפעילות (לא רק של הסוכן), פעם
+# אחת לגרסת נתונים. השכנים של חנות מחושבים רק כשהיא נבחרת
+@st.cache_resource(max_entries=2)
+def mix_stage(_stores, _sp, _sql, version):
+    ids = _stores.loc[_stores['2v2_אחרון'] > 0, 'מזהה'].to_numpy()
+    return similar.mix_matrix(ids, _sql.sold(ids) if _sql is not None else _sp)
+
+@st.cache_data(max_entries=256)
+def recommend_stage(_mix, _products, version, sid, excluded_prod_ids):
+    return similar.store_recommendations(_mix, sid, _products)
+
+# גרפים: נבנים מהסיכום שלהם (זוגות ערכים קטנים) ומשותפים בין החיבורים, כך
+# שגרף נבנה מחדש רק כשהסיכום משתנה. st.plotly_chart לא משנה את האובייקט
+@st.cache_resource(max_entries=256)
+def figure(kind, data):
+    return charts.FIGURES[kind](data)
+
+@st.cache_resource(max_entries=64)
+def filter_stage(_stores, _products, _index, _status_masks, version, th, user_stores, excluded_ids, excluded_prod_ids, city, status):
+    masks = _index.masks(_status_masks, excluded_ids, excluded_prod_ids, city, status)
+    scope = pipeline.scope_frames(_stores, _products, _index.positions(*masks))
+    scope['store_options'] = _index.stores.options(masks[1])
+    scope['product_options'] = _index.products.options(masks[2])
+    return scope
+
+# הטעינה הראשונה מתחילה ברקע כבר במסך הכניסה, בזמן שהמשתמש מקליד סיסמה
+data_source().preload()
 
 if not check_login():
     st.stop()
@@ -327,158 +194,158 @@ if st.session_state.user_type == "agent":
 else:
     st.markdown(f'<div class="agent-header">👑 מצב מנהל - גישה לכל הנתונים</div>', unsafe_allow_html=True)
 
-stores, products, sp = load_data()
+# מדידת ביצועים - רק למנהל ורק כשהופעלה בסרגל הצד
+prof = Profiler(st.session_state.user_type == "admin" and st.session_state.get("profiling", False),
+                st.session_state.setdefault("profile_history", []), user=st.session_state.user_name)
+
+with prof.section("טעינת נתונים") as rec:
+    stores, products, sp, sp_idx, load_stats = data_source().refresh()
+    sql = data_source().sql  # None כשטבלת sp בזיכרון (ברירת המחדל)
+    all_stores, all_sp = stores, sp  # לפני החלוקה לסוכן - לחנויות דומות
+    rec['rows'] = len(sp if sp is not None else sql)
 
 # סרגל צד
 st.sidebar.title("📊 דשבורד מכירות")
 st.sidebar.markdown(f"**משתמש:** {st.session_state.user_name}")
+waited = f" (המתנה {load_stats['waited']:.2f})" if load_stats['waited'] is not None else ""
+st.sidebar.caption(f"⏱️ טעינת נתונים: {load_stats['seconds']:.2f} שניות{waited} | 💾 {load_stats['mb']:.1f} MB | {', '.join(sorted(set(load_stats['formats'].values())))} | גרסה {load_stats['version']}")
+if load_stats['changed']:
+    table_names = {'stores': 'חנויות', 'products': 'מוצרים', 'sp': 'חנויות במכירות'}
+    st.sidebar.caption("🔄 עודכנו: " + ", ".join(f"{table_names[k]} ({n})" for k, n in load_stats['changed'].items()))
 st.sidebar.markdown("---")
 
 st.sidebar.subheader("⚙️ הגדרות ספים")
 with st.sidebar.expander("🎚️ שנה ספים"):
     th = {}
-    th['צמיחה'] = st.slider("צמיחה שנתי", 0.0, 0.20, 0.05, 0.01)
-    th['צמיחה_6v6'] = st.slider("צמיחה 6v6", -0.20, 0.10, -0.05, 0.01)
+    th['צמיחה'] = st.slider("צמיחה שנתי", 0.0, 0.20, DEFAULT_TH['צמיחה'], 0.01)
+    th['צמיחה_6v6'] = st.slider("צמיחה 6v6", -0.20, 0.10, DEFAULT_TH['צמיחה_6v6'], 0.01)
     th['יציב_עליון'] = th['צמיחה']
-    th['יציב_תחתון'] = st.slider("יציב תחתון", -0.15, 0.0, -0.05, 0.01)
-    th['סכנה'] = st.slider("סכנה שנתי", -0.30, 0.0, -0.15, 0.01)
-    th['סכנה_6v6'] = st.slider("סכנה 6v6", -0.30, 0.0, -0.10, 0.01)
-    th['אזעקה'] = st.slider("אזעקה 2v2", -0.30, 0.0, -0.15, 0.01)
+    th['יציב_תחתון'] = st.slider("יציב תחתון", -0.15, 0.0, DEFAULT_TH['יציב_תחתון'], 0.01)
+    th['סכנה'] = st.slider("סכנה שנתי", -0.30, 0.0, DEFAULT_TH['סכנה'], 0.01)
+    th['סכנה_6v6'] = st.slider("סכנה 6v6", -0.30, 0.0, DEFAULT_TH['סכנה_6v6'], 0.01)
+    th['אזעקה'] = st.slider("אזעקה 2v2", -0.30, 0.0, DEFAULT_TH['אזעקה'], 0.01)
 
 st.sidebar.markdown("---")
 
 # חישובים
-stores['שינוי_שנתי'] = stores.apply(lambda r: chg(r['שנה2'], r['שנה1']), axis=1)
-stores['שינוי_6v6'] = stores.apply(lambda r: chg(r['6v6_H2'], r['6v6_H1']), axis=1)
-stores['שינוי_3v3'] = stores.apply(lambda r: chg(r['3v3_שנה2'], r['3v3_שנה1']), axis=1)
-stores['שינוי_רבעוני'] = stores.apply(lambda r: chg(r['3v3_Q3'], r['3v3_Q2']), axis=1)
-stores['שינוי_2v2'] = stores.apply(lambda r: chg(r['2v2_אחרון'], r['2v2_קודם']), axis=1)
-stores['סטטוס'] = stores.apply(lambda r: calc_status(r, th), axis=1)
-
-# 3 דירוגים לחנויות
-stores['דירוג_מכירות'] = stores['שנה2'].rank(ascending=False, method='min').astype(int)
-stores['דירוג_צמיחה'] = stores['שינוי_שנתי'].rank(ascending=False, method='min').astype(int)
-stores['דירוג_טווח_קצר'] = stores['שינוי_רבעוני'].rank(ascending=False, method='min').astype(int)
-stores['דירוג'] = stores['דירוג_מכירות']  # ברירת מחדל
-
-# חישובי מוצרים
-products['שינוי_שנתי'] = products.apply(lambda r: chg(r['שנה2'], r['שנה1']), axis=1)
-products['שינוי_6v6'] = products.apply(lambda r: chg(r['6v6_H2'], r['6v6_H1']), axis=1)
-products['שינוי_רבעוני'] = products.apply(lambda r: chg(r['3v3_Q3'], r['3v3_Q2']), axis=1)
-products['סטטוס'] = products.apply(lambda r: calc_status(r, th), axis=1)
-products['דירוג'] = products['שנה2'].rank(ascending=False, method='min').astype(int)
-
-# סינון לפי סוכן
-all_active = stores[stores['2v2_אחרון'] > 0].copy()
-all_closed = stores[stores['2v2_אחרון'] == 0].copy()
-
-if st.session_state.user_type == "agent":
-    active = all_active[all_active['מזהה'].isin(st.session_state.user_stores)].copy()
-    closed = all_closed[all_closed['מזהה'].isin(st.session_state.user_stores)].copy()
-    sp_filtered = sp[sp['מזהה_חנות'].isin(st.session_state.user_stores)].copy()
-else:
-    active = all_active.copy()
-    closed = all_closed.copy()
-    sp_filtered = sp.copy()
+version = load_stats['version']
+period_labels = load_stats['labels']  # תוויות התקופות לפי חודש הייחוס של הנתונים
+user_stores = st.session_state.user_stores if st.session_state.user_type == "agent" else None
+with prof.section("מדדים וסטטוס") as rec:
+    stores, products = static_stage(stores, products, version)
+    cubes = rollup_stage(*status_stage(stores, products, version, th, None)[:2], version, th)
+    if user_stores is not None:
+        stores, sp, sp_idx = agent_partition(stores, sp, sp_idx, version, tuple(user_stores))
+    index = filter_index(stores, products, version, user_stores)
+    stores, products, status_masks = status_stage(stores, products, version, th, user_stores)
+    rec['rows'] = len(stores) + len(products)
+exclude_options, exclude_prod_options = index.exclude_options
 
 # החרגת חנויות
 st.sidebar.subheader("🚫 החרגת חנויות")
-exclude_options = active.apply(lambda r: f"{r['מזהה']} - {r['שם חנות']}", axis=1).tolist()
-excluded_stores = st.sidebar.multiselect("בחר חנויות להחרגה:", sorted(exclude_options), key="exclude_stores")
-if excluded_stores:
-    excluded_ids = [int(x.split(' - ')[0]) for x in excluded_stores]
-    active = active[~active['מזהה'].isin(excluded_ids)].copy()
-    sp_filtered = sp_filtered[~sp_filtered['מזהה_חנות'].isin(excluded_ids)].copy()
+excluded_stores = st.sidebar.multiselect("בחר חנויות להחרגה:", exclude_options, key="exclude_stores")
+excluded_ids = index.stores.to_ids(excluded_stores)
+if excluded_ids:
     st.sidebar.warning(f"הוחרגו {len(excluded_ids)} חנויות")
 
 # החרגת מוצרים
 st.sidebar.subheader("🚫 החרגת מוצרים")
-exclude_prod_options = products.apply(lambda r: f"{r['מזהה']} - {r['מוצר']}", axis=1).tolist()
-excluded_products = st.sidebar.multiselect("בחר מוצרים להחרגה:", sorted(exclude_prod_options), key="exclude_products")
-if excluded_products:
-    excluded_prod_ids = [int(x.split(' - ')[0]) for x in excluded_products]
-    products = products[~products['מזהה'].isin(excluded_prod_ids)].copy()
-    sp_filtered = sp_filtered[~sp_filtered['מזהה_מוצר'].isin(excluded_prod_ids)].copy()
+excluded_products = st.sidebar.multiselect("בחר מוצרים להחרגה:", exclude_prod_options, key="exclude_products")
+excluded_prod_ids = index.products.to_ids(excluded_products)
+if excluded_prod_ids:
     st.sidebar.warning(f"הוחרגו {len(excluded_prod_ids)} מוצרים")
 
 # סינונים נוספים
 st.sidebar.subheader("🔍 סינונים")
-cities = ['הכל'] + sorted([c for c in active['עיר'].dropna().unique() if c])
+cities, statuses = index.options(status_masks, excluded_ids)
 sel_city = st.sidebar.selectbox("עיר", cities)
-statuses = ['הכל'] + list(active['סטטוס'].unique())
 sel_status = st.sidebar.selectbox("סטטוס", statuses)
 
-filtered = active.copy()
-if sel_city != 'הכל':
-    filtered = filtered[filtered['עיר'] == sel_city]
-if sel_status != 'הכל':
-    filtered = filtered[filtered['סטטוס'] == sel_status]
+with prof.section("סינון") as rec:
+    scope = filter_stage(stores, products, index, status_masks, version, th, user_stores, excluded_ids, excluded_prod_ids, sel_city, sel_status)
+    cube = cube_stage(cubes, stores, products, index, version, th, st.session_state.user_name, user_stores,
+                      excluded_ids, excluded_prod_ids, sel_city, sel_status)
+    active, closed, filtered, products = scope['active'], scope['closed'], scope['filtered'], scope['products']
+    rec['rows'] = len(filtered)
 
 st.sidebar.markdown("---")
 st.sidebar.metric("פעילות", len(active))
 st.sidebar.metric("סגורות", len(closed))
 
-# טאבים
-tabs = st.tabs(["📊 דשבורד", "🏪 החנויות שלי", "📦 מוצרים", "🔍 בחירת חנות", "🔎 בחירת מוצר", "🚫 סגורות", "📈 מגמות", "⚠️ אזעקות", "🎯 פוטנציאל"])
+def portfolio_sheets():
+    """גיליונות הייצוא המלא - משתמשים באותו מטמון כמו הייצוא של כל טבלה"""
+    return {
+        'חנויות': filtered,
+        'סגורות': closed,
+        'מוצרים': products,
+        'מוצרים_בחנויות': sql.rows(filtered['מזהה'], excluded_prod_ids) if sql is not None
+                          else pipeline.scope_sp(sp, sp_idx, filtered['מזהה'], excluded_prod_ids),
+    }
 
-with tabs[0]:
+# ========================================
+# תצוגות - כל לשונית היא פונקציה שרצה רק כשהיא מוצגת
+# ========================================
+def view_dashboard():
     st.title("📊 דשבורד ראשי")
+    # המדדים והגרפים נקראים מקוביית הסיכומים
+    kpi = cube['filtered']
+    n = rollup.count(kpi)
     c1, c2, c3, c4, c5 = st.columns(5)
-    total = filtered['שנה2'].sum()
-    prev = filtered['שנה1'].sum()
+    total = kpi['שנה2'].sum()
+    prev = kpi['שנה1'].sum()
     c1.metric("💰 מכירות", fmt_num(total), fmt_pct(chg(total, prev)))
-    c2.metric("🏪 פעילות", len(filtered))
+    c2.metric("🏪 פעילות", n)
     c3.metric("🚫 סגורות", len(closed))
-    c4.metric("📈 צמיחה", len(filtered[filtered['סטטוס'] == 'צמיחה']))
-    c5.metric("⚠️ סיכון", len(filtered[filtered['סטטוס'].isin(['סכנה', 'שחיקה'])]))
+    c4.metric("📈 צמיחה", rollup.count(kpi, ['צמיחה']))
+    c5.metric("⚠️ סיכון", rollup.count(kpi, ['סכנה', 'שחיקה']))
     
     st.markdown("---")
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("📊 סטטוסים")
-        if len(filtered) > 0:
-            sc = filtered['סטטוס'].value_counts()
-            colors = {'צמיחה': '#28a745', 'יציב': '#17a2b8', 'שחיקה': '#ffc107', 'התאוששות': '#9c27b0', 'סכנה': '#dc3545', 'חדש/ה': '#ff9800'}
-            fig = px.pie(values=sc.values, names=sc.index, color=sc.index, color_discrete_map=colors, hole=0.4)
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
+        if n > 0:
+            with prof.section("גרף סטטוסים", rows=len(kpi)):
+                st.plotly_chart(figure('status_pie', rollup.status_counts(kpi)), use_container_width=True)
     with c2:
         st.subheader("🏙️ ערים")
-        if len(filtered) > 0:
-            filtered_with_city = filtered[filtered['עיר'].notna() & (filtered['עיר'] != '')]
-            if len(filtered_with_city) > 0:
-                cs = filtered_with_city.groupby('עיר')['שנה2'].sum().nlargest(10).reset_index()
-                fig = px.bar(cs, x='שנה2', y='עיר', orientation='h', text=cs['שנה2'].apply(fmt_num))
-                fig.update_layout(yaxis={'categoryorder': 'total ascending'})
-                fig.update_traces(textposition='outside')
-                st.plotly_chart(fig, use_container_width=True)
-
-with tabs[1]:
+        if n > 0:
+            with prof.section("גרף ערים", rows=len(kpi)):
+                # 10 הערים הגדולות, ושאר הערים כעמודה אחת 'אחר'
+                totals = charts.city_totals(kpi)
+                if totals:
+                    st.plotly_chart(figure('city_bar', totals), use_container_width=True)
+
+def view_my_stores():
     st.title("🏪 החנויות שלי")
     if st.session_state.user_type == "agent":
         st.info(f"📋 מציג {len(filtered)} חנויות המשויכות ל-{st.session_state.user_name}")
     
-    d = filtered[['מזהה', 'שם חנות', 'עיר', 'שנה1', 'שנה2', 'שינוי_שנתי', '6v6_H1', '6v6_H2', 'שינוי_6v6', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', '2v2_קודם', '2v2_אחרון', 'שינוי_2v2', 'סטטוס', 'דירוג_מכירות', 'דירוג_צמיחה', 'דירוג_טווח_קצר']].copy()
-    d.columns = ['מזהה', 'שם חנות', 'עיר', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'H1', 'H2', 'שינוי H1/H2', 'Q2', 'Q3', 'שינוי Q2/Q3', '2v2 קודם', '2v2 אחרון', 'שינוי 2v2', 'סטטוס', 'דירוג מכירות', 'דירוג צמיחה', 'דירוג טווח קצר']
-    for c in ['שנה קודמת', 'שנה נוכחית', 'H1', 'H2', 'Q2', 'Q3', '2v2 קודם', '2v2 אחרון']:
-        d[c] = d[c].apply(fmt_num)
-    for c in ['שינוי שנתי', 'שינוי H1/H2', 'שינוי Q2/Q3', 'שינוי 2v2']:
-        d[c] = d[c].apply(fmt_pct)
-    st.dataframe(d, hide_index=True, use_container_width=True, height=600)
-    st.download_button("📥 הורד", to_excel(filtered, 'חנויות'), "חנויות.xlsx")
-
-with tabs[2]:
+    # טבלה גדולה מוצגת בעמודים, עם מיון וחיפוש בשרת
+    paged_table(filtered, dict(zip(
+        ['מזהה', 'שם חנות', 'עיר', 'שנה1', 'שנה2', 'שינוי_שנתי', '6v6_H1', '6v6_H2', 'שינוי_6v6', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', '2v2_קודם', '2v2_אחרון', 'שינוי_2v2', 'סטטוס', 'דירוג_מכירות', 'דירוג_צמיחה', 'דירוג_טווח_קצר'],
+        ['מזהה', 'שם חנות', 'עיר', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'H1', 'H2', 'שינוי H1/H2', 'Q2', 'Q3', 'שינוי Q2/Q3', '2v2 קודם', '2v2 אחרון', 'שינוי 2v2', 'סטטוס', 'דירוג מכירות', 'דירוג צמיחה', 'דירוג טווח קצר'])),
+        num=['שנה קודמת', 'שנה נוכחית', 'H1', 'H2', 'Q2', 'Q3', '2v2 קודם', '2v2 אחרון'],
+        pct=['שינוי שנתי', 'שינוי H1/H2', 'שינוי Q2/Q3', 'שינוי 2v2'],
+        key="stores_table", search_cols=['מזהה', 'שם חנות', 'עיר'], height=600, file_name="חנויות")
+    c1, c2 = st.columns(2)
+    # הקבצים נוצרים רק בלחיצה, ונשמרים במטמון לפי תוכן הנתונים
+    c1.download_button("📥 הורד", prof.wrap("אקסל חנויות", lambda: to_excel(filtered, 'חנויות')), "חנויות.xlsx")
+    c2.download_button("📥 הורד תיק מלא", prof.wrap("אקסל תיק מלא", lambda: excel_bytes(portfolio_sheets())), "תיק_מלא.xlsx",
+                       help="חנויות, סגורות, מוצרים ומוצרים לפי חנות בקובץ אחד")
+
+def view_products():
     st.title("📦 מוצרים")
     
-    # סיכום מדדים
+    # סיכום מדדים - מקוביית המוצרים
+    kpi = cube['products']
     c1, c2, c3, c4, c5 = st.columns(5)
-    total_prod = products['שנה2'].sum()
-    prev_prod = products['שנה1'].sum()
+    total_prod = kpi['שנה2'].sum()
+    prev_prod = kpi['שנה1'].sum()
     c1.metric("💰 מכירות מוצרים", fmt_num(total_prod), fmt_pct(chg(total_prod, prev_prod)))
-    c2.metric("📦 סה״כ מוצרים", len(products))
-    c3.metric("📈 צמיחה", len(products[products['סטטוס'] == 'צמיחה']))
-    c4.metric("⚠️ סיכון", len(products[products['סטטוס'].isin(['סכנה', 'שחיקה'])]))
-    c5.metric("🆕 חדשים", len(products[products['סטטוס'] == 'חדש/ה']))
+    c2.metric("📦 סה״כ מוצרים", rollup.count(kpi))
+    c3.metric("📈 צמיחה", rollup.count(kpi, ['צמיחה']))
+    c4.metric("⚠️ סיכון", rollup.count(kpi, ['סכנה', 'שחיקה']))
+    c5.metric("🆕 חדשים", rollup.count(kpi, ['חדש/ה']))
     
     st.markdown("---")
     
@@ -486,37 +353,31 @@ with tabs[2]:
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("📊 סטטוס מוצרים")
-        if len(products) > 0:
-            sc = products['סטטוס'].value_counts()
-            colors = {'צמיחה': '#28a745', 'יציב': '#17a2b8', 'שחיקה': '#ffc107', 'התאוששות': '#9c27b0', 'סכנה': '#dc3545', 'חדש/ה': '#ff9800'}
-            fig = px.pie(values=sc.values, names=sc.index, color=sc.index, color_discrete_map=colors, hole=0.4)
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
+        if len(kpi) > 0:
+            with prof.section("גרף סטטוס מוצרים", rows=len(kpi)):
+                st.plotly_chart(figure('status_pie', rollup.status_counts(kpi)), use_container_width=True)
     with c2:
         st.subheader("📊 לפי סיווג")
-        cs = products.groupby('סיווג')['שנה2'].sum().reset_index()
-        fig = px.pie(cs, values='שנה2', names='סיווג', hole=0.3)
-        st.plotly_chart(fig, use_container_width=True)
+        with prof.section("גרף סיווג", rows=len(kpi)):
+            st.plotly_chart(figure('class_pie', charts.class_totals(kpi)), use_container_width=True)
     
     st.markdown("---")
     st.subheader("📋 טבלת מוצרים מלאה")
     
     # טבלת מוצרים מלאה
-    d_prod = products[['מזהה', 'מוצר', 'סיווג', 'שנה1', 'שנה2', 'שינוי_שנתי', '6v6_H1', '6v6_H2', 'שינוי_6v6', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', 'סטטוס', 'דירוג']].copy()
-    d_prod.columns = ['מזהה', 'מוצר', 'סיווג', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'H1', 'H2', 'שינוי H1/H2', 'Q2', 'Q3', 'שינוי Q2/Q3', 'סטטוס', 'דירוג']
-    for c in ['שנה קודמת', 'שנה נוכחית', 'H1', 'H2', 'Q2', 'Q3']:
-        d_prod[c] = d_prod[c].apply(fmt_num)
-    for c in ['שינוי שנתי', 'שינוי H1/H2', 'שינוי Q2/Q3']:
-        d_prod[c] = d_prod[c].apply(fmt_pct)
-    st.dataframe(d_prod, hide_index=True, use_container_width=True, height=500)
-    st.download_button("📥 הורד מוצרים", to_excel(products, 'מוצרים'), "מוצרים.xlsx")
-
-with tabs[3]:
+    paged_table(products, dict(zip(
+        ['מזהה', 'מוצר', 'סיווג', 'שנה1', 'שנה2', 'שינוי_שנתי', '6v6_H1', '6v6_H2', 'שינוי_6v6', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', 'סטטוס', 'דירוג'],
+        ['מזהה', 'מוצר', 'סיווג', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'H1', 'H2', 'שינוי H1/H2', 'Q2', 'Q3', 'שינוי Q2/Q3', 'סטטוס', 'דירוג'])),
+        num=['שנה קודמת', 'שנה נוכחית', 'H1', 'H2', 'Q2', 'Q3'],
+        pct=['שינוי שנתי', 'שינוי H1/H2', 'שינוי Q2/Q3'],
+        key="products_table", search_cols=['מזהה', 'מוצר', 'סיווג'], height=500, file_name="מוצרים")
+    st.download_button("📥 הורד מוצרים", prof.wrap("אקסל מוצרים", lambda: to_excel(products, 'מוצרים')), "מוצרים.xlsx")
+
+def view_store():
     st.title("🔍 בחירת חנות")
-    opts = filtered.apply(lambda r: f"{r['מזהה']} - {r['שם חנות']}", axis=1).tolist()
-    sel = st.selectbox("בחר:", ['בחר...'] + sorted(opts))
+    sel = st.selectbox("בחר:", ['בחר...'] + scope['store_options'], key="store")
     if sel != 'בחר...':
-        sid = int(sel.split(' - ')[0])
+        sid = index.stores.ids[sel]
         info = filtered[filtered['מזהה'] == sid].iloc[0]
         
         # שורה ראשונה - פרטים בסיסיים
@@ -541,11 +402,11 @@ with tabs[3]:
         st.markdown("---")
         st.subheader("📊 כל המדדים")
         c1, c2, c3, c4 = st.columns(4)
-        c1.markdown("**H1 (דצמבר-מאי)**")
+        c1.markdown(f"**{period_labels['H1']}**")
         c1.metric("H1", fmt_num(info['6v6_H1']))
         c1.metric("H2", fmt_num(info['6v6_H2']))
         c1.metric("שינוי", fmt_pct(info['שינוי_6v6']))
-        c2.markdown("**H2 (יוני-נובמבר)**")
+        c2.markdown(f"**{period_labels['H2']}**")
         c2.metric("שנה1", fmt_num(info['3v3_שנה1']))
         c2.metric("שנה2", fmt_num(info['3v3_שנה2']))
         c2.metric("שינוי", fmt_pct(info['שינוי_3v3']))
@@ -554,8 +415,8 @@ with tabs[3]:
         c3.metric("Q3", fmt_num(info['3v3_Q3']))
         c3.metric("שינוי", fmt_pct(info['שינוי_רבעוני']))
         c4.markdown("**2v2**")
-        c4.metric("8-9/2025", fmt_num(info['2v2_קודם']))
-        c4.metric("10-11/2025", fmt_num(info['2v2_אחרון']))
+        c4.metric(period_labels['2v2_קודם'], fmt_num(info['2v2_קודם']))
+        c4.metric(period_labels['2v2_אחרון'], fmt_num(info['2v2_אחרון']))
         c4.metric("שינוי", fmt_pct(info['שינוי_2v2']))
         
         # אחוז חזרות
@@ -567,34 +428,21 @@ with tabs[3]:
         
         st.markdown("---")
         st.subheader("📦 מוצרים בחנות")
-        sp2 = sp_filtered[sp_filtered['מזהה_חנות'] == sid].copy()
-        
-        # חישוב מוצרים חסרים
-        store_product_ids = set(sp2['מזהה_מוצר'].unique())
-        all_product_ids = set(products['מזהה'].unique())
-        missing_ids = all_product_ids - store_product_ids
-        missing_products = products[products['מזהה'].isin(missing_ids)].sort_values('שנה2', ascending=False).copy()
+        if sql is not None:
+            sp2, missing_products = pipeline.products_of_store(sql.store_rows(sid), products, excluded_prod_ids)
+        else:
+            sp2, missing_products = pipeline.store_products(sp, sp_idx, products, sid, excluded_prod_ids)
         
         if len(sp2) > 0:
-            sp2['שינוי'] = sp2.apply(lambda r: chg(r['שנה2'], r['שנה1']), axis=1)
-            sp2 = sp2.sort_values('שנה2', ascending=False)
-            
             # טבלה
-            d = sp2[['מוצר', 'סיווג', 'שנה1', 'שנה2', 'שינוי', '2v2_קודם', '2v2_אחרון']].copy()
-            d['שנה1'] = d['שנה1'].apply(fmt_num)
-            d['שנה2'] = d['שנה2'].apply(fmt_num)
-            d['שינוי'] = d['שינוי'].apply(fmt_pct)
-            d['2v2_קודם'] = d['2v2_קודם'].apply(fmt_num)
-            d['2v2_אחרון'] = d['2v2_אחרון'].apply(fmt_num)
-            st.dataframe(d, hide_index=True, use_container_width=True, height=400)
+            d, cfg = display_table(sp2, ['מוצר', 'סיווג', 'שנה1', 'שנה2', 'שינוי', '2v2_קודם', '2v2_אחרון'],
+                                   num=['שנה1', 'שנה2', '2v2_קודם', '2v2_אחרון'], pct=['שינוי'])
+            st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True, height=400)
             
             # גרף Top 15
             st.subheader("📊 Top 15 מוצרים")
-            top15 = sp2.nlargest(15, 'שנה2')
-            fig = px.bar(top15, x='מוצר', y='שנה2', color='סיווג', text=top15['שנה2'].apply(fmt_num))
-            fig.update_layout(xaxis_tickangle=-45)
-            fig.update_traces(textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+            with prof.section("גרף Top 15", rows=len(sp2)):
+                st.plotly_chart(figure('products_bar', charts.top_products(sp2)), use_container_width=True)
         else:
             st.warning("לא נמצאו מוצרים")
         
@@ -603,17 +451,31 @@ with tabs[3]:
         st.subheader("🚨 מוצרים שהחנות לא מקבלת")
         st.info(f"נמצאו {len(missing_products)} מוצרים שהחנות לא מקבלת (ממוינים לפי מכירות כלליות)")
         if len(missing_products) > 0:
-            md = missing_products[['מוצר', 'סיווג', 'שנה2']].copy()
-            md.columns = ['מוצר', 'סיווג', 'מכירות כלליות']
-            md['מכירות כלליות'] = md['מכירות כלליות'].apply(fmt_num)
-            st.dataframe(md, hide_index=True, use_container_width=True, height=300)
+            md, cfg = display_table(missing_products, {'מוצר': 'מוצר', 'סיווג': 'סיווג', 'שנה2': 'מכירות כלליות'},
+                                    num=['מכירות כלליות'])
+            st.dataframe(md, column_config=cfg, hide_index=True, use_container_width=True, height=300)
+        
+        # המלצות לפי חנויות דומות
+        st.markdown("---")
+        st.subheader("🧭 מומלצים לפי חנויות דומות")
+        with prof.section("חנויות דומות") as rec:
+            recs = recommend_stage(mix_stage(all_stores, all_sp, sql, version), products, version, sid, excluded_prod_ids)
+            rec['rows'] = len(recs)
+        if len(recs) > 0:
+            st.caption(f"מוצרים שהחנות לא מוכרת, לפי המכירות שלהם ב-{similar.K} החנויות עם תמהיל המוצרים הדומה ביותר")
+            rd, cfg = display_table(recs, {'מוצר': 'מוצר', 'סיווג': 'סיווג', 'מכירות_צפויות': 'מכירות צפויות',
+                                           'שכנים_מוכרים': 'חנויות דומות שמוכרות'}, num=['מכירות צפויות'])
+            st.dataframe(rd, column_config=cfg, hide_index=True, use_container_width=True)
+        else:
+            st.info("אין המלצות - החנויות הדומות לא מוכרות מוצרים שחסרים בחנות")
         
         # כפתור PDF
         st.markdown("---")
         st.subheader("📄 הורדת דוח PDF")
         if st.button("📥 צור והורד PDF", key="pdf_btn"):
             try:
-                pdf_bytes = create_store_pdf(info, sp2, missing_products)
+                with prof.section("PDF", rows=len(sp2)):
+                    pdf_bytes = cached_store_pdf(report_key(sid, version, th, excluded_prod_ids), info, sp2, missing_products, period_labels, recs)
                 st.download_button(
                     label="💾 לחץ להורדה",
                     data=pdf_bytes,
@@ -625,12 +487,11 @@ with tabs[3]:
             except Exception as e:
                 st.error(f"❌ שגיאה ביצירת PDF: {e}")
 
-with tabs[4]:
+def view_product():
     st.title("🔎 בחירת מוצר")
-    opts = products.apply(lambda r: f"{r['מזהה']} - {r['מוצר']}", axis=1).tolist()
-    sel = st.selectbox("בחר:", ['בחר...'] + sorted(opts), key="prod")
+    sel = st.selectbox("בחר:", ['בחר...'] + scope['product_options'], key="prod")
     if sel != 'בחר...':
-        pid = int(sel.split(' - ')[0])
+        pid = index.products.ids[sel]
         pinfo = products[products['מזהה'] == pid].iloc[0]
         
         # שורה ראשונה - פרטים בסיסיים
@@ -668,8 +529,11 @@ with tabs[4]:
         
         st.markdown("---")
         st.subheader("🏪 חנויות שמוכרות את המוצר")
-        ps = sp_filtered[sp_filtered['מזהה_מוצר'] == pid].copy()
-        ps = ps[ps['מזהה_חנות'].isin(active['מזהה'])]
+        if sql is not None:
+            ps = sql.product_rows(pid, active['מזהה'])
+        else:
+            ps = product_rows(sp, sp_idx, pid)
+            ps = ps[ps['מזהה_חנות'].isin(active['מזהה'])].copy()
         if len(ps) > 0:
             selling = len(ps[ps['שנה2'] > 0])
             pen = selling / len(active) * 100 if len(active) > 0 else 0
@@ -678,23 +542,21 @@ with tabs[4]:
             c2.metric("חדירה", f"{pen:.1f}%")
             c3.metric("סה״כ חנויות פעילות", len(active))
             
-            ps['שינוי_שנתי'] = ps.apply(lambda r: chg(r['שנה2'], r['שנה1']), axis=1)
-            ps['שינוי_רבעוני'] = ps.apply(lambda r: chg(r['3v3_Q3'], r['3v3_Q2']), axis=1)
+            add_changes(ps, {'שינוי_שנתי': STORE_CHANGES['שינוי_שנתי'], 'שינוי_רבעוני': STORE_CHANGES['שינוי_רבעוני']})
             ps = ps.sort_values('שנה2', ascending=False)
             
             # טבלה מלאה
-            d = ps[['שם_חנות', 'עיר', 'שנה1', 'שנה2', 'שינוי_שנתי', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', '2v2_קודם', '2v2_אחרון']].copy()
-            d.columns = ['חנות', 'עיר', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'Q2', 'Q3', 'שינוי Q2/Q3', '2v2 קודם', '2v2 אחרון']
-            for c in ['שנה קודמת', 'שנה נוכחית', 'Q2', 'Q3', '2v2 קודם', '2v2 אחרון']:
-                d[c] = d[c].apply(fmt_num)
-            for c in ['שינוי שנתי', 'שינוי Q2/Q3']:
-                d[c] = d[c].apply(fmt_pct)
-            st.dataframe(d, hide_index=True, use_container_width=True, height=400)
-            st.download_button("📥 הורד נתוני מוצר", to_excel(ps, 'מוצר_חנויות'), f"מוצר_{pid}_חנויות.xlsx")
+            paged_table(ps, dict(zip(
+                ['מזהה_חנות', 'שם_חנות', 'עיר', 'שנה1', 'שנה2', 'שינוי_שנתי', '3v3_Q2', '3v3_Q3', 'שינוי_רבעוני', '2v2_קודם', '2v2_אחרון'],
+                ['מזהה', 'חנות', 'עיר', 'שנה קודמת', 'שנה נוכחית', 'שינוי שנתי', 'Q2', 'Q3', 'שינוי Q2/Q3', '2v2 קודם', '2v2 אחרון'])),
+                num=['שנה קודמת', 'שנה נוכחית', 'Q2', 'Q3', '2v2 קודם', '2v2 אחרון'],
+                pct=['שינוי שנתי', 'שינוי Q2/Q3'],
+                key="product_stores_table", search_cols=['מזהה_חנות', 'שם_חנות', 'עיר'], height=400, file_name=f"מוצר_{pid}_חנויות")
+            st.download_button("📥 הורד נתוני מוצר", prof.wrap("אקסל מוצר", lambda: to_excel(ps, 'מוצר_חנויות')), f"מוצר_{pid}_חנויות.xlsx")
         else:
             st.warning("לא נמצאו חנויות שמוכרות את המוצר")
 
-with tabs[5]:
+def view_closed():
     st.title("🚫 חנויות סגורות")
     if len(closed) > 0:
         c1, c2, c3 = st.columns(3)
@@ -702,85 +564,114 @@ with tabs[5]:
         c2.metric("מכירות שאבדו", fmt_num(closed['שנה1'].sum()))
         c3.metric("אחוז", f"{len(closed)/(len(active)+len(closed))*100:.1f}%")
         
-        d = closed[['מזהה', 'שם חנות', 'עיר', 'שנה1']].sort_values('שנה1', ascending=False).copy()
-        d['שנה1'] = d['שנה1'].apply(fmt_num)
-        st.dataframe(d, hide_index=True, use_container_width=True)
+        d, cfg = display_table(closed.sort_values('שנה1', ascending=False), ['מזהה', 'שם חנות', 'עיר', 'שנה1'], num=['שנה1'])
+        st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True)
     else:
         st.success("אין חנויות סגורות!")
 
-with tabs[6]:
+def view_trends():
     st.title("📈 מגמות")
     if len(active) > 0:
         periods = ['שנה1', '6v6_H1', '6v6_H2', '3v3_Q2', '3v3_Q3']
         labels = ['שנה1', 'H1', 'H2', 'Q2', 'Q3']
-        vals = [active[p].sum() for p in periods]
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=labels, y=vals, mode='lines+markers+text', text=[fmt_num(v) for v in vals], textposition='top center', line=dict(width=4, color='#ff4b4b'), marker=dict(size=12)))
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        sums = rollup.totals(cube['active'])  # כל החנויות הפעילות, בלי סינון עיר וסטטוס
+        with prof.section("גרף מגמות", rows=len(cube['active'])):
+            vals = [sums[p] for p in periods]
+            st.plotly_chart(figure('trend_line', tuple(zip(labels, vals))), use_container_width=True)
         
         c1, c2 = st.columns(2)
         with c1:
             st.subheader("שנה1 vs שנה2")
-            y1, y2 = active['שנה1'].sum(), active['שנה2'].sum()
+            y1, y2 = sums['שנה1'], sums['שנה2']
             st.metric("שינוי", fmt_pct(chg(y2, y1)))
         with c2:
             st.subheader("Q2 vs Q3")
-            q2, q3 = active['3v3_Q2'].sum(), active['3v3_Q3'].sum()
+            q2, q3 = sums['3v3_Q2'], sums['3v3_Q3']
             st.metric("שינוי", fmt_pct(chg(q3, q2)))
 
-with tabs[7]:
+def view_alerts():
     st.title("⚠️ אזעקות ו-Recovery")
+    # בספי ברירת המחדל התוצאות מחושבות מראש ברקע בכל גרסת נתונים חדשה (או ב-python
+    # alerts.py), עם השוואה לגרסה הקודמת. עד שהבדיקה מסתיימת הן מחושבות כאן
+    snap = data_source().alert_snapshot(version) if th == DEFAULT_TH else None
+    cols = ['שם חנות', 'עיר', 'שנה2', 'שינוי_2v2']
+    if snap is None:
+        if th != DEFAULT_TH:
+            st.caption("ℹ️ בספים שאינם ברירת המחדל האזעקות מחושבות כאן, בלי השוואה לגרסה הקודמת")
+        elif data_source().alerts_running():
+            st.caption("⏳ ההשוואה לגרסה הקודמת עוד מחושבת ברקע - בינתיים האזעקות מחושבות כאן")
+        found = active[active['שינוי_2v2'] < th['אזעקה']].sort_values('שינוי_2v2')
+        rec = active[(active['סטטוס'].isin(['שחיקה', 'סכנה'])) & (active['שינוי_2v2'] > 0)].sort_values('שינוי_2v2', ascending=False)
+    else:
+        # רק החנויות שבטווח (סוכן והחרגות)
+        snap_rows = snap['alerts']
+        snap_rows = snap_rows[(snap_rows['רמה'] == alerts.STORE) & snap_rows['מזהה_חנות'].isin(active['מזהה'])]
+        current = snap_rows[snap_rows['מצב'] != alerts.RESOLVED]
+        found = current[current['סוג'] == alerts.ALERT].sort_values('שינוי_2v2')
+        rec = current[current['סוג'] == alerts.RECOVERY].sort_values('שינוי_2v2', ascending=False)
+        if snap['previous'] is not None:
+            cols = cols + ['מצב']
+            states = snap_rows.loc[snap_rows['סוג'] == alerts.ALERT, 'מצב'].value_counts()
+            m1, m2, m3 = st.columns(3)
+            m1.metric("🆕 אזעקות חדשות", int(states.get(alerts.NEW, 0)))
+            m2.metric("🔁 ממשיכות", int(states.get(alerts.PERSISTING, 0)))
+            m3.metric("✅ נפתרו", int(states.get(alerts.RESOLVED, 0)))
+        st.caption(f"נבדק ב-{snap['created']} | גרסה {snap['version']}"
+                   + (f" מול {snap['previous']}" if snap['previous'] else " (אין גרסה קודמת להשוואה)"))
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("🚨 אזעקות")
-        alerts = active[active['שינוי_2v2'] < th['אזעקה']].sort_values('שינוי_2v2')
-        if len(alerts) > 0:
-            st.error(f"{len(alerts)} חנויות!")
-            d = alerts[['שם חנות', 'עיר', 'שנה2', 'שינוי_2v2']].head(20).copy()
-            d['שנה2'] = d['שנה2'].apply(fmt_num)
-            d['שינוי_2v2'] = d['שינוי_2v2'].apply(lambda x: f"{x:.1%} ⚠️")
-            st.dataframe(d, hide_index=True, use_container_width=True)
+        if len(found) > 0:
+            st.error(f"{len(found)} חנויות!")
+            d, cfg = display_table(found.head(20), cols, num=['שנה2'],
+                                   pct=['שינוי_2v2'], formats={'שינוי_2v2': ALERT_FORMAT})
+            st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True)
         else:
             st.success("אין אזעקות!")
     with c2:
         st.subheader("💚 Recovery")
-        rec = active[(active['סטטוס'].isin(['שחיקה', 'סכנה'])) & (active['שינוי_2v2'] > 0)].sort_values('שינוי_2v2', ascending=False)
         if len(rec) > 0:
             st.success(f"{len(rec)} חנויות!")
-            d = rec[['שם חנות', 'עיר', 'שנה2', 'שינוי_2v2']].head(20).copy()
-            d['שנה2'] = d['שנה2'].apply(fmt_num)
-            d['שינוי_2v2'] = d['שינוי_2v2'].apply(lambda x: f"{x:+.1%} ↑")
-            st.dataframe(d, hide_index=True, use_container_width=True)
+            d, cfg = display_table(rec.head(20), cols, num=['שנה2'],
+                                   pct=['שינוי_2v2'], formats={'שינוי_2v2': RECOVERY_FORMAT})
+            st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True)
         else:
             st.info("אין התאוששות")
-
-with tabs[8]:
+    if snap is None:
+        return
+
+    if snap['previous'] is not None:
+        resolved = snap_rows[(snap_rows['מצב'] == alerts.RESOLVED) & (snap_rows['סוג'] == alerts.ALERT)]
+        if len(resolved) > 0:
+            with st.expander(f"✅ {len(resolved)} אזעקות נפתרו מאז הגרסה הקודמת"):
+                d, cfg = display_table(resolved.sort_values('שינוי_2v2'), ['שם חנות', 'עיר', 'שנה2', 'שינוי_2v2'],
+                                       num=['שנה2'], pct=['שינוי_2v2'])
+                st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True)
+    # חנות × מוצר - רק כשהבדיקה רצה עליהם (python alerts.py --sp או ALERTS_SP=1)
+    by_product = snap['alerts']
+    by_product = by_product[(by_product['רמה'] == alerts.PRODUCT) & by_product['מזהה_חנות'].isin(active['מזהה'])
+                            & (by_product['מצב'] != alerts.RESOLVED)]
+    if len(by_product) > 0:
+        with st.expander(f"🔎 {len(by_product):,} אזעקות והתאוששויות ברמת מוצר"):
+            paged_table(by_product.sort_values('שינוי_2v2'), {
+                'סוג': 'סוג', 'מצב': 'מצב', 'שם חנות': 'חנות', 'מוצר': 'מוצר', 'שנה2': 'שנה2', 'שינוי_2v2': 'שינוי 2v2'},
+                num=['שנה2'], pct=['שינוי 2v2'], key="product_alerts_table", search_cols=['שם חנות', 'מוצר', 'סוג', 'מצב'],
+                height=400, file_name="אזעקות_מוצרים")
+
+def view_potential():
     st.title("🎯 פוטנציאל")
-    min_pen = st.slider("סף חדירה", 0.5, 0.9, 0.7, 0.05)
+    min_pen = st.slider("סף חדירה", 0.5, 0.9, 0.7, 0.05, key="min_pen")
     
-    sp_act = sp_filtered[sp_filtered['מזהה_חנות'].isin(active['מזהה'])]
-    if len(sp_act) > 0 and len(active) > 0:
-        ps = sp_act[sp_act['שנה2'] > 0].groupby('מזהה_מוצר').agg({'מזהה_חנות': 'nunique', 'שנה2': 'mean'}).reset_index()
-        ps.columns = ['מזהה_מוצר', 'חנויות', 'ממוצע']
-        ps['חדירה'] = ps['חנויות'] / len(active)
-        hp = ps[ps['חדירה'] >= min_pen]
-        hp_ids = set(hp['מזהה_מוצר'])
-        
-        st.info(f"{len(hp)} מוצרים עם חדירה > {min_pen*100:.0f}%")
-        
-        store_prods = sp_act[sp_act['שנה2'] > 0].groupby('מזהה_חנות')['מזהה_מוצר'].apply(set).to_dict()
-        
-        pot = []
-        for _, s in active.iterrows():
-            sp_s = store_prods.get(s['מזהה'], set())
-            miss = hp_ids - sp_s
-            if len(miss) > 0:
-                p = sum(hp[hp['מזהה_מוצר'] == m]['ממוצע'].values[0] for m in miss if m in hp['מזהה_מוצר'].values)
-                pot.append({'חנות': s['שם חנות'], 'עיר': s['עיר'], 'מכירות': s['שנה2'], 'חסרים': len(miss), 'פוטנציאל': round(p)})
+    stats = None
+    if len(active) > 0:
+        if sql is not None:
+            stats = potential_query(sql, active['מזהה'].to_numpy(), version, user_stores, excluded_ids, excluded_prod_ids)
+        else:
+            stats = potential_stage(active['מזהה'].to_numpy(), sp, sp_idx, version, user_stores, excluded_ids, excluded_prod_ids)
+    if stats is not None and len(stats['product_ids']) > 0:
+        pot_df, n_hp = potential_table(active, stats, min_pen)
         
-        pot_df = pd.DataFrame(pot).sort_values('פוטנציאל', ascending=False)
+        st.info(f"{n_hp} מוצרים עם חדירה > {min_pen*100:.0f}%")
         
         if len(pot_df) > 0:
             c1, c2, c3 = st.columns(3)
@@ -788,10 +679,70 @@ with tabs[8]:
             c2.metric("סה״כ", fmt_num(pot_df['פוטנציאל'].sum()))
             c3.metric("ממוצע", fmt_num(pot_df['פוטנציאל'].mean()))
             
-            d = pot_df.head(20).copy()
-            d['מכירות'] = d['מכירות'].apply(fmt_num)
-            d['פוטנציאל'] = d['פוטנציאל'].apply(fmt_num)
-            st.dataframe(d, hide_index=True, use_container_width=True)
-            st.download_button("📥 הורד", to_excel(pot_df, 'פוטנציאל'), "פוטנציאל.xlsx")
+            d, cfg = display_table(pot_df.head(20), list(pot_df.columns), num=['מכירות', 'פוטנציאל'])
+            st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True)
+            st.download_button("📥 הורד", prof.wrap("אקסל פוטנציאל", lambda: to_excel(pot_df, 'פוטנציאל')), "פוטנציאל.xlsx")
         else:
             st.warning("אין פוטנציאל בסף הנבחר")
+
+
+VIEWS = {
+    "📊 דשבורד": view_dashboard,
+    "🏪 החנויות שלי": view_my_stores,
+    "📦 מוצרים": view_products,
+    "🔍 בחירת חנות": view_store,
+    "🔎 בחירת מוצר": view_product,
+    "🚫 סגורות": view_closed,
+    "📈 מגמות": view_trends,
+    "⚠️ אזעקות": view_alerts,
+    "🎯 פוטנציאל": view_potential,
+}
+# מצב רכיבים של תצוגות שלא מוצגות כרגע נשמר בין מעברים
+PAGED_TABLES = ["stores_table", "products_table", "product_stores_table", "product_alerts_table"]
+VIEW_WIDGETS = ["store", "prod", "min_pen"] + [f"{t}_{w}" for t in PAGED_TABLES for w in TABLE_WIDGETS]
+
+def show_profile(record, history):
+    """פאנל מדידה: קטעי הריצה האחרונה והיסטוריית ריצות"""
+    with st.expander("🩺 מדידת ביצועים", expanded=True):
+        st.caption(f"ריצה אחרונה: {record['seconds'] * 1000:.0f} ms")
+        last = pd.DataFrame({
+            'קטע': ['· ' * s['depth'] + s['name'] for s in record['sections']],
+            'ms': [s['seconds'] * 1000 for s in record['sections']],
+            'שורות': [s['rows'] for s in record['sections']],
+            'MB שיא': [s['peak_mb'] for s in record['sections']],
+        })
+        st.dataframe(last, hide_index=True, use_container_width=True, column_config={
+            'ms': st.column_config.NumberColumn(format="%.1f"),
+            'MB שיא': st.column_config.NumberColumn(format="%.1f"),
+        })
+        st.markdown("**ריצות אחרונות**")
+        recent = pd.DataFrame({
+            'זמן': [r['time'][11:] for r in history],
+            'ms': [r['seconds'] * 1000 for r in history],
+            'האיטי ביותר': [max(r['sections'], key=lambda s: s['seconds'])['name'] if r['sections'] else '' for r in history],
+        }).iloc[::-1]
+        st.dataframe(recent, hide_index=True, use_container_width=True, column_config={
+            'ms': st.column_config.NumberColumn(format="%.0f"),
+        })
+        st.caption(f"לוג: {LOG_PATH}")
+
+st.sidebar.markdown("---")
+if st.session_state.user_type == "admin":
+    st.sidebar.toggle("🩺 מדידת ביצועים", key="profiling", help="זמן, שורות ושיא זיכרון לכל קטע בכל ריצה")
+    profile_panel = st.sidebar.container()
+if st.sidebar.toggle("⚡ רק הלשונית הפתוחה", value=True, key="lazy_views", help="מחשב ומציג רק את התצוגה שנבחרה"):
+    for k in VIEW_WIDGETS:
+        if k in st.session_state:
+            st.session_state[k] = st.session_state[k]
+    view = st.radio("תצוגה", list(VIEWS), horizontal=True, key="view", label_visibility="collapsed")
+    with prof.section(view):
+        VIEWS[view]()
+else:
+    for (name, render), tab in zip(VIEWS.items(), st.tabs(list(VIEWS))):
+        with tab, prof.section(name):
+            render()
+
+profile_record = prof.finish()
+if profile_record is not None:
+    with profile_panel:
+        show_profile(profile_record, prof.history)
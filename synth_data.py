@@ -0,0 +1,154 @@
+"""יצירת נתונים סינתטיים בגודל נבחר, באותה סכמה כמו קבצי ה-JSON האמיתיים
+
+    python synth_data.py --out bench_data/small --stores 1000 --products 200 --sp-rows 100000
+    python synth_data.py --out bench_data/large --size large
+
+הסכומים של החנויות ושל המוצרים מחושבים משורות sp, כך שהנתונים עקביים.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregate import PRODUCT_COLUMNS, SP_COLUMNS, STORE_COLUMNS
+from data_io import DATA_FILES
+
+# ========================================
+# גדלים מוכנים
+# ========================================
+SIZES = {
+    'small': {'stores': 1_000, 'products': 200, 'sp_rows': 100_000},
+    'medium': {'stores': 10_000, 'products': 2_000, 'sp_rows': 2_000_000},
+    'large': {'stores': 50_000, 'products': 2_000, 'sp_rows': 20_000_000},
+}
+CHUNK_STORES = 500
+
+CITIES = ['ירושלים', 'תל אביב', 'בית שמש', 'בני ברק', 'תל אביב - יפו ', 'פתח תקווה', 'רעננה', 'אשדוד',
+          'נתניה', 'חיפה', 'באר שבע', 'מודיעין', 'רחובות', 'חולון', 'ראשון לציון', 'כפר סבא']
+CATEGORIES = ['לחמים', 'חלות', 'לחמניות', 'פיתות', 'עוגיות', 'קולינריה', 'פינוקי סופש', 'קיטוגני',
+              'לחמים קלים', 'לחמניות משווקים', 'פיתות משווקים', 'LESS&MORE (ללא החזרות)']
+CLASSES = ['טאוברד בסיס', 'מוצרי משווקים', 'טאוברד עונתי', 'מוצרים שונים']
+CLASS_WEIGHTS = [0.6, 0.23, 0.15, 0.02]
+
+# עמודות תקופה שמצטברות משורות sp לסכומי חנות ומוצר
+PERIODS = ['שנה1', 'שנה2', 'H1_שנה1', 'H2_שנה1', 'H1_שנה2', 'H2_שנה2', '6v6_H1', '6v6_H2',
+           '3v3_שנה1', '3v3_שנה2', '2v2_קודם', '2v2_אחרון', '3v3_Q2', '3v3_Q3']
+
+
+def _periods(rng, n, closed):
+    """מכירות לתקופות עבור n שורות. H2 = Q2 + Q3, ו-6v6 הוא חצאי השנה הנוכחית"""
+    base = rng.lognormal(5, 1.2, n)
+    trend = rng.normal(1.0, 0.2, n).clip(0.2, 2.5)
+    new = rng.random(n) < 0.05
+    h1_1 = np.where(new, 0, np.round(base * rng.uniform(0.9, 1.1, n)))
+    h2_1 = np.where(new, 0, np.round(base * rng.uniform(0.9, 1.1, n)))
+    h1_2 = np.round(base * trend * rng.uniform(0.9, 1.1, n))
+    q2 = np.round(base * trend * rng.uniform(0.25, 0.35, n))
+    q3 = np.where(closed, 0, np.round(base * trend * rng.uniform(0.6, 0.75, n)))
+    h2_2 = q2 + q3
+    p = {
+        'שנה1': h1_1 + h2_1, 'שנה2': h1_2 + h2_2,
+        'H1_שנה1': h1_1, 'H2_שנה1': h2_1, 'H1_שנה2': h1_2, 'H2_שנה2': h2_2,
+        '6v6_H1': h1_2, '6v6_H2': h2_2,
+        '3v3_שנה1': np.round(h2_1 * rng.uniform(0.6, 0.75, n)), '3v3_שנה2': q3,
+        '2v2_קודם': np.round(q3 * rng.uniform(0.55, 0.75, n)), '2v2_אחרון': np.round(q3 * rng.uniform(0.5, 0.7, n)),
+        '3v3_Q2': q2, '3v3_Q3': q3,
+    }
+    return {k: v.astype('int64') for k, v in p.items()}
+
+
+def _city(rng, n):
+    cities = rng.choice(CITIES, n).astype(object)
+    cities[rng.random(n) < 0.07] = 0  # בקבצים האמיתיים עיר חסרה נשמרת כ-0
+    return cities
+
+
+def _write_records(f, df, first):
+    """כתיבת טבלה כאיברים במערך JSON פתוח"""
+    body = df.to_json(orient='records', force_ascii=False)[1:-1]
+    if body:
+        f.write(('' if first else ',') + body)
+    return first and not body
+
+
+def generate(out_dir, stores=1_000, products=200, sp_rows=100_000, seed=0):
+    """כתיבת data_stores / data_products / data_sp ל-out_dir. מחזיר את מספרי השורות"""
+    rng = np.random.default_rng(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    store_ids = np.arange(1, stores + 1)
+    store_names = np.array([f"חנות {i}" for i in store_ids], dtype=object)
+    store_cities = _city(rng, stores)
+    store_closed = rng.random(stores) < 0.08
+
+    prod_ids = np.arange(1, products + 1)
+    prod_names = np.array([f"מוצר {i}" for i in prod_ids], dtype=object)
+    prod_classes = rng.choice(CLASSES, products, p=CLASS_WEIGHTS).astype(object)
+    # מוצרים פופולריים נמכרים ביותר חנויות
+    density = min(1.0, sp_rows / (stores * products))
+    popularity = rng.beta(2, 2, products)
+    prod_p = np.clip(popularity * density / popularity.mean(), 0, 1)
+
+    store_sums = {k: np.zeros(stores, dtype='int64') for k in PERIODS}
+    prod_sums = {k: np.zeros(products, dtype='int64') for k in PERIODS}
+    prod_stores = {'חנויות_שנה1': np.zeros(products, dtype='int64'), 'חנויות_שנה2': np.zeros(products, dtype='int64')}
+
+    n_sp = 0
+    with open(out_dir / DATA_FILES['sp'], 'w', encoding='utf-8') as f:
+        f.write('[')
+        first = True
+        for a in range(0, stores, CHUNK_STORES):
+            b = min(a + CHUNK_STORES, stores)
+            s_pos, p_pos = np.nonzero(rng.random((b - a, products)) < prod_p)
+            s_pos += a
+            vals = _periods(rng, len(s_pos), store_closed[s_pos])
+            for k in PERIODS:
+                np.add.at(store_sums[k], s_pos, vals[k])
+                np.add.at(prod_sums[k], p_pos, vals[k])
+            np.add.at(prod_stores['חנויות_שנה1'], p_pos, vals['שנה1'] > 0)
+            np.add.at(prod_stores['חנויות_שנה2'], p_pos, vals['שנה2'] > 0)
+            chunk = pd.DataFrame({
+                'מזהה_חנות': store_ids[s_pos], 'שם_חנות': store_names[s_pos], 'עיר': store_cities[s_pos],
+                'מזהה_מוצר': prod_ids[p_pos], 'מוצר': prod_names[p_pos], 'סיווג': prod_classes[p_pos],
+                **{k: vals[k] for k in SP_COLUMNS[6:]},
+            })
+            first = _write_records(f, chunk, first)
+            n_sp += len(chunk)
+        f.write(']')
+
+    st = pd.DataFrame({'מזהה': store_ids, 'שם חנות': store_names, 'עיר': store_cities, **store_sums,
+                       'H1_שנה2_אחוז_חזרות': rng.beta(2, 8, stores), 'H2_שנה2_אחוז_חזרות': rng.beta(2, 8, stores)})
+    pr = pd.DataFrame({'מזהה': prod_ids, 'מוצר': prod_names, 'קטגוריה': rng.choice(CATEGORIES, products),
+                       'סיווג': prod_classes, **prod_sums, **prod_stores,
+                       'H1_שנה2_אחוז_חזרות': rng.beta(2, 8, products), 'H2_שנה2_אחוז_חזרות': rng.beta(2, 8, products)})
+    for df, cols, name in [(st, STORE_COLUMNS, 'stores'), (pr, PRODUCT_COLUMNS, 'products')]:
+        with open(out_dir / DATA_FILES[name], 'w', encoding='utf-8') as f:
+            f.write(df[cols].to_json(orient='records', force_ascii=False))
+    return {'stores': stores, 'products': products, 'sp': n_sp}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="יצירת נתונים סינתטיים לדשבורד")
+    ap.add_argument('--out', required=True, help="תיקיית פלט")
+    ap.add_argument('--size', choices=list(SIZES), help="גודל מוכן (אפשר לדרוס עם הפרמטרים למטה)")
+    ap.add_argument('--stores', type=int)
+    ap.add_argument('--products', type=int)
+    ap.add_argument('--sp-rows', type=int, help="מספר שורות משוער בטבלת חנויות × מוצרים")
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args(argv)
+
+    params = dict(SIZES[args.size or 'small'])
+    for k in params:
+        if getattr(args, k) is not None:
+            params[k] = getattr(args, k)
+    counts = generate(args.out, seed=args.seed, **params)
+    print(json.dumps(counts, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import numpy as np
+import streamlit as st
+
+from exports import to_csv
+from formatting import display_table
+
+# ========================================
+# טבלאות גדולות - חיפוש, מיון וחלוקה לעמודים בשרת. לדפדפן נשלח רק העמוד
+# המוצג, ורק שורותיו עוברות עיצוב. טבלה קטנה מוצגת כמו קודם, בשלמותה
+# ========================================
+PAGED_ROWS = 2000    # מעל זה הטבלה מוצגת בעמודים
+PAGE_ROWS = 200
+NO_SORT = 'ללא מיון'
+WIDGETS = ['search', 'sort', 'desc', 'page']   # סיומות מפתחות הרכיבים של כל טבלה
+
+
+def search(df, text, columns):
+    """השורות שבהן אחת מעמודות columns מכילה את text (בלי תלות ברישיות)"""
+    text = text.strip()
+    if not text:
+        return df
+    hit = np.zeros(len(df), dtype=bool)
+    for c in columns:
+        hit |= df[c].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+    return df[hit]
+
+
+def sort_rows(df, by=None, ascending=True):
+    """מיון יציב לפי עמודה אחת, חסרים בסוף. by=None - הסדר הקיים"""
+    if by is None:
+        return df
+    return df.sort_values(by, ascending=ascending, kind='stable', na_position='last')
+
+
+def page(df, number, size=PAGE_ROWS):
+    """עמוד number (מ-1) ומספר העמודים"""
+    pages = max(1, -(-len(df) // size))
+    number = min(max(1, number), pages)
+    return df.iloc[(number - 1) * size:number * size], pages
+
+
+def paged_table(df, columns, key, num=(), pct=(), formats=None, search_cols=(), height='auto', file_name='טבלה'):
+    """כמו display_table + st.dataframe, ובטבלה גדולה - עמודים, מיון וחיפוש בשרת
+
+    columns, num, pct ו-formats כמו ב-display_table. key מבדיל בין רכיבי
+    הטבלאות. search_cols - עמודות המקור שבהן מחפשים (גם עמודות שלא מוצגות,
+    ואז הן מופיעות ברמז החיפוש בשמן המקורי). CSV של כל התוצאה
+    (אחרי חיפוש ומיון, עם כל העמודות) זמין להורדה.
+    """
+    if not isinstance(columns, dict):
+        columns = {c: c for c in columns}
+    if len(df) <= PAGED_ROWS:
+        d, cfg = display_table(df, columns, num, pct, formats)
+        st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True, height=height)
+        return
+
+    source = {label: col for col, label in columns.items()}
+    c1, c2, c3 = st.columns([3, 2, 1])
+    text = c1.text_input("🔍 חיפוש", key=f"{key}_search", placeholder=" / ".join(columns.get(c, c) for c in search_cols))
+    by = c2.selectbox("מיון לפי", [NO_SORT] + list(source), key=f"{key}_sort")
+    st.session_state.setdefault(f"{key}_desc", True)
+    desc = c3.toggle("יורד", key=f"{key}_desc")
+    rows = sort_rows(search(df, text, search_cols), source.get(by), ascending=not desc)
+
+    # מספר העמוד נשמר - אחרי חיפוש שמקטין את התוצאה הוא מתקצר לעמוד האחרון
+    pages = max(1, -(-len(rows) // PAGE_ROWS))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    number = st.number_input("עמוד", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    part, _ = page(rows, number, PAGE_ROWS)
+    d, cfg = display_table(part, columns, num, pct, formats)
+    st.dataframe(d, column_config=cfg, hide_index=True, use_container_width=True, height=height)
+
+    start = (number - 1) * PAGE_ROWS
+    found = f" (מתוך {len(df):,})" if len(rows) != len(df) else ""
+    st.caption(f"שורות {min(start + 1, len(rows)):,}-{start + len(part):,} מתוך {len(rows):,}{found} | עמוד {number} מתוך {pages}")
+    st.download_button("📥 CSV של התוצאה", lambda: to_csv(rows), f"{file_name}.csv", mime="text/csv", key=f"{key}_csv")
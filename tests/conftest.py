@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# המודולים יושבים בשורש המאגר ולא בחבילה
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import synth_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synth_dir(tmp_path_factory):
+    """נתונים סינתטיים קטנים (כולל עיר 0 כמו בקבצים האמיתיים) לקריאה בלבד"""
+    out = tmp_path_factory.mktemp('synth')
+    synth_data.generate(out, stores=300, products=40, sp_rows=4000, seed=0)
+    return out
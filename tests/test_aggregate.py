@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregate
+
+# חודש הייחוס 2025-11, כך ש-2025-11 הוא היסט 0 ו-2024-11 היסט 12
+RAW = pd.DataFrame([
+    # חנות, מוצר, חודש, מכירות, חזרות
+    (1, 10, '2025-11', 10, 1),
+    (1, 10, '2025-10', 20, 2),
+    (1, 10, '2025-08', 30, 0),
+    (1, 10, '2025-05', 40, 4),
+    (1, 10, '2024-11', 50, 5),
+    (1, 10, '2023-11', 999, 9),  # מחוץ ל-24 החודשים
+    (1, 20, '2025-09', 5, 0),
+    (1, 20, '2024-02', 7, 0),
+    (2, 10, '2025-07', -10, 15),  # מכירות שליליות - יותר חזרות ממכירות
+], columns=['מזהה_חנות', 'מזהה_מוצר', 'חודש', 'מכירות', 'חזרות']).assign(
+    שם_חנות=lambda d: 'חנות ' + d['מזהה_חנות'].astype(str), עיר=lambda d: np.where(d['מזהה_חנות'] == 1, 'חיפה', None),
+    מוצר=lambda d: 'מוצר ' + d['מזהה_מוצר'].astype(str))
+
+WINDOW_COLUMNS = ['שנה1', 'שנה2', 'H1_שנה1', 'H2_שנה1', 'H1_שנה2', 'H2_שנה2', '6v6_H1', '6v6_H2',
+                  '3v3_שנה1', '3v3_שנה2', '2v2_קודם', '2v2_אחרון', '3v3_Q2', '3v3_Q3']
+
+
+@pytest.fixture(scope='module')
+def out():
+    return aggregate.aggregate(RAW)
+
+
+def _windows(df, key):
+    return {k: dict(zip(WINDOW_COLUMNS, v)) for k, v in zip(key, df[WINDOW_COLUMNS].to_numpy().tolist())}
+
+
+def test_store_windows(out):
+    stores, _, _, ref = out
+    assert ref == '2025-11'
+    assert stores['מזהה'].tolist() == [1, 2]
+    assert stores['עיר'].tolist() == ['חיפה', 0]
+    assert _windows(stores, stores['מזהה']) == {
+        1: {'שנה1': 57, 'שנה2': 105, 'H1_שנה1': 7, 'H2_שנה1': 50, 'H1_שנה2': 40, 'H2_שנה2': 65,
+            '6v6_H1': 40, '6v6_H2': 65, '3v3_שנה1': 50, '3v3_שנה2': 35, '2v2_קודם': 35, '2v2_אחרון': 30,
+            '3v3_Q2': 30, '3v3_Q3': 35},
+        2: {'שנה1': 0, 'שנה2': -10, 'H1_שנה1': 0, 'H2_שנה1': 0, 'H1_שנה2': 0, 'H2_שנה2': -10,
+            '6v6_H1': 0, '6v6_H2': -10, '3v3_שנה1': 0, '3v3_שנה2': 0, '2v2_קודם': 0, '2v2_אחרון': 0,
+            '3v3_Q2': -10, '3v3_Q3': 0},
+    }
+    assert stores['שנה2'].dtype == 'int64'
+
+
+def test_return_rates_are_returns_over_sales(out):
+    stores, products, _, _ = out
+    # חנות 1: H2 = 3 חזרות / 65 מכירות, H1 = 4 / 40. חנות 2: 15 / |-10|, ו-0 בלי מכירות ב-H1
+    np.testing.assert_allclose(stores['H2_שנה2_אחוז_חזרות'], [3 / 65, 1.5])
+    np.testing.assert_allclose(stores['H1_שנה2_אחוז_חזרות'], [0.1, 0.0])
+    # מוצר 10: H2 = 18 / 50, H1 = 4 / 40. מוצר 20 בלי חזרות
+    np.testing.assert_allclose(products['H2_שנה2_אחוז_חזרות'], [18 / 50, 0.0])
+    np.testing.assert_allclose(products['H1_שנה2_אחוז_חזרות'], [0.1, 0.0])
+
+
+def test_product_windows_and_store_counts(out):
+    _, products, _, _ = out
+    assert products['מזהה'].tolist() == [10, 20]
+    got = _windows(products, products['מזהה'])
+    assert {k: got[10][k] for k in ['שנה1', 'שנה2', 'H2_שנה2', '6v6_H1', '3v3_Q2', '2v2_קודם']} == \
+        {'שנה1': 50, 'שנה2': 90, 'H2_שנה2': 50, '6v6_H1': 40, '3v3_Q2': 20, '2v2_קודם': 30}
+    assert {k: got[20][k] for k in ['שנה1', 'שנה2', 'H1_שנה1', '2v2_קודם', '3v3_Q3']} == \
+        {'שנה1': 7, 'שנה2': 5, 'H1_שנה1': 7, '2v2_קודם': 5, '3v3_Q3': 5}
+    # חנויות עם מכירות חיוביות בשנה: לחנות 2 יש רק מכירות שליליות במוצר 10
+    assert products['חנויות_שנה1'].tolist() == [1, 1]
+    assert products['חנויות_שנה2'].tolist() == [1, 1]
+
+
+def test_store_product_rows(out):
+    _, _, sp, _ = out
+    assert list(zip(sp['מזהה_חנות'], sp['מזהה_מוצר'])) == [(1, 10), (1, 20), (2, 10)]
+    rows = sp.set_index(['מזהה_חנות', 'מזהה_מוצר'])
+    assert rows.loc[(1, 10), ['שנה1', 'שנה2', '6v6_H1', '6v6_H2', '2v2_קודם', '2v2_אחרון', '3v3_Q2', '3v3_Q3']].tolist() == \
+        [50, 100, 40, 60, 30, 30, 30, 30]
+    assert rows.loc[(2, 10), ['שנה2', '6v6_H2', '3v3_Q2', '3v3_Q3']].tolist() == [-10, -10, -10, 0]
+    assert rows.loc[(1, 20), 'שם_חנות'] == 'חנות 1' and rows.loc[(1, 20), 'מוצר'] == 'מוצר 20'
+
+
+def test_pairs_without_sales_in_window_are_dropped():
+    raw = pd.concat([RAW, pd.DataFrame({'מזהה_חנות': [3], 'מזהה_מוצר': [10], 'חודש': ['2025-06'],
+                                        'מכירות': [0], 'חזרות': [2]})], ignore_index=True)
+    stores, _, sp, _ = aggregate.aggregate(raw)
+    assert 3 in stores['מזהה'].tolist()
+    assert 3 not in sp['מזהה_חנות'].tolist()
@@ -0,0 +1,88 @@
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+import alerts
+import data_io
+import pipeline
+from live_data import DataSource
+from metrics import DEFAULT_TH
+
+
+@pytest.fixture(scope='module')
+def frames(synth_dir):
+    s, p, sp = (data_io.read_json(n, synth_dir) for n in ('stores', 'products', 'sp'))
+    stores, _ = pipeline.prepare(s, p, DEFAULT_TH)
+    return stores, p, sp
+
+
+def test_store_alerts_match_tab_rules(frames):
+    """אותן חנויות כמו החישוב בלשונית האזעקות"""
+    stores = frames[0]
+    active = stores[stores['2v2_אחרון'] > 0]
+    out = alerts.evaluate(stores)
+    found = active[active['שינוי_2v2'] < DEFAULT_TH['אזעקה']]
+    rec = active[active['סטטוס'].isin(['שחיקה', 'סכנה']) & (active['שינוי_2v2'] > 0)]
+    assert sorted(out.loc[out['סוג'] == alerts.ALERT, 'מזהה_חנות']) == sorted(found['מזהה'])
+    assert sorted(out.loc[out['סוג'] == alerts.RECOVERY, 'מזהה_חנות']) == sorted(rec['מזהה'])
+
+
+def test_product_alerts_only_for_active_stores(frames):
+    stores, _, sp = frames
+    out = alerts.evaluate(stores, sp=sp)
+    by_product = out[out['רמה'] == alerts.PRODUCT]
+    assert len(by_product) > 0
+    active = stores.loc[stores['2v2_אחרון'] > 0, 'מזהה']
+    assert by_product['מזהה_חנות'].isin(active).all()
+
+
+def _rows(*keys):
+    return pd.DataFrame([{'סוג': kind, 'רמה': alerts.STORE, 'מזהה_חנות': sid, 'מזהה_מוצר': -1, 'שם חנות': str(sid),
+                          'עיר': '', 'מוצר': '', 'שנה2': 1, 'שינוי_2v2': -0.5} for kind, sid in keys],
+                        columns=alerts.COLUMNS)
+
+
+def test_diff_states():
+    first = alerts.diff(_rows((alerts.ALERT, 1), (alerts.ALERT, 2)), None)
+    assert first['מצב'].tolist() == [alerts.NEW, alerts.NEW]
+    second = alerts.diff(_rows((alerts.ALERT, 2), (alerts.ALERT, 3), (alerts.RECOVERY, 1)), first)
+    got = dict(zip(zip(second['סוג'], second['מזהה_חנות']), second['מצב']))
+    assert got == {(alerts.ALERT, 2): alerts.PERSISTING, (alerts.ALERT, 3): alerts.NEW,
+                   (alerts.RECOVERY, 1): alerts.NEW, (alerts.ALERT, 1): alerts.RESOLVED}
+    # מה שכבר נפתר לא נפתר שוב בגרסה הבאה
+    third = alerts.diff(_rows((alerts.ALERT, 2)), second)
+    resolved = third[third['מצב'] == alerts.RESOLVED]
+    assert sorted(zip(resolved['סוג'], resolved['מזהה_חנות'])) == sorted([(alerts.ALERT, 3), (alerts.RECOVERY, 1)])
+
+
+def test_run_saves_and_compares_snapshots(frames, tmp_path):
+    stores = frames[0]
+    first = alerts.run(stores, 'v1', tmp_path)
+    assert first['previous'] is None
+    assert alerts.run(stores, 'v1', tmp_path)['created'] == first['created']  # גרסה שחושבה נקראת מהדיסק
+    second = alerts.run(stores.iloc[::2], 'v2', tmp_path)
+    assert second['previous'] == 'v1'
+    assert set(second['alerts']['מצב']) <= {alerts.PERSISTING, alerts.RESOLVED}
+    assert alerts.load('v2', tmp_path)['alerts'].equals(second['alerts'])
+    assert alerts.load('v2', tmp_path, with_sp=True) is None
+
+
+def test_snapshot_does_not_wait_for_running_job(synth_dir, tmp_path):
+    for name in data_io.DATA_FILES:
+        shutil.copy(synth_dir / data_io.DATA_FILES[name], tmp_path)
+    src = DataSource(tmp_path, backend='pandas')
+    version = src.refresh()[4]['version']
+    src._alerts.join()
+    assert src.alert_snapshot(version)['version'] == version
+
+    release = threading.Event()
+    src._alerts = threading.Thread(target=release.wait, daemon=True)
+    src._alerts.start()
+    try:
+        assert src.alerts_running()
+        assert src.alert_snapshot(version)['version'] == version  # כבר נקראה
+        assert src.alert_snapshot('other') is None                 # לא ממתינה לבדיקה
+    finally:
+        release.set()
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_io
+
+
+def _write(tmp_path, records):
+    path = tmp_path / 'data_sp.json'
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def _baseline(path):
+    """הקריאה המקורית: json.load לטבלה, ואז המרת הטיפוסים"""
+    with open(path, encoding='utf-8') as f:
+        return data_io.compact_frame(pd.DataFrame(json.load(f)))
+
+
+def _same(chunked, baseline):
+    assert list(chunked.columns) == list(baseline.columns)
+    for c in baseline.columns:
+        a, b = chunked[c], baseline[c]
+        if isinstance(b.dtype, pd.CategoricalDtype):
+            # סדר הקטגוריות שונה (הופעה מול מיון) - הערכים זהים
+            assert isinstance(a.dtype, pd.CategoricalDtype), c
+            assert a.astype(object).fillna('<NA>').tolist() == b.astype(object).fillna('<NA>').tolist(), c
+        else:
+            assert a.dtype == b.dtype, c
+            np.testing.assert_array_equal(a.to_numpy(), b.to_numpy())
+
+
+def _records(cities):
+    return [{'מזהה_חנות': i, 'עיר': city, 'שנה2': i * 10, 'שינוי': i / 4}
+            for i, city in enumerate(cities)]
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 100])
+def test_mixed_zero_city_first(tmp_path, chunk_rows):
+    """0 לפני הטקסט הראשון בעמודה - גם כשהטקסט מגיע רק במקטע מאוחר"""
+    path = _write(tmp_path, _records([0, 0, 0, 'באר שבע', 0, 'חיפה', None]))
+    out = data_io.read_json_chunked(path, chunk_rows=chunk_rows)
+    _same(out, _baseline(path))
+    assert out['עיר'].astype(object).tolist()[:4] == ['0', '0', '0', 'באר שבע']
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 100])
+def test_mixed_string_city_first(tmp_path, chunk_rows):
+    path = _write(tmp_path, _records(['חיפה', 0, 'באר שבע', 0]))
+    _same(data_io.read_json_chunked(path, chunk_rows=chunk_rows), _baseline(path))
+
+
+def test_float_column_promoted_to_text(tmp_path):
+    """מספר לא שלם במקטע מספרי ואחר כך טקסט - נשמר כמו str() על הערך המקורי"""
+    path = _write(tmp_path, [{'מזהה_חנות': 1, 'קוד': 1.5}, {'מזהה_חנות': 2, 'קוד': None},
+                             {'מזהה_חנות': 3, 'קוד': 'א'}])
+    out = data_io.read_json_chunked(path, chunk_rows=1)
+    _same(out, _baseline(path))
+    assert out['קוד'].astype(object).tolist()[0] == '1.5'
+
+
+def test_column_appears_late(tmp_path):
+    path = _write(tmp_path, [{'מזהה_חנות': 1}, {'מזהה_חנות': 2, 'עיר': 'חיפה', 'שנה2': 3.5}])
+    _same(data_io.read_json_chunked(path, chunk_rows=1), _baseline(path))
+
+
+def test_read_chars_boundaries(tmp_path):
+    """רשומות שנחתכות בין קריאות של הקובץ"""
+    records = _records(['ירושלים', 0, 'תל אביב'] * 20)
+    path = _write(tmp_path, records)
+    assert list(data_io.iter_json_array(path, read_chars=7)) == records
@@ -0,0 +1,45 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import exports
+
+
+def _frame(n=50):
+    return pd.DataFrame({'מזהה': np.arange(n, dtype='int32'), 'עיר': pd.Categorical(['א', 'ב'] * (n // 2)),
+                         'שנה2': np.linspace(0, 10, n).astype('float32'), 'שינוי': [np.nan] + [0.5] * (n - 1)})
+
+
+def _read(data):
+    return pd.read_excel(io.BytesIO(data), sheet_name=None)
+
+
+def test_streaming_writer_matches_pandas(monkeypatch):
+    df = _frame()
+    small = _read(exports._build({'גיליון': df}))
+    monkeypatch.setattr(exports, 'STREAM_ROWS', 10)
+    streamed = _read(exports._build({'גיליון': df}))
+    pd.testing.assert_frame_equal(streamed['גיליון'], small['גיליון'])
+
+
+def test_long_tables_split_into_sheets(monkeypatch):
+    monkeypatch.setattr(exports, 'EXCEL_MAX_ROWS', 21)
+    monkeypatch.setattr(exports, 'STREAM_ROWS', 10)
+    sheets = _read(exports._build({'נתונים': _frame()}))
+    assert list(sheets) == ['נתונים', 'נתונים_2', 'נתונים_3']
+    assert pd.concat(sheets.values(), ignore_index=True)['מזהה'].tolist() == list(range(50))
+
+
+def test_fingerprint_follows_content():
+    df = _frame()
+    assert exports.fingerprint(df) == exports.fingerprint(df.copy())
+    changed = df.copy()
+    changed.loc[3, 'שנה2'] = 99
+    assert exports.fingerprint(changed) != exports.fingerprint(df)
+    assert exports.fingerprint(df.astype({'שנה2': 'float64'})) != exports.fingerprint(df)
+
+
+def test_csv_matches_pandas():
+    df = _frame()
+    assert exports.to_csv(df) == df.to_csv(index=False).encode('utf-8-sig')
@@ -0,0 +1,91 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import data_io
+import pipeline
+from filter_index import ALL, FilterIndex, value_masks
+from metrics import DEFAULT_TH
+
+
+@pytest.fixture(scope='module')
+def frames(synth_dir):
+    s, p = (data_io.read_json(n, synth_dir) for n in ('stores', 'products'))
+    return pipeline.prepare(s, p, DEFAULT_TH)
+
+
+def _naive(stores, products, user_stores, excluded_ids, excluded_prod_ids, city, status):
+    """הסינון הישן - מסכות pandas על הטבלאות בכל ריצה"""
+    own = np.ones(len(stores), dtype=bool) if user_stores is None else stores['מזהה'].isin(user_stores).to_numpy()
+    last = stores['2v2_אחרון'].to_numpy()
+    base = own & (last > 0) & ~stores['מזהה'].isin(excluded_ids).to_numpy()
+    keep = base.copy()
+    if city != ALL:
+        keep &= (stores['עיר'] == city).to_numpy()
+    if status != ALL:
+        keep &= (stores['סטטוס'] == status).to_numpy()
+    return {
+        'active': np.flatnonzero(base),
+        'closed': np.flatnonzero(own & (last == 0)),
+        'filtered': np.flatnonzero(keep),
+        'products': np.flatnonzero(~products['מזהה'].isin(excluded_prod_ids).to_numpy()),
+    }
+
+
+def test_rows_match_naive_filter(frames):
+    stores, products = frames
+    rng = np.random.default_rng(0)
+    ids = stores['מזהה'].to_numpy()
+    city = next(c for c in stores['עיר'].dropna() if c not in data_io.MISSING_TEXT)
+    status = stores['סטטוס'].iloc[0]
+    for user_stores in (None, rng.choice(ids, 60, replace=False).tolist()):
+        index = FilterIndex(stores, products, user_stores)
+        masks = value_masks(stores['סטטוס'])
+        for excluded, excluded_prod, c, s in [((), (), ALL, ALL),
+                                              (ids[:10].tolist(), products['מזהה'][:3].tolist(), city, ALL),
+                                              ((), (), ALL, status), ([-1], [-1], city, status),
+                                              ((), (), 'אין עיר כזו', ALL)]:
+            got = index.rows(masks, excluded, excluded_prod, c, s)
+            expected = _naive(stores, products, user_stores, excluded, excluded_prod, c, s)
+            for k in expected:
+                np.testing.assert_array_equal(got[k], expected[k], err_msg=k)
+
+
+def test_options_are_present_values(frames):
+    stores, products = frames
+    index = FilterIndex(stores, products)
+    cities, statuses = index.options(value_masks(stores['סטטוס']))
+    active = stores[stores['2v2_אחרון'] > 0]
+    assert cities == [ALL] + sorted(c for c in active['עיר'].dropna().unique() if c and c not in data_io.MISSING_TEXT)
+    assert statuses == [ALL] + list(active['סטטוס'].unique())
+
+
+def test_labels_sorted_and_mapped(frames):
+    stores, products = frames
+    index = FilterIndex(stores, products)
+    labels = index.stores.options()
+    assert labels == sorted(labels)
+    assert index.stores.to_ids(labels[:3] + ['אין']) == [index.stores.ids[x] for x in labels[:3]]
+
+
+def test_options_same_for_json_and_feather(synth_dir, tmp_path):
+    """עיר חסרה (0) לא מופיעה כעיר '0' כשהנתונים נקראים מ-Feather"""
+    pytest.importorskip('pyarrow')
+    for name in data_io.DATA_FILES:
+        shutil.copy(synth_dir / data_io.DATA_FILES[name], tmp_path)
+    from_json = pipeline.prepare(data_io.read_json('stores', tmp_path), data_io.read_json('products', tmp_path), DEFAULT_TH)
+    data_io.convert(tmp_path, ['stores', 'products'])
+    assert data_io.read_frame('stores', tmp_path)[1] == 'feather'
+    from_feather = pipeline.prepare(data_io.read_columnar('stores', tmp_path), data_io.read_columnar('products', tmp_path),
+                                    DEFAULT_TH)
+    assert (from_json[0]['עיר'] == 0).any()
+
+    results = []
+    for stores, products in (from_json, from_feather):
+        index = FilterIndex(stores, products)
+        masks = value_masks(stores['סטטוס'])
+        cities, statuses = index.options(masks)
+        results.append((cities, statuses, {c: index.rows(masks, city=c)['filtered'].tolist() for c in cities}))
+    assert '0' not in results[1][0]
+    assert results[0] == results[1]
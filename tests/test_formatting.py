@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from formatting import display_table, fmt_num, fmt_num_col, fmt_pct, fmt_pct_col, PCT_FORMAT
+
+VALUES = [0.1234, -0.05, 0.0, np.nan, 2.5, -1.0, 0.00004]
+
+
+def test_column_formatters_match_cell_formatters():
+    assert fmt_pct_col(VALUES) == [fmt_pct(v) for v in VALUES]
+    nums = [1234.4, 0.0, np.nan, -15.6, 1e7]
+    assert fmt_num_col(nums) == [fmt_num(v) for v in nums]
+
+
+def _shown(styler, column):
+    """הטקסט שה-Styler מציג בעמודה"""
+    text = styler.to_string(delimiter='\t').splitlines()
+    i = text[0].split('\t').index(column)
+    return [row.split('\t')[i] for row in text[1:]]
+
+
+def test_zero_and_missing_percent_match_fmt_pct():
+    df = pd.DataFrame({'שם': list('אבגדהוז'), 'שינוי': VALUES, 'סכום': [1.0] * 7})
+    d, cfg = display_table(df, {'שם': 'שם', 'שינוי': 'שינוי %', 'סכום': 'סכום'}, num=['סכום'], pct=['שינוי %'])
+    assert _shown(d, 'שינוי %') == [fmt_pct(v) for v in VALUES]
+    # הערכים נשארים מספריים למיון בדפדפן
+    assert pd.api.types.is_float_dtype(d.data['שינוי %'])
+
+
+def test_percent_without_zero_uses_column_format():
+    df = pd.DataFrame({'שינוי': [0.1, -0.2]})
+    d, cfg = display_table(df, ['שינוי'], pct=['שינוי'])
+    assert isinstance(d, pd.DataFrame)
+    assert d['שינוי'].tolist() == [10.0, -20.0]
+    assert cfg['שינוי']['type_config']['format'] == PCT_FORMAT
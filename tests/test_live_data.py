@@ -0,0 +1,56 @@
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import data_io
+from live_data import DataSource, changed_ids, row_hashes
+
+
+def _json_frame(path):
+    with open(path, encoding='utf-8') as f:
+        return pd.DataFrame(json.load(f))
+
+
+def test_hashes_ignore_storage_types(synth_dir, tmp_path):
+    """אותם נתונים מ-JSON ומ-Feather - אף שורה לא נחשבת שינוי"""
+    for name in data_io.DATA_FILES:
+        shutil.copy(synth_dir / data_io.DATA_FILES[name], tmp_path)
+    data_io.convert(tmp_path)
+    for name, key in (('stores', 'מזהה'), ('products', 'מזהה'), ('sp', 'מזהה_חנות')):
+        raw = _json_frame(tmp_path / data_io.DATA_FILES[name])
+        for other in (data_io.read_json(name, tmp_path), data_io.read_columnar(name, tmp_path)):
+            assert len(changed_ids(raw, other, key)) == 0, name
+    stores = _json_frame(tmp_path / 'data_stores.json')
+    narrow = stores.assign(שנה1=stores['שנה1'].astype('int32'), עיר=stores['עיר'].astype(str).astype('category'),
+                           H1_שנה2_אחוז_חזרות=stores['H1_שנה2_אחוז_חזרות'].astype('float32'))
+    assert row_hashes(stores, 'מזהה').equals(row_hashes(narrow, 'מזהה'))
+
+
+def test_changed_ids(synth_dir):
+    sp = data_io.read_json('sp', synth_dir)
+    new = sp.copy()
+    sid = int(sp['מזהה_חנות'].iloc[10])
+    new.loc[10, 'שנה2'] = new.loc[10, 'שנה2'] + 1
+    added = sp.iloc[:1].assign(מזהה_חנות=np.int32(10 ** 6))
+    new = pd.concat([new[new['מזהה_חנות'] != sp['מזהה_חנות'].iloc[-1]], added], ignore_index=True)
+    assert changed_ids(sp, new, 'מזהה_חנות').tolist() == sorted([sid, int(sp['מזהה_חנות'].iloc[-1]), 10 ** 6])
+
+
+def test_refresh_returns_frames_of_its_version(synth_dir, tmp_path):
+    for name in data_io.DATA_FILES:
+        shutil.copy(synth_dir / data_io.DATA_FILES[name], tmp_path)
+    src = DataSource(tmp_path, backend='pandas')
+    stores, _, _, _, stats = src.refresh()
+    assert stats['version'] == data_io.data_version(tmp_path)
+    assert src.refresh() is src.snapshot()  # בלי שינוי - אותו snapshot
+
+    path = tmp_path / 'data_stores.json'
+    records = json.loads(path.read_text(encoding='utf-8'))
+    records[0]['שנה2'] += 1
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding='utf-8')
+    new_stores, _, _, _, new_stats = src.refresh()
+    assert new_stats['version'] == data_io.data_version(tmp_path) != stats['version']
+    assert new_stats['changed'] == {'stores': 1}
+    assert new_stores['שנה2'].iloc[0] == stores['שנה2'].iloc[0] + 1
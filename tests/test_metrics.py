@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from metrics import DEFAULT_TH, PRODUCT_CHANGES, STORE_CHANGES, calc_status, chg, chg_col, status_col
+
+
+def _table(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {c for pair in STORE_CHANGES.values() for c in pair}
+    df = pd.DataFrame({c: rng.integers(0, 50, n).astype('float32') * 10 for c in sorted(cols)})
+    df.loc[::7, 'שנה1'] = np.nan
+    return df
+
+
+def test_chg_col_matches_chg():
+    df = _table()
+    for new, old in STORE_CHANGES.values():
+        expected = [chg(a, b) for a, b in zip(df[new], df[old])]
+        np.testing.assert_allclose(chg_col(df[new], df[old]), expected, rtol=1e-12)
+
+
+def test_status_col_matches_calc_status():
+    df = _table(seed=1)
+    df['שנה1'] = df['שנה1'].fillna(0)
+    for th in (DEFAULT_TH, {**DEFAULT_TH, 'סכנה': -0.3, 'צמיחה': 0.2}):
+        expected = [calc_status(r, th) for _, r in df.iterrows()]
+        assert status_col(df, th).tolist() == expected
+
+
+def test_product_changes_subset():
+    assert PRODUCT_CHANGES.keys() <= STORE_CHANGES.keys()
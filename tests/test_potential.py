@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_io
+import pipeline
+from metrics import DEFAULT_TH
+from potential import POTENTIAL_COLUMNS, potential_table, presence_stats
+
+
+@pytest.fixture(scope='module')
+def scope(synth_dir):
+    s, p, sp = (data_io.read_json(n, synth_dir) for n in ('stores', 'products', 'sp'))
+    stores, _ = pipeline.prepare(s, p, DEFAULT_TH)
+    active = stores[stores['2v2_אחרון'] > 0]
+    return active, sp[sp['מזהה_חנות'].isin(active['מזהה'])]
+
+
+def _naive(active, sp_act, min_pen):
+    """החישוב הישן בלשונית הפוטנציאל - groupby ולולאה על החנויות"""
+    sold = sp_act[sp_act['שנה2'] > 0]
+    ps = sold.groupby('מזהה_מוצר').agg({'מזהה_חנות': 'nunique', 'שנה2': 'mean'}).reset_index()
+    ps.columns = ['מזהה_מוצר', 'חנויות', 'ממוצע']
+    hp = ps[ps['חנויות'] / len(active) >= min_pen].set_index('מזהה_מוצר')['ממוצע']
+    store_prods = sold.groupby('מזהה_חנות')['מזהה_מוצר'].apply(set).to_dict()
+    pot = []
+    for _, s in active.iterrows():
+        miss = set(hp.index) - store_prods.get(s['מזהה'], set())
+        if miss:
+            pot.append({'חנות': s['שם חנות'], 'עיר': s['עיר'], 'מכירות': s['שנה2'], 'חסרים': len(miss),
+                        'פוטנציאל': round(sum(hp[m] for m in miss))})
+    return pd.DataFrame(pot, columns=POTENTIAL_COLUMNS), len(hp)
+
+
+@pytest.mark.parametrize('min_pen', [0.1, 0.3, 0.55])
+def test_matches_naive(scope, min_pen):
+    active, sp_act = scope
+    got, n_hp = potential_table(active, presence_stats(active['מזהה'].to_numpy(), sp_act), min_pen)
+    expected, n_expected = _naive(active, sp_act, min_pen)
+    assert n_hp == n_expected
+    assert got['פוטנציאל'].is_monotonic_decreasing
+    key = ['חנות', 'עיר']
+    got = got.sort_values(key).reset_index(drop=True)
+    expected = expected.sort_values(key).reset_index(drop=True)
+    assert got[key + ['חסרים']].astype(str).equals(expected[key + ['חסרים']].astype(str))
+    np.testing.assert_allclose(got['מכירות'].astype(float), expected['מכירות'].astype(float))
+    # ממוצע ב-float64 מול float32 - הפרש עיגול של 1 לכל היותר
+    assert (got['פוטנציאל'] - expected['פוטנציאל']).abs().max() <= 1
+
+
+def test_no_active_stores(scope):
+    active, sp_act = scope
+    none = active.iloc[0:0]
+    got, n_hp = potential_table(none, presence_stats(none['מזהה'].to_numpy(), sp_act), 0.5)
+    assert got.empty and n_hp == 0
@@ -0,0 +1,43 @@
+import tracemalloc
+
+import numpy as np
+
+import profiling
+from profiling import Profiler
+
+MB = 1024 ** 2
+
+
+def _alloc(mb):
+    a = np.ones(mb * MB, dtype='uint8')
+    return int(a[-1])
+
+
+def test_nested_peak_reaches_parent():
+    prof = Profiler(True)
+    with prof.section('outer') as outer:
+        with prof.section('inner') as inner:
+            _alloc(20)
+    assert inner['peak_mb'] >= 19
+    assert outer['peak_mb'] >= inner['peak_mb']
+    assert (outer['depth'], inner['depth']) == (0, 1)
+
+
+def test_other_profiler_does_not_reset_open_peak(monkeypatch):
+    """ריצה אחרת שמודדת ומסתיימת באמצע לא מוחקת את השיא של הקטע הפתוח"""
+    monkeypatch.setattr(profiling, 'write_log', lambda record: None)
+    a, b = Profiler(True), Profiler(True)
+    with a.section('a') as rec:
+        _alloc(20)
+        with b.section('b'):
+            pass
+        b.finish()
+        assert tracemalloc.is_tracing()
+    assert rec['peak_mb'] >= 19
+
+
+def test_disabled_profiler_measures_nothing():
+    prof = Profiler(False)
+    with prof.section('x') as rec:
+        _alloc(1)
+    assert 'peak_mb' not in rec and prof.sections == []
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import charts
+import data_io
+import pipeline
+import rollup
+from filter_index import ALL
+from metrics import DEFAULT_TH
+
+
+@pytest.fixture(scope='module')
+def stores(synth_dir):
+    s, p = (data_io.read_json(n, synth_dir) for n in ('stores', 'products'))
+    s, _ = pipeline.prepare(s, p, DEFAULT_TH)
+    return s
+
+
+def _direct(rows):
+    """הסכומים בסריקה ישירה של הטבלה - מה שהקובייה מחליפה"""
+    return rows['שנה2'].sum(), len(rows), charts.status_counts(rows)
+
+
+def _same(cube, rows):
+    total, n, counts = _direct(rows)
+    assert rollup.count(cube) == n
+    assert rollup.totals(cube)['שנה2'] == pytest.approx(total)
+    assert dict(rollup.status_counts(cube)) == dict(counts)
+
+
+def test_views_match_direct_scan(stores):
+    active = stores[stores['2v2_אחרון'] > 0]
+    ids = active['מזהה'].to_numpy()
+    agents = {'א': ids[::2].tolist(), 'ב': ids[1::3].tolist()}
+    cube = rollup.store_cube(stores, agents)
+    rng = np.random.default_rng(1)
+    for agent in [ALL, 'א', 'ב']:
+        scope = active if agent == ALL else active[active['מזהה'].isin(agents[agent])]
+        excluded = scope[rng.random(len(scope)) < 0.2]
+        view = rollup.agent_view(cube, agent, excluded)
+        rows = scope[~scope['מזהה'].isin(excluded['מזהה'])]
+        _same(view, rows)
+        city = rows['עיר'].iloc[0]
+        _same(rollup.select(view, city, 'צמיחה'), rows[(rows['עיר'] == city) & (rows['סטטוס'] == 'צמיחה')])
+
+
+def test_subtract_leaves_no_float_residue():
+    """קבוצה שכל שורותיה עם ערך מוחרגות - 0 ולא שארית עיגול (float32 כמו ב-Feather)"""
+    rng = np.random.default_rng(0)
+    for seed in range(100):
+        n = 50
+        rows = pd.DataFrame({'עיר': rng.choice(['א', 'ב'], n), 'סטטוס': 'יציב',
+                             **{p: (rng.random(n) * 1e4).astype('float32') for p in rollup.PERIODS}})
+        keep = int(rng.integers(0, n))
+        rows.loc[keep, 'שנה1'] = 0
+        cube = rollup.rollup(rows, rollup.STORE_DIMS)
+        out = rollup.subtract(cube, rows.drop(index=keep).sample(frac=1, random_state=seed), rollup.STORE_DIMS)
+        assert out['שנה1'].tolist() == [0.0]
+        assert out['שנה2'].tolist() == [pytest.approx(rows.loc[keep, 'שנה2'])]
+
+
+def test_subtract_keeps_integer_sums(stores):
+    cube = rollup.rollup(stores, rollup.STORE_DIMS)
+    out = rollup.subtract(cube, stores.iloc[:5], rollup.STORE_DIMS)
+    assert all(out[p].dtype.kind == 'i' for p in rollup.PERIODS)
+    assert rollup.count(out) == len(stores) - 5
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+import data_io
+from sp_index import build_index, product_rows, store_rows
+
+
+@pytest.fixture(scope='module')
+def sp(synth_dir):
+    return data_io.read_json('sp', synth_dir)
+
+
+def _same_rows(got, expected):
+    key = ['מזהה_חנות', 'מזהה_מוצר']
+    pd.testing.assert_frame_equal(got.sort_values(key, kind='stable').reset_index(drop=True),
+                                  expected.sort_values(key, kind='stable').reset_index(drop=True))
+
+
+def test_rows_match_scan(sp):
+    """אותן שורות כמו סינון בוליאני על כל הטבלה"""
+    indexed, idx = build_index(sp)
+    for sid in sp['מזהה_חנות'].drop_duplicates().iloc[::17]:
+        _same_rows(store_rows(indexed, idx, sid), sp[sp['מזהה_חנות'] == sid])
+    for pid in sp['מזהה_מוצר'].drop_duplicates().iloc[::5]:
+        _same_rows(product_rows(indexed, idx, pid), sp[sp['מזהה_מוצר'] == pid])
+
+
+def test_unknown_ids_are_empty(sp):
+    indexed, idx = build_index(sp)
+    assert store_rows(indexed, idx, -5).empty
+    assert product_rows(indexed, idx, -5).empty
+    assert list(store_rows(indexed, idx, -5).columns) == list(sp.columns)
+
+
+def test_index_sorts_by_store_keeping_order(sp):
+    indexed, _ = build_index(sp)
+    assert indexed['מזהה_חנות'].is_monotonic_increasing
+    assert len(indexed) == len(sp)
@@ -0,0 +1,58 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import data_io
+import pipeline
+import sql_store
+from potential import presence_stats
+from sp_index import build_index, product_rows, store_rows
+
+
+@pytest.fixture(scope='module')
+def stores_sp(synth_dir, tmp_path_factory):
+    """אותם נתונים בזיכרון (עם אינדקס) ובמאגר SQLite"""
+    d = tmp_path_factory.mktemp('sql')
+    for name in data_io.DATA_FILES:
+        shutil.copy(synth_dir / data_io.DATA_FILES[name], d)
+    sp, idx = build_index(data_io.read_json('sp', d))
+    return sp, idx, sql_store.open_store(d)
+
+
+def _same_rows(a, b):
+    assert list(a.columns) == list(b.columns)
+    assert len(a) == len(b)
+    for c in a.columns:
+        if c in sql_store.SP_TEXT:
+            assert a[c].astype(str).tolist() == b[c].astype(str).tolist(), c
+        else:
+            np.testing.assert_allclose(a[c].to_numpy(dtype='float64'), b[c].to_numpy(dtype='float64'), err_msg=c)
+
+
+def test_only_sp_is_stored(stores_sp):
+    _, _, store = stores_sp
+    tables = {r[0] for r in store._con().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'sp', 'meta'}
+
+
+def test_store_and_product_rows_match_index(stores_sp):
+    sp, idx, store = stores_sp
+    for sid in sp['מזהה_חנות'].unique()[:10]:
+        _same_rows(store.store_rows(sid), store_rows(sp, idx, sid))
+    for pid in sp['מזהה_מוצר'].unique()[:10]:
+        _same_rows(store.product_rows(pid), product_rows(sp, idx, pid).sort_values('מזהה_חנות', kind='stable'))
+
+
+def test_scope_and_presence_match_pandas(stores_sp):
+    sp, idx, store = stores_sp
+    ids = np.sort(sp['מזהה_חנות'].unique())[::3]
+    excluded = sp['מזהה_מוצר'].unique()[:2]
+    scoped = pipeline.scope_sp(sp, idx, ids, excluded)
+    _same_rows(store.rows(ids, excluded), scoped)
+
+    want, got = presence_stats(ids, scoped), store.presence(ids, excluded)
+    np.testing.assert_array_equal(got['product_ids'], want['product_ids'])
+    np.testing.assert_array_equal(got['stores'], want['stores'])
+    np.testing.assert_allclose(got['mean'], want['mean'])
+    assert (got['matrix'] != want['matrix']).nnz == 0
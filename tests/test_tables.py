@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import tables
+
+
+def _frame(n=10):
+    return pd.DataFrame({'מזהה': np.arange(n), 'שם': [f"חנות {i}" for i in range(n)],
+                         'עיר': pd.Categorical(['חיפה', 'באר שבע', None, 'Tel Aviv', 'חיפה'] * (n // 5)),
+                         'שנה2': [5.0, np.nan, 1.0, 3.0, 2.0] * (n // 5)})
+
+
+def test_search_matches_substring_case_insensitive():
+    df = _frame()
+    assert tables.search(df, '  ', ['שם']) is df
+    assert tables.search(df, 'tel', ['עיר'])['מזהה'].tolist() == [3, 8]
+    assert tables.search(df, '7', ['מזהה', 'שם'])['מזהה'].tolist() == [7]
+
+
+def test_sort_rows_is_stable_with_missing_last():
+    df = _frame()
+    assert tables.sort_rows(df, None) is df
+    got = tables.sort_rows(df, 'שנה2', ascending=False)
+    assert got['מזהה'].tolist() == [0, 5, 3, 8, 4, 9, 2, 7, 1, 6]
+    assert tables.sort_rows(df, 'שנה2')['מזהה'].tolist()[-2:] == [1, 6]
+
+
+def test_page_clamps_number():
+    df = _frame()
+    part, pages = tables.page(df, 9, size=4)
+    assert pages == 3 and part['מזהה'].tolist() == [8, 9]
+    assert tables.page(df.iloc[:0], 2, size=4)[1] == 1
+
+
+def _app():
+    import numpy as np
+    import pandas as pd
+
+    import tables
+    tables.PAGED_ROWS = 20
+    n = 50
+    df = pd.DataFrame({'מזהה_חנות': np.arange(n), 'שם_חנות': [f"חנות {i}" for i in range(n)],
+                       'שינוי': np.linspace(-1, 1, n)})
+    # מזהה_חנות לא מוצג, אבל אפשר לחפש בו
+    tables.paged_table(df, {'שם_חנות': 'חנות', 'שינוי': 'שינוי'}, key='t', pct=['שינוי'],
+                       search_cols=['מזהה_חנות', 'שם_חנות'])
+
+
+def test_paged_table_search_on_hidden_column():
+    at = AppTest.from_function(_app).run()
+    assert not at.exception
+    assert at.text_input(key='t_search').placeholder == "מזהה_חנות / חנות"
+    at.text_input(key='t_search').input('42').run()
+    assert at.dataframe[0].value['חנות'].tolist() == ['חנות 42']